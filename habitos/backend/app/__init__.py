@@ -124,6 +124,37 @@ def create_app(config_name=None):
     app.register_blueprint(dashboard_bp, url_prefix='/api')
     app.register_blueprint(ai_routes_bp, url_prefix='/api/ai')
     
+    # Per-user cache for analytics responses
+    from app.utils.response_cache import ResponseCache
+    response_cache = ResponseCache(app)
+    
+    # Request timing, flushed to Redis off the request path, and Prometheus metrics
+    if app.config.get('METRICS_ENABLED', False):
+        from app.utils import metrics
+        from app.utils.monitoring import RequestMetricsMiddleware
+        metrics.REGISTRY.configure(app)
+        RequestMetricsMiddleware(app)
+        
+        @app.route('/metrics')
+        def prometheus_metrics():
+            return app.response_class(metrics.REGISTRY.expose(), content_type=metrics.CONTENT_TYPE)
+    
+    # SQL statements per request, with warnings about per-row query loops
+    if app.config.get('QUERY_PROFILER_ENABLED', False):
+        from app.utils.query_profiler import QueryProfiler
+        QueryProfiler(app)
+    
+    # Spans of requests, services, SQL statements and Gemini calls
+    if app.config.get('TRACING_ENABLED', False):
+        from app.utils import tracing
+        tracing.TRACER.configure(app)
+        tracing.TracingMiddleware(app)
+    
+    # AI enrichment of journal entries, when not run by scripts/run_enrichment_worker.py
+    if app.config.get('ENRICHMENT_WORKER_ENABLED', False):
+        from app.utils.enrichment_queue import EnrichmentWorker
+        EnrichmentWorker(app).start()
+    
     # Initialize security middleware (only in production or when explicitly enabled)
     if app.config.get('ENABLE_SECURITY_MIDDLEWARE', False):
         try:
@@ -140,7 +171,8 @@ def create_app(config_name=None):
         return jsonify({
             'status': 'healthy',
             'timestamp': datetime.now().isoformat(),
-            'environment': app.config.get('FLASK_ENV', 'unknown')
+            'environment': app.config.get('FLASK_ENV', 'unknown'),
+            'response_cache': response_cache.stats()
         })
     
     @app.route('/debug/cors')
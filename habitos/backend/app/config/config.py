@@ -63,6 +63,25 @@ class Config:
     GEMINI_MAX_TOKENS = int(os.getenv('GEMINI_MAX_TOKENS', 2048))
     GEMINI_TEMPERATURE = float(os.getenv('GEMINI_TEMPERATURE', 0.7))
     
+    # Gemini call limits (read by the shared executor in app/utils/ai_service.py)
+    GEMINI_MAX_CONCURRENCY = int(os.getenv('GEMINI_MAX_CONCURRENCY', 4))  # Calls in flight per process
+    GEMINI_TIMEOUT = float(os.getenv('GEMINI_TIMEOUT', 15))  # Seconds a request waits for Gemini
+    GEMINI_MAX_RETRIES = int(os.getenv('GEMINI_MAX_RETRIES', 2))  # Retries on 429
+    GEMINI_BREAKER_THRESHOLD = int(os.getenv('GEMINI_BREAKER_THRESHOLD', 5))  # Consecutive failures to open the circuit
+    GEMINI_BREAKER_RESET = float(os.getenv('GEMINI_BREAKER_RESET', 30))  # Seconds before a trial call
+    AI_CACHE_TTL = int(os.getenv('AI_CACHE_TTL', 300))  # Seconds generated prompts and summaries are reused
+    AI_CACHE_MAX_ENTRIES = int(os.getenv('AI_CACHE_MAX_ENTRIES', 1000))  # In-process fallback only
+    
+    # Background enrichment of journal entries (app/utils/enrichment_queue.py)
+    ENRICHMENT_WORKER_ENABLED = os.getenv('ENRICHMENT_WORKER_ENABLED', 'false').lower() == 'true'  # Run the worker inside the web process
+    ENRICHMENT_WORKERS = int(os.getenv('ENRICHMENT_WORKERS', 2))  # Worker threads
+    ENRICHMENT_BATCH_SIZE = int(os.getenv('ENRICHMENT_BATCH_SIZE', 10))  # Entries per Gemini call
+    ENRICHMENT_RATE_LIMIT = float(os.getenv('ENRICHMENT_RATE_LIMIT', 0.5))  # Gemini calls per second
+    ENRICHMENT_MAX_ATTEMPTS = int(os.getenv('ENRICHMENT_MAX_ATTEMPTS', 5))  # Before a job is marked failed
+    ENRICHMENT_RETRY_BACKOFF = float(os.getenv('ENRICHMENT_RETRY_BACKOFF', 30))  # Seconds, doubled per attempt
+    ENRICHMENT_LEASE_SECONDS = int(os.getenv('ENRICHMENT_LEASE_SECONDS', 300))  # Running jobs are reclaimed after this
+    ENRICHMENT_POLL_INTERVAL = float(os.getenv('ENRICHMENT_POLL_INTERVAL', 5))  # Seconds between polls of an empty queue
+    
     # =============================================================================
     # Google OAuth Configuration
     # =============================================================================
@@ -74,6 +93,10 @@ class Config:
     # =============================================================================
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    # Rotating log file of app.utils.logger.setup_logging; console only when unset
+    LOG_FILE = os.getenv('LOG_FILE')
+    LOG_MAX_SIZE = int(os.getenv('LOG_MAX_SIZE', 10 * 1024 * 1024))  # Bytes per file
+    LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', 10))
     
     # =============================================================================
     # Security Configuration
@@ -92,6 +115,43 @@ class Config:
         if production_frontend not in CORS_ORIGINS:
             CORS_ORIGINS.append(production_frontend)
     
+    # Rate limiting (app/utils/security.py); Redis when REDIS_URL is set, in-process otherwise
+    ENABLE_RATE_LIMITING = os.getenv('ENABLE_RATE_LIMITING', 'true').lower() == 'true'
+    RATE_LIMIT_ALGORITHM = os.getenv('RATE_LIMIT_ALGORITHM', 'sliding_window')  # sliding_window or gcra
+    
+    # =============================================================================
+    # Caching Configuration
+    # =============================================================================
+    REDIS_URL = os.getenv('REDIS_URL')
+    REDIS_PASSWORD = os.getenv('REDIS_PASSWORD') or None
+    REDIS_DB = int(os.getenv('REDIS_DB', 0))
+    RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+    RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 300))  # Seconds
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 10000))  # In-process fallback only
+    
+    # =============================================================================
+    # Metrics Configuration
+    # =============================================================================
+    # Request metrics (app/utils/monitoring.py), buffered in-process and flushed to Redis, and GET /metrics.
+    # Opt-in: /metrics is unauthenticated, so only enable it where the endpoint isn't publicly reachable
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'false').lower() == 'true'
+    METRICS_FLUSH_EVERY = int(os.getenv('METRICS_FLUSH_EVERY', 100))  # Requests buffered before a flush
+    METRICS_FLUSH_INTERVAL_MS = int(os.getenv('METRICS_FLUSH_INTERVAL_MS', 1000))  # Longest wait between flushes
+    METRICS_RETENTION_DAYS = int(os.getenv('METRICS_RETENTION_DAYS', 30))  # Days metric keys are kept in Redis
+    # Prometheus /metrics (app/utils/metrics.py). With gunicorn, point this at a directory shared by the
+    # workers and empty it before the server starts, so a scrape of any worker covers all of them
+    METRICS_MULTIPROC_DIR = os.getenv('METRICS_MULTIPROC_DIR')
+    METRICS_SYNC_INTERVAL_MS = int(os.getenv('METRICS_SYNC_INTERVAL_MS', 1000))  # How often a worker writes its snapshot
+    # SQL profiling per request (app/utils/query_profiler.py): warns about statements repeated in one request
+    QUERY_PROFILER_ENABLED = os.getenv('QUERY_PROFILER_ENABLED', 'false').lower() == 'true'
+    QUERY_PROFILER_REPEAT_THRESHOLD = int(os.getenv('QUERY_PROFILER_REPEAT_THRESHOLD', 10))  # Runs of one statement before a warning
+    QUERY_PROFILER_SERVER_TIMING = os.getenv('QUERY_PROFILER_SERVER_TIMING', 'false').lower() == 'true'
+    # Tracing (app/utils/tracing.py): nested spans of requests, services, SQL and Gemini calls
+    TRACING_ENABLED = os.getenv('TRACING_ENABLED', 'false').lower() == 'true'
+    TRACING_SAMPLE_RATE = float(os.getenv('TRACING_SAMPLE_RATE', 0.1))  # Share of requests traced
+    TRACING_EXPORTERS = os.getenv('TRACING_EXPORTERS', 'metrics')  # Comma-separated: metrics, jsonl
+    TRACING_JSONL_PATH = os.getenv('TRACING_JSONL_PATH', 'logs/traces.jsonl')
+    
     # =============================================================================
     # Feature Flags
     # =============================================================================
@@ -104,6 +164,8 @@ class DevelopmentConfig(Config):
     DEBUG = True
     SQLALCHEMY_ECHO = True
     LOG_LEVEL = 'DEBUG'
+    QUERY_PROFILER_ENABLED = os.getenv('QUERY_PROFILER_ENABLED', 'true').lower() == 'true'
+    QUERY_PROFILER_SERVER_TIMING = os.getenv('QUERY_PROFILER_SERVER_TIMING', 'true').lower() == 'true'
     
     @staticmethod
     def init_app(app):
@@ -212,6 +274,9 @@ class TestingConfig(Config):
     ENABLE_JOURNAL_PROMPTS = False
     ENABLE_SENTIMENT_ANALYSIS = False
     
+    # Query-count and benchmark scripts measure uncached requests
+    RESPONSE_CACHE_ENABLED = False
+    
     # Override engine options for SQLite testing
     SQLALCHEMY_ENGINE_OPTIONS = {}
 
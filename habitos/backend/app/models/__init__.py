@@ -4,11 +4,17 @@ from .habit import Habit, HabitCategory, HabitFrequency
 from .check_in import CheckIn
 from .goal import Goal, GoalType, GoalStatus
 from .journal_entry import JournalEntry
+from .user_daily_rollup import UserDailyRollup
+from .journal_summary import JournalSummary
+from .enrichment_job import EnrichmentJob
 
 __all__ = [
     'User',
     'Habit', 'HabitCategory', 'HabitFrequency',
     'CheckIn',
     'Goal', 'GoalType', 'GoalStatus',
-    'JournalEntry'
+    'JournalEntry',
+    'UserDailyRollup',
+    'JournalSummary',
+    'EnrichmentJob'
 ]
\ No newline at end of file
@@ -1,5 +1,6 @@
 from datetime import datetime, timezone
 import uuid
+from sqlalchemy import insert, update, tuple_
 from app import db
 
 class CheckIn(db.Model):
@@ -19,9 +20,81 @@ class CheckIn(db.Model):
     created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
     updated_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
     
+    # One check-in per habit per day; indexes match the route access paths
+    __table_args__ = (
+        db.UniqueConstraint('habit_id', 'date', name='unique_habit_date'),
+        # (user_id, date, id) also serves keyset pagination of the check-in list
+        db.Index('ix_check_ins_user_id_date_id', 'user_id', 'date', 'id'),
+        db.Index('ix_check_ins_habit_id_date_completed', 'habit_id', 'date',
+                 postgresql_where=db.text('completed = true')),
+    )
+    
     # Relationships
     journal_entries = db.relationship('JournalEntry', backref='check_in', lazy=True, cascade='all, delete-orphan')
     
+    # Columns an upsert overwrites when a check-in for the same habit and day exists
+    UPSERT_COLUMNS = ('completed', 'actual_value', 'mood_rating', 'updated_at')
+    
+    @classmethod
+    def upsert_many(cls, rows):
+        """
+        Insert or update check-ins keyed on (habit_id, date) in one statement
+        (one per 1000 rows).
+        Every row needs the same keys: habit_id, user_id, date and the
+        UPSERT_COLUMNS it sets. Uses INSERT ... ON CONFLICT on PostgreSQL and
+        SQLite; other databases get a select plus one bulk insert and one
+        bulk update.
+        
+        Returns:
+            list: (id, habit_id, date) for every written row
+        """
+        if not rows:
+            return []
+        
+        now = datetime.now(timezone.utc)
+        values = [{'id': str(uuid.uuid4()), 'created_at': now, 'updated_at': now, **row} for row in rows]
+        
+        dialect = db.session.get_bind().dialect.name
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            return cls._upsert_many_fallback(values)
+        
+        # Executed with a parameter list: the statement compiles once and is
+        # sent as batched multi-row INSERTs (SQLAlchemy "insertmanyvalues")
+        table = cls.__table__
+        statement = dialect_insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=['habit_id', 'date'],
+            set_={column: statement.excluded[column] for column in cls.UPSERT_COLUMNS if column in values[0]}
+        ).returning(table.c.id, table.c.habit_id, table.c.date)
+        
+        return [tuple(row) for row in db.session.execute(statement, values).all()]
+    
+    @classmethod
+    def _upsert_many_fallback(cls, values):
+        """Upsert for databases without ON CONFLICT support"""
+        existing = {
+            (habit_id, day): check_in_id
+            for check_in_id, habit_id, day in db.session.query(cls.id, cls.habit_id, cls.date).filter(
+                tuple_(cls.habit_id, cls.date).in_([(v['habit_id'], v['date']) for v in values])
+            ).all()
+        }
+        
+        inserts = [v for v in values if (v['habit_id'], v['date']) not in existing]
+        updates = [
+            {'id': existing[(v['habit_id'], v['date'])], **{c: v[c] for c in cls.UPSERT_COLUMNS if c in v}}
+            for v in values if (v['habit_id'], v['date']) in existing
+        ]
+        if inserts:
+            db.session.execute(insert(cls), inserts)
+        if updates:
+            db.session.execute(update(cls), updates)
+        
+        return [(existing.get((v['habit_id'], v['date']), v['id']), v['habit_id'], v['date']) for v in values]
+    
     def to_dict(self):
         """Convert check-in to dictionary"""
         return {
@@ -0,0 +1,109 @@
+from datetime import datetime, timezone, timedelta
+import uuid
+from sqlalchemy import func, or_, and_, update
+from app import db
+
+class EnrichmentJob(db.Model):
+    """
+    A queued request to generate AI insights for one journal entry. Jobs are
+    written in the same transaction as the entry, claimed by
+    app.utils.enrichment_queue.EnrichmentWorker and deleted once the
+    entry's ai_insights/ai_summary are filled. A job whose worker died is
+    claimed again after its lease runs out; one that keeps failing is kept
+    with status 'failed' after max_attempts.
+    """
+    __tablename__ = 'enrichment_jobs'
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+
+    id = db.Column(db.String(36), primary_key=True, unique=True, nullable=False, default=lambda: str(uuid.uuid4()))
+    entry_id = db.Column(db.String(36), db.ForeignKey('journal_entries.id', ondelete='CASCADE'), nullable=False, index=True)
+
+    status = db.Column(db.String(16), nullable=False, default=PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)  # Claims so far, including the running one
+    last_error = db.Column(db.Text)
+
+    available_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))  # Not claimed before this (retry backoff)
+    started_at = db.Column(db.DateTime)  # When the current claim was taken
+
+    __table_args__ = (db.Index('ix_enrichment_jobs_status_available_at', 'status', 'available_at'),)
+
+    # Timestamps
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    updated_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+    @classmethod
+    def enqueue(cls, entry):
+        """
+        Queue enrichment of a journal entry inside the current transaction.
+        An entry with a job still waiting keeps that one job, which reads
+        the entry's content when it runs.
+        """
+        if entry.id is None:
+            db.session.flush()
+        else:
+            job = cls.query.filter_by(entry_id=entry.id, status=cls.PENDING).first()
+            if job is not None:
+                return job
+        job = cls(entry_id=entry.id)
+        db.session.add(job)
+        return job
+
+    @classmethod
+    def claim(cls, limit, lease_seconds):
+        """
+        Take up to limit due jobs, oldest first, and commit the claim
+
+        A job is due when it is pending and its backoff has passed, or when
+        it has been running for longer than lease_seconds. Each claim is a
+        conditional update on the attempts the job was read with, so two
+        workers can never both take the same job.
+
+        Returns:
+            List of claimed jobs
+        """
+        now = datetime.now(timezone.utc)
+        candidates = cls.query.filter(or_(
+            and_(cls.status == cls.PENDING, cls.available_at <= now),
+            and_(cls.status == cls.RUNNING, cls.started_at <= now - timedelta(seconds=lease_seconds))
+        )).order_by(cls.available_at).limit(limit).all()
+
+        claimed_ids = []
+        for job in candidates:
+            result = db.session.execute(
+                update(cls)
+                .where(cls.id == job.id, cls.status == job.status, cls.attempts == job.attempts)
+                .values(status=cls.RUNNING, attempts=cls.attempts + 1, started_at=now)
+            )
+            if result.rowcount == 1:
+                claimed_ids.append(job.id)
+        db.session.commit()
+        if not claimed_ids:
+            return []
+        return cls.query.filter(cls.id.in_(claimed_ids)).order_by(cls.available_at).all()
+
+    def retry_or_fail(self, error, max_attempts, backoff_seconds):
+        """Put a failed job back with exponential backoff, or mark it failed"""
+        self.last_error = str(error)[:1000]
+        self.started_at = None
+        if self.attempts >= max_attempts:
+            self.status = self.FAILED
+        else:
+            self.status = self.PENDING
+            self.available_at = datetime.now(timezone.utc) + timedelta(seconds=backoff_seconds * 2 ** (self.attempts - 1))
+
+    @classmethod
+    def depth(cls):
+        """Job counts by status and the age in seconds of the oldest pending job"""
+        counts = dict.fromkeys((cls.PENDING, cls.RUNNING, cls.FAILED), 0)
+        counts.update(db.session.query(cls.status, func.count(cls.id)).group_by(cls.status).all())
+        oldest = db.session.query(func.min(cls.created_at)).filter(cls.status == cls.PENDING).scalar()
+        if oldest is not None and oldest.tzinfo is None:
+            oldest = oldest.replace(tzinfo=timezone.utc)
+        counts['oldest_pending_seconds'] = round((datetime.now(timezone.utc) - oldest).total_seconds(), 1) if oldest else 0
+        return counts
+
+    def __repr__(self):
+        return f'<EnrichmentJob {self.id} entry={self.entry_id} {self.status}>'
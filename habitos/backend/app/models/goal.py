@@ -1,6 +1,8 @@
 from datetime import datetime, timezone, date
 from enum import Enum
 import uuid
+from sqlalchemy import func
+from sqlalchemy.orm.attributes import flag_modified
 from app import db
 
 class GoalType(Enum):
@@ -25,7 +27,11 @@ class Goal(db.Model):
     habit_id = db.Column(db.String(36), db.ForeignKey('habits.id'), nullable=False)
     
     # Enforce one-to-one relationship between habit and goal
-    __table_args__ = (db.UniqueConstraint('habit_id', 'user_id', name='unique_habit_goal'),)
+    __table_args__ = (
+        db.UniqueConstraint('habit_id', 'user_id', name='unique_habit_goal'),
+        db.Index('ix_goals_user_id_status', 'user_id', 'status'),
+        db.Index('ix_goals_user_id_created_at_id', 'user_id', 'created_at', 'id'),
+    )
     
     # Goal information
     title = db.Column(db.String(255), nullable=False)
@@ -92,6 +98,10 @@ class Goal(db.Model):
             CheckIn.date >= self.start_date
         ).count()
         
+        self.apply_progress(completed_checkins)
+    
+    def apply_progress(self, completed_checkins):
+        """Set progress from a completed check-in count and complete the goal if reached"""
         # Update current value
         self.current_value = completed_checkins
         
@@ -103,6 +113,46 @@ class Goal(db.Model):
         # Update the updated_at timestamp
         self.updated_at = datetime.now(timezone.utc)
     
+    @classmethod
+    def update_progress_for_habits(cls, user_id, habit_ids):
+        """
+        Update progress of the user's active goals on the given habits, with
+        one query for the goals and one grouped count of their check-ins
+        """
+        from app.models.check_in import CheckIn
+        
+        if not habit_ids:
+            return []
+        
+        goals = cls.query.filter(
+            cls.user_id == user_id,
+            cls.habit_id.in_(list(habit_ids)),
+            cls.status == GoalStatus.IN_PROGRESS.value
+        ).all()
+        if not goals:
+            return []
+        
+        # Completed check-ins per goal since its own start date
+        counts = dict(
+            db.session.query(cls.id, func.count(CheckIn.id))
+            .join(CheckIn, db.and_(
+                CheckIn.habit_id == cls.habit_id,
+                CheckIn.user_id == cls.user_id,
+                CheckIn.completed == True,
+                CheckIn.date >= cls.start_date
+            ))
+            .filter(cls.id.in_([goal.id for goal in goals]))
+            .group_by(cls.id)
+            .all()
+        )
+        
+        for goal in goals:
+            goal.apply_progress(counts.get(goal.id, 0))
+            # Same column set for every goal, so the flush batches one UPDATE
+            for column in ('current_value', 'status', 'completed_date'):
+                flag_modified(goal, column)
+        return goals
+    
     def to_dict(self):
         """Convert goal to dictionary"""
         return {
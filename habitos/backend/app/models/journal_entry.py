@@ -1,5 +1,7 @@
 from datetime import datetime, timezone
+import json
 import uuid
+from sqlalchemy.orm import joinedload
 from app import db
 
 class JournalEntry(db.Model):
@@ -7,7 +9,7 @@ class JournalEntry(db.Model):
     
     id = db.Column(db.String(36), primary_key=True, unique=True, nullable=False, default=lambda: str(uuid.uuid4()))
     user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
-    checkin_id = db.Column(db.String(36), db.ForeignKey('check_ins.id'), nullable=False)
+    checkin_id = db.Column(db.String(36), db.ForeignKey('check_ins.id'), nullable=False, index=True)
     
     # Journal content
     content = db.Column(db.Text, nullable=False)
@@ -18,10 +20,39 @@ class JournalEntry(db.Model):
     ai_summary = db.Column(db.Text)  # AI-generated summary
     insights_generated_at = db.Column(db.DateTime)  # When insights were generated
     
+    # (user_id, entry_date, id) also serves keyset pagination of the journal list
+    __table_args__ = (db.Index('ix_journal_entries_user_id_entry_date_id', 'user_id', 'entry_date', 'id'),)
+    
     # Timestamps
     created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
     updated_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
     
+    @classmethod
+    def with_mood(cls):
+        """
+        Query that joins each entry's check-in, so to_dict reads the mood
+        rating from the loaded row instead of issuing a query per entry
+        """
+        return cls.query.options(joinedload(cls.check_in))
+    
+    @classmethod
+    def store_insights(cls, entry_id, updated_at, insight, generated_at):
+        """
+        Write generated insights for an entry inside the current transaction,
+        only if it is unchanged since its content was read (updated_at), so
+        insights for old content never overwrite an edit. updated_at is set
+        to itself so storing insights doesn't count as an edit.
+
+        Returns:
+            bool: Whether the entry was written
+        """
+        return cls.query.filter_by(id=entry_id, updated_at=updated_at).update({
+            'ai_insights': json.dumps(insight),
+            'ai_summary': insight['summary'],
+            'insights_generated_at': generated_at,
+            'updated_at': cls.updated_at
+        }, synchronize_session=False) == 1
+    
     def _get_user_context(self):
         """Get user context for personalized AI insights"""
         try:
@@ -66,9 +97,9 @@ class JournalEntry(db.Model):
         }
         
         # Include mood rating from associated check-in if available
+        # (already loaded when the entry came from with_mood())
         try:
-            from app.models.check_in import CheckIn
-            check_in = CheckIn.query.get(self.checkin_id)
+            check_in = self.check_in
             if check_in and check_in.mood_rating is not None:
                 entry_dict['mood_rating'] = check_in.mood_rating
         except Exception:
@@ -0,0 +1,86 @@
+from datetime import datetime, timezone
+import hashlib
+import json
+import uuid
+from sqlalchemy.exc import IntegrityError
+from app import db
+
+class JournalSummary(db.Model):
+    """
+    A generated AI summary of a user's journal entries for one period, kept
+    until the entries behind it change. source_hash covers the ids and
+    updated_at of the contributing entries and the model that wrote it, so
+    editing, adding or deleting an entry (or switching model) makes the
+    stored summary stale and the next request regenerates it.
+    """
+    __tablename__ = 'journal_summaries'
+
+    MONTHLY = 'monthly_summary'  # period is 'YYYY-MM'
+    INSIGHTS = 'insights_summary'  # period is the rolling window: week, month or year
+
+    id = db.Column(db.String(36), primary_key=True, unique=True, nullable=False, default=lambda: str(uuid.uuid4()))
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
+
+    kind = db.Column(db.String(32), nullable=False)
+    period = db.Column(db.String(16), nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'kind', 'period', name='unique_journal_summary_period'),
+    )
+
+    # Summary content
+    source_hash = db.Column(db.String(64), nullable=False)  # source_hash_for of the contributing entries
+    entry_count = db.Column(db.Integer, nullable=False, default=0)
+    summary = db.Column(db.Text, nullable=False)  # JSON result of AIService.generate_monthly_summary
+
+    # Timestamps
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    updated_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+    @staticmethod
+    def source_hash_for(entries, model_name):
+        """Hash of the journal entries a summary is built from, in any order"""
+        sources = sorted((entry.id, entry.updated_at.isoformat() if entry.updated_at else '') for entry in entries)
+        return hashlib.sha256(json.dumps([model_name, sources]).encode()).hexdigest()
+
+    @classmethod
+    def lookup(cls, user_id, kind, period, source_hash):
+        """The stored summary if it was built from exactly these entries, else None"""
+        row = cls.query.filter_by(user_id=user_id, kind=kind, period=period).first()
+        if row is None or row.source_hash != source_hash:
+            return None
+        return json.loads(row.summary)
+
+    @classmethod
+    def store(cls, user_id, kind, period, source_hash, summary):
+        """
+        Save a generated summary for the period inside the current
+        transaction, replacing any older one. Fallback summaries are not
+        stored, so the period is retried once Gemini is available again.
+        """
+        if summary.get('is_fallback'):
+            return None
+
+        values = {
+            'source_hash': source_hash,
+            'entry_count': summary.get('entry_count', 0),
+            'summary': json.dumps(summary)
+        }
+        row = cls.query.filter_by(user_id=user_id, kind=kind, period=period).first()
+        if row is not None:
+            for name, value in values.items():
+                setattr(row, name, value)
+            db.session.flush()
+            return row
+
+        row = cls(user_id=user_id, kind=kind, period=period, **values)
+        try:
+            with db.session.begin_nested():
+                db.session.add(row)
+        except IntegrityError:
+            # A concurrent request stored the period first; either summary will do
+            return None
+        return row
+
+    def __repr__(self):
+        return f'<JournalSummary {self.user_id} {self.kind} {self.period}>'
@@ -23,6 +23,8 @@ class User(UserMixin, db.Model):
     check_ins = db.relationship('CheckIn', backref='user', lazy=True, cascade='all, delete-orphan')
     goals = db.relationship('Goal', backref='user', lazy=True, cascade='all, delete-orphan')
     journal_entries = db.relationship('JournalEntry', backref='user', lazy=True, cascade='all, delete-orphan')
+    daily_rollups = db.relationship('UserDailyRollup', backref='user', lazy=True, cascade='all, delete-orphan')
+    journal_summaries = db.relationship('JournalSummary', backref='user', lazy=True, cascade='all, delete-orphan')
     
     def set_password(self, password):
         """Hash and set password"""
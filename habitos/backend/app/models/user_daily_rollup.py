@@ -0,0 +1,186 @@
+from datetime import timedelta
+from sqlalchemy import func, case, insert, update, delete
+from app import db
+from app.utils.tracing import traced
+
+# Days refreshed per statement
+REFRESH_CHUNK_SIZE = 1000
+
+class UserDailyRollup(db.Model):
+    """
+    One row per user per day with any check-in or journal activity, so
+    analytics read a row per day instead of every check-in. Rows are kept in
+    step by the check-in and journal write paths (refresh) and can be
+    recomputed from scratch with scripts/rebuild_daily_rollups.py.
+    """
+    __tablename__ = 'user_daily_rollups'
+
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+
+    # Activity for the day
+    check_in_count = db.Column(db.Integer, nullable=False, default=0)  # Check-ins logged, completed or not
+    completed_count = db.Column(db.Integer, nullable=False, default=0)  # Completed check-ins
+    mood_sum = db.Column(db.Integer, nullable=False, default=0)  # Sum of mood ratings given
+    mood_count = db.Column(db.Integer, nullable=False, default=0)  # Check-ins with a mood rating
+    journal_count = db.Column(db.Integer, nullable=False, default=0)  # Journal entries dated that day
+
+    COUNT_COLUMNS = ('check_in_count', 'completed_count', 'mood_sum', 'mood_count', 'journal_count')
+
+    @classmethod
+    def aggregate(cls, user_ids, dates=None):
+        """
+        Compute rollup values from check-ins and journal entries
+
+        Args:
+            user_ids (list): Users to aggregate
+            dates (list): Restrict to these days (None for all history)
+
+        Returns:
+            Dict mapping (user_id, date) to a dict of COUNT_COLUMNS values
+        """
+        from app.models.check_in import CheckIn
+        from app.models.journal_entry import JournalEntry
+
+        check_in_query = db.session.query(
+            CheckIn.user_id,
+            CheckIn.date,
+            func.count(CheckIn.id),
+            func.sum(case((CheckIn.completed == True, 1), else_=0)),
+            func.sum(CheckIn.mood_rating),
+            func.count(CheckIn.mood_rating)
+        ).filter(CheckIn.user_id.in_(user_ids))
+        journal_query = db.session.query(
+            JournalEntry.user_id,
+            JournalEntry.entry_date,
+            func.count(JournalEntry.id)
+        ).filter(JournalEntry.user_id.in_(user_ids))
+        if dates is not None:
+            check_in_query = check_in_query.filter(CheckIn.date.in_(dates))
+            journal_query = journal_query.filter(JournalEntry.entry_date.in_(dates))
+
+        totals = {}
+        for user_id, day, count, completed, mood_sum, mood_count in check_in_query.group_by(CheckIn.user_id, CheckIn.date):
+            totals[(user_id, day)] = {
+                'check_in_count': count,
+                'completed_count': int(completed or 0),
+                'mood_sum': int(mood_sum or 0),
+                'mood_count': mood_count,
+                'journal_count': 0
+            }
+        for user_id, day, count in journal_query.group_by(JournalEntry.user_id, JournalEntry.entry_date):
+            totals.setdefault((user_id, day), dict.fromkeys(cls.COUNT_COLUMNS, 0))['journal_count'] = count
+        return totals
+
+    @classmethod
+    def refresh(cls, user_id, dates):
+        """
+        Recompute a user's rollups for the given days inside the current
+        transaction. Call after writing check-ins or journal entries for
+        those days.
+
+        The rollup rows are locked (created if missing) before the source rows
+        are counted, so on PostgreSQL a concurrent writer for the same day
+        waits and then counts this transaction's rows too.
+        """
+        dates = sorted(set(dates))
+        if not dates:
+            return
+
+        db.session.flush()
+        for start in range(0, len(dates), REFRESH_CHUNK_SIZE):
+            chunk = dates[start:start + REFRESH_CHUNK_SIZE]
+            cls._lock_rows(user_id, chunk)
+
+            totals = cls.aggregate([user_id], chunk)
+            db.session.execute(update(cls), [
+                {'user_id': user_id, 'date': day, **totals.get((user_id, day), dict.fromkeys(cls.COUNT_COLUMNS, 0))}
+                for day in chunk
+            ])
+
+            # Days left with no activity drop out of the table
+            empty_days = [day for day in chunk if (user_id, day) not in totals]
+            if empty_days:
+                db.session.execute(delete(cls).where(cls.user_id == user_id, cls.date.in_(empty_days)))
+
+    @classmethod
+    def _lock_rows(cls, user_id, dates):
+        """Make sure rows exist for the days, taking their row locks"""
+        values = [{'user_id': user_id, 'date': day, **dict.fromkeys(cls.COUNT_COLUMNS, 0)} for day in dates]
+
+        dialect = db.session.get_bind().dialect.name
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            existing = {day for (day,) in db.session.query(cls.date).filter(
+                cls.user_id == user_id, cls.date.in_(dates)
+            ).with_for_update()}
+            missing = [v for v in values if v['date'] not in existing]
+            if missing:
+                db.session.execute(insert(cls), missing)
+            return
+
+        # A no-op update on conflict locks existing rows
+        table = cls.__table__
+        statement = dialect_insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=['user_id', 'date'],
+            set_={'check_in_count': table.c.check_in_count}
+        )
+        db.session.execute(statement, values)
+
+    @classmethod
+    @traced
+    def rebuild(cls, user_ids):
+        """
+        Replace all rollups of the given users with values recomputed from
+        their check-ins and journal entries
+
+        Returns:
+            int: Number of rollup rows written
+        """
+        db.session.execute(delete(cls).where(cls.user_id.in_(user_ids)))
+        totals = cls.aggregate(user_ids)
+        if totals:
+            db.session.execute(insert(cls), [
+                {'user_id': user_id, 'date': day, **values} for (user_id, day), values in totals.items()
+            ])
+        return len(totals)
+
+    @classmethod
+    def window_totals(cls, user_id, start_date, end_date=None):
+        """Sum of every count column for a user from start_date to end_date (inclusive, open-ended if None)"""
+        query = db.session.query(
+            *[func.coalesce(func.sum(getattr(cls, column)), 0) for column in cls.COUNT_COLUMNS]
+        ).filter(
+            cls.user_id == user_id,
+            cls.date >= start_date
+        )
+        if end_date is not None:
+            query = query.filter(cls.date <= end_date)
+        row = query.one()
+        return dict(zip(cls.COUNT_COLUMNS, (int(value) for value in row)))
+
+    @classmethod
+    def completed_days(cls, user_id, end_date, batch_size=366):
+        """
+        (date, completed_count) for a user's days up to end_date with a
+        completed check-in, newest first. Fetches batch_size days per query,
+        only as far back as the caller iterates.
+        """
+        query = db.session.query(cls.date, cls.completed_count).filter(
+            cls.user_id == user_id,
+            cls.completed_count > 0
+        ).order_by(cls.date.desc())
+
+        while True:
+            rows = query.filter(cls.date <= end_date).limit(batch_size).all()
+            yield from rows
+            if len(rows) < batch_size:
+                return
+            end_date = rows[-1][0] - timedelta(days=1)
+
+    def __repr__(self):
+        return f'<UserDailyRollup {self.user_id} {self.date}>'
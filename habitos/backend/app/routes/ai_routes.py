@@ -1,7 +1,10 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from app import db
 from app.models.journal_entry import JournalEntry
+from app.models.journal_summary import JournalSummary
 from app.utils.ai_service import get_ai_service
+from app.utils.enrichment_queue import queue_depth
 from datetime import datetime, timedelta
 import json
 
@@ -16,8 +19,11 @@ def test_ai_routes():
 def ai_health_check():
     """Health check for AI routes"""
     try:
-        from app.utils.ai_service import AIService
-        ai_service = AIService()
+        ai_service = get_ai_service()
+        
+        # Worker counters and latency are only known to the process running it
+        worker = current_app.extensions.get('enrichment_worker')
+        enrichment_queue = worker.stats() if worker is not None else {"depth": queue_depth()}
         
         return jsonify({
             "status": "healthy",
@@ -29,6 +35,7 @@ def ai_health_check():
                 "max_tokens": ai_service.max_tokens,
                 "temperature": ai_service.temperature
             },
+            "enrichment_queue": enrichment_queue,
             "timestamp": datetime.utcnow().isoformat()
         })
     except Exception as e:
@@ -72,7 +79,7 @@ def generate_monthly_summary():
         print(f"DEBUG: Date range - Start: {start_date}, End: {end_date}")
         
         # Get entries for the month
-        entries = JournalEntry.query.filter(
+        entries = JournalEntry.with_mood().filter(
             JournalEntry.user_id == current_user_id,
             JournalEntry.entry_date >= start_date,
             JournalEntry.entry_date < end_date
@@ -98,9 +105,7 @@ def generate_monthly_summary():
         
         # Try to use the AI service
         try:
-            from app.utils.ai_service import AIService
-            print("DEBUG: Importing AIService...")
-            ai_service = AIService()
+            ai_service = get_ai_service()
             print(f"DEBUG: AI Service initialized - Enabled: {ai_service.enabled}")
             print(f"DEBUG: API Key configured: {bool(ai_service.api_key)}")
             print(f"DEBUG: Model: {ai_service.model_name}")
@@ -109,11 +114,17 @@ def generate_monthly_summary():
                 print("DEBUG: AI Service is disabled, using fallback")
                 raise Exception("AI Service is disabled")
             
-            # Always clear cache to ensure fresh results
-            ai_service.clear_monthly_summary_cache()
-            
-            print("DEBUG: Generating monthly summary with AI...")
-            summary_result = ai_service.generate_monthly_summary(entries_data)
+            # Serve the stored summary while the month's entries are unchanged
+            period = start_date.strftime('%Y-%m')
+            source_hash = JournalSummary.source_hash_for(entries, ai_service.model_name)
+            summary_result = None if force_refresh else JournalSummary.lookup(
+                current_user_id, JournalSummary.MONTHLY, period, source_hash
+            )
+            if summary_result is None:
+                print("DEBUG: Generating monthly summary with AI...")
+                summary_result = ai_service.generate_monthly_summary(entries_data, force_refresh=force_refresh)
+                JournalSummary.store(current_user_id, JournalSummary.MONTHLY, period, source_hash, summary_result)
+                db.session.commit()
             
             print(f"DEBUG: Summary result keys: {list(summary_result.keys())}")
             print(f"DEBUG: Is fallback in result: {summary_result.get('is_fallback', 'NOT SET')}")
@@ -125,6 +136,7 @@ def generate_monthly_summary():
                 "entry_count": len(entries)
             })
         except Exception as ai_error:
+            db.session.rollback()
             print(f"DEBUG: AI service error: {str(ai_error)}")
             import traceback
             traceback.print_exc()
@@ -182,6 +194,7 @@ def check_ai_health():
             "success": True,
             "ai_enabled": ai_service.enabled,
             "service_type": getattr(ai_service, 'service_type', 'none'),
+            "circuit_state": ai_service.executor.breaker.state,
             "status": "healthy" if ai_service.enabled else "fallback_mode"
         })
         
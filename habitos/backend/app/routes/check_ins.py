@@ -2,10 +2,16 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
 from app.models.check_in import CheckIn
-from app.models.habit import Habit
+from app.models.habit import Habit, recalculate_streaks_for, mark_streaks_modified
 from app.models.goal import Goal, GoalStatus
 from app.models.journal_entry import JournalEntry
+from app.models.user_daily_rollup import UserDailyRollup
+from app.utils.pagination import parse_page_args, keyset_page
+from app.utils.response_cache import conditional_get, invalidates_cache
+from app.utils.enrichment_queue import enqueue_enrichment
 from datetime import datetime, date
+import csv
+import io
 import openai
 
 # Create blueprint for check-in management routes
@@ -15,8 +21,10 @@ check_ins_bp = Blueprint('check_ins', __name__)
 @jwt_required()
 def get_check_ins():
     """
-    Get all check-ins for the current user with optional filters
-    Supports filtering by habit, date range, and completion status
+    Get check-ins for the current user with optional filters
+    Supports filtering by habit, date range, and completion status.
+    Results are paginated newest first (limit, cursor -> next_cursor);
+    paginate=false returns the full unpaginated list.
     """
     # Extract user ID from JWT token
     current_user_id = get_jwt_identity()
@@ -28,6 +36,11 @@ def get_check_ins():
         end_date = request.args.get('end_date')  # Filter by end date
         completed = request.args.get('completed')  # Filter by completion status
         
+        try:
+            paginate, limit, cursor = parse_page_args(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         # Start building the query for current user's check-ins
         query = CheckIn.query.filter_by(user_id=current_user_id)
         
@@ -58,6 +71,19 @@ def get_check_ins():
             completed_bool = completed.lower() == 'true'
             query = query.filter_by(completed=completed_bool)
         
+        if paginate:
+            try:
+                check_ins, next_cursor = keyset_page(query, CheckIn.date, CheckIn.id, limit, cursor)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            return jsonify({
+                'check_ins': [check_in.to_dict() for check_in in check_ins],
+                'count': len(check_ins),
+                'limit': limit,
+                'next_cursor': next_cursor
+            }), 200
+        
         # Order results by date (most recent first) and execute query
         check_ins = query.order_by(CheckIn.date.desc()).all()
         
@@ -71,6 +97,7 @@ def get_check_ins():
 
 @check_ins_bp.route('/', methods=['POST'])
 @jwt_required()
+@invalidates_cache
 def create_check_in():
     """
     Create a new check-in
@@ -132,14 +159,12 @@ def create_check_in():
                 content=reflection,
                 entry_date=check_in_date
             )
-            # Sentiment analysis removed - analyze_sentiment() method no longer exists
             db.session.add(journal_entry)
+            enqueue_enrichment(journal_entry)
 
-        db.session.commit()
-        
         # Update habit streak if check-in is completed
         if check_in.completed:
-            habit.update_streak()
+            habit.record_completion(check_in_date)
             
             # Update goal progress for this habit
             from app.models.goal import Goal, GoalStatus
@@ -151,8 +176,9 @@ def create_check_in():
             
             for goal in active_goals:
                 goal.update_progress_from_checkins()
-            
-            db.session.commit()
+        
+        UserDailyRollup.refresh(current_user_id, [check_in_date])
+        db.session.commit()
         
         return jsonify({
             'message': 'Check-in created successfully',
@@ -188,6 +214,7 @@ def get_check_in(check_in_id):
 
 @check_ins_bp.route('/<check_in_id>', methods=['PUT'])
 @jwt_required()
+@invalidates_cache
 def update_check_in(check_in_id):
     """
     Update a specific check-in
@@ -217,12 +244,12 @@ def update_check_in(check_in_id):
         if 'mood_rating' in data:
             check_in.mood_rating = data['mood_rating']
         
-        # Save changes to database
-        db.session.commit()
-        
         # Update habit streak if completion status changed
         if completion_changed:
-            check_in.habit.update_streak()
+            if check_in.completed:
+                check_in.habit.record_completion(check_in.date)
+            else:
+                check_in.habit.recalculate_streaks()
             
             # Update goal progress for this habit
             from app.models.goal import Goal, GoalStatus
@@ -234,8 +261,11 @@ def update_check_in(check_in_id):
             
             for goal in active_goals:
                 goal.update_progress_from_checkins()
-            
-            db.session.commit()
+        
+        UserDailyRollup.refresh(current_user_id, [check_in.date])
+        
+        # Save changes to database
+        db.session.commit()
         
         return jsonify({
             'message': 'Check-in updated successfully',
@@ -249,6 +279,7 @@ def update_check_in(check_in_id):
 
 @check_ins_bp.route('/<check_in_id>', methods=['DELETE'])
 @jwt_required()
+@invalidates_cache
 def delete_check_in(check_in_id):
     """
     Delete a specific check-in
@@ -266,13 +297,17 @@ def delete_check_in(check_in_id):
         
         # Store reference to habit for streak recalculation
         habit = check_in.habit
+        was_completed = check_in.completed
+        # Linked journal entries are deleted with it and may be dated differently
+        rollup_dates = [check_in.date] + [entry.entry_date for entry in check_in.journal_entries]
         
         # Delete the check-in
         db.session.delete(check_in)
-        db.session.commit()
+        db.session.flush()
         
-        # Recalculate habit streak after deletion
-        habit.update_streak()
+        # Removing a completed day can split or shorten a run
+        if was_completed:
+            habit.recalculate_streaks()
         
         # Update goal progress for this habit
         from app.models.goal import Goal, GoalStatus
@@ -285,6 +320,7 @@ def delete_check_in(check_in_id):
         for goal in active_goals:
             goal.update_progress_from_checkins()
         
+        UserDailyRollup.refresh(current_user_id, rollup_dates)
         db.session.commit()
         
         return jsonify({'message': 'Check-in deleted successfully'}), 200
@@ -349,6 +385,7 @@ def get_habit_check_ins(habit_id):
 
 @check_ins_bp.route('/today', methods=['GET'])
 @jwt_required()
+@conditional_get
 def get_today_check_ins():
     """
     Get all check-ins for today
@@ -376,6 +413,7 @@ def get_today_check_ins():
 
 @check_ins_bp.route('/bulk', methods=['POST'])
 @jwt_required()
+@invalidates_cache
 def create_bulk_check_in():
     """
     Create check-ins for multiple habits at once
@@ -409,128 +447,95 @@ def create_bulk_check_in():
         except ValueError:
             return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
         
-        # Get all user's habits
-        user_habits = Habit.query.filter_by(user_id=current_user_id).all()
-        habit_ids = [habit.id for habit in user_habits]
-        
-        print(f"User has {len(habit_ids)} habits: {habit_ids}")
-        
-        # Validate that all provided habit IDs belong to the user
+        # Load only the submitted habits, which must belong to the user
         provided_habit_ids = [h.get('habit_id') for h in data['habits'] if h.get('habit_id')]
-        print(f"Provided habit IDs: {provided_habit_ids}")
+        user_habits = Habit.query.filter(
+            Habit.user_id == current_user_id,
+            Habit.id.in_(provided_habit_ids)
+        ).all()
+        user_habit_map = {habit.id: habit for habit in user_habits}
         
-        invalid_habit_ids = [hid for hid in provided_habit_ids if hid not in habit_ids]
+        invalid_habit_ids = [hid for hid in provided_habit_ids if hid not in user_habit_map]
         if invalid_habit_ids:
             return jsonify({'error': f'Invalid habit IDs: {invalid_habit_ids}'}), 400
         
-        # Check for existing check-ins for today
-        existing_check_ins = CheckIn.query.filter_by(
-            user_id=current_user_id,
-            date=check_in_date
-        ).all()
-        
-        print(f"Found {len(existing_check_ins)} existing check-ins for {check_in_date}")
-        
-        # Create a map of existing check-ins by habit_id
-        existing_check_in_map = {ci.habit_id: ci for ci in existing_check_ins}
-        
-        created_check_ins = []
-        updated_check_ins = []
+        # Completion state of the existing check-ins for this date, by habit
+        previously_completed = dict(
+            db.session.query(CheckIn.habit_id, CheckIn.completed).filter(
+                CheckIn.user_id == current_user_id,
+                CheckIn.date == check_in_date,
+                CheckIn.habit_id.in_(provided_habit_ids)
+            ).all()
+        )
         
-        # Process each habit check-in
+        # One row per habit; a habit listed twice keeps its last entry
+        rows = {}
         for habit_data in data['habits']:
             habit_id = habit_data.get('habit_id')
-            completed = habit_data.get('completed', False)
-            actual_value = habit_data.get('actual_value')
-            
-            print(f"Processing habit {habit_id}: completed={completed}, actual_value={actual_value}")
-            
-            # Check if check-in already exists for this habit and date
-            existing_check_in = existing_check_in_map.get(habit_id)
-            
-            if existing_check_in:
-                # Update existing check-in
-                existing_check_in.completed = completed
-                existing_check_in.actual_value = actual_value
-                existing_check_in.mood_rating = data.get('mood_rating')
-                updated_check_ins.append(existing_check_in)
-                print(f"Updated existing check-in for habit {habit_id}")
-            else:
-                # Create new check-in
-                check_in = CheckIn(
-                    habit_id=habit_id,
-                    user_id=current_user_id,
-                    date=check_in_date,
-                    completed=completed,
-                    actual_value=actual_value,
-                    mood_rating=data.get('mood_rating')
-                )
-                db.session.add(check_in)
-                created_check_ins.append(check_in)
-                print(f"Created new check-in for habit {habit_id}")
-        
-        # Flush to get check-in IDs before creating journal entry
-        db.session.flush()
+            if not habit_id:
+                continue
+            rows[habit_id] = {
+                'habit_id': habit_id,
+                'user_id': current_user_id,
+                'date': check_in_date,
+                'completed': habit_data.get('completed', False),
+                'actual_value': habit_data.get('actual_value'),
+                'mood_rating': data.get('mood_rating')
+            }
+        
+        # Write every check-in in a single upsert statement
+        check_in_ids = {
+            habit_id: check_in_id
+            for check_in_id, habit_id, _ in CheckIn.upsert_many(list(rows.values()))
+        }
+        created_habit_ids = [hid for hid in rows if hid not in previously_completed]
+        updated_habit_ids = [hid for hid in rows if hid in previously_completed]
         
         # Create journal entry if content is provided
         journal_entry = None
         if data.get('journal_content'):
             # Link journal entry to the first check-in created/updated today
-            first_checkin = None
-            if created_check_ins:
-                first_checkin = created_check_ins[0]
-            elif updated_check_ins:
-                first_checkin = updated_check_ins[0]
+            linked_habit_ids = created_habit_ids or updated_habit_ids
             
             journal_entry = JournalEntry(
                 user_id=current_user_id,
-                checkin_id=first_checkin.id if first_checkin else None,
+                checkin_id=check_in_ids[linked_habit_ids[0]] if linked_habit_ids else None,
                 content=data['journal_content'],
                 entry_date=check_in_date
             )
             
-            # Sentiment analysis removed - OpenAI integration disabled
-            
             db.session.add(journal_entry)
+            enqueue_enrichment(journal_entry)
             print("Created journal entry")
         
-        # Commit all changes
-        print("Committing database changes...")
-        db.session.commit()
-        print("Database changes committed successfully")
-        
-        # Update habit streaks for completed check-ins
-        for check_in in created_check_ins + updated_check_ins:
-            if check_in.completed:
-                check_in.habit.update_streak()
-        
-        # Update goal progress for all affected habits
+        # Completions after a habit's last completed day extend its streak in
+        # place; backdated ones and un-completions are recomputed together
         affected_habit_ids = set()
-        for check_in in created_check_ins + updated_check_ins:
-            if check_in.completed:
-                affected_habit_ids.add(check_in.habit_id)
-        
-        for habit_id in affected_habit_ids:
-            try:
-                active_goals = Goal.query.filter_by(
-                    habit_id=habit_id,
-                    user_id=current_user_id,
-                    status=GoalStatus.IN_PROGRESS.value
-                ).all()
-                
-                for goal in active_goals:
-                    goal.update_progress_from_checkins()
-            except Exception as e:
-                print(f"Error updating goal progress for habit {habit_id}: {str(e)}")
-                # Continue with other goals even if one fails
+        habits_to_recalculate = []
+        for habit_id, row in rows.items():
+            habit = user_habit_map[habit_id]
+            if row['completed']:
+                affected_habit_ids.add(habit_id)
+                if habit.needs_streak_recalculation(check_in_date):
+                    habits_to_recalculate.append(habit)
+                else:
+                    habit.record_completion(check_in_date)
+            elif previously_completed.get(habit_id):
+                affected_habit_ids.add(habit_id)
+                habits_to_recalculate.append(habit)
+        
+        recalculate_streaks_for(habits_to_recalculate)
+        mark_streaks_modified([user_habit_map[habit_id] for habit_id in affected_habit_ids])
+        Goal.update_progress_for_habits(current_user_id, affected_habit_ids)
+        UserDailyRollup.refresh(current_user_id, [check_in_date])
         
         db.session.commit()
         print("Habit streaks and goal progress updated")
         
         response_data = {
             'message': 'Bulk check-in created successfully',
-            'created_count': len(created_check_ins),
-            'updated_count': len(updated_check_ins),
+            'created_count': len(created_habit_ids),
+            'updated_count': len(updated_habit_ids),
             'journal_created': journal_entry is not None
         }
         
@@ -554,3 +559,146 @@ def create_bulk_check_in():
             error_message = 'Check-in already exists for this date and habit.'
         
         return jsonify({'error': error_message, 'details': str(e)}), 500
+
+# Rows written per upsert statement during imports
+IMPORT_CHUNK_SIZE = 1000
+# Largest import accepted in a single request
+MAX_IMPORT_ROWS = 200000
+# Row errors listed in the import response (the count is always complete)
+MAX_REPORTED_IMPORT_ERRORS = 1000
+
+def _read_import_rows():
+    """
+    Yield raw import rows from the request body.
+    Accepts a CSV body (text/csv), a multipart upload in the 'file' field,
+    a JSON array, or a JSON object with a 'rows' array.
+    """
+    if 'file' in request.files:
+        stream = io.TextIOWrapper(request.files['file'].stream, encoding='utf-8-sig')
+        yield from csv.DictReader(stream)
+    elif request.mimetype == 'text/csv':
+        stream = io.TextIOWrapper(request.stream, encoding='utf-8-sig')
+        yield from csv.DictReader(stream)
+    else:
+        data = request.get_json(silent=True)
+        if isinstance(data, dict):
+            data = data.get('rows')
+        if not isinstance(data, list):
+            raise ValueError('Expected a JSON array of rows, an object with a "rows" array, or a CSV body')
+        yield from data
+
+def _parse_import_row(raw, user_habit_ids):
+    """Validate one import row and return the check-in column values"""
+    if not isinstance(raw, dict):
+        raise ValueError('Row must be an object')
+    
+    habit_id = raw.get('habit_id')
+    if not habit_id:
+        raise ValueError('habit_id is required')
+    if habit_id not in user_habit_ids:
+        raise ValueError(f'Invalid habit ID: {habit_id}')
+    
+    try:
+        check_in_date = datetime.strptime(str(raw.get('date') or ''), '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError('Invalid date format. Use YYYY-MM-DD')
+    
+    completed = raw.get('completed', False)
+    if isinstance(completed, str):
+        if completed.strip().lower() not in ('true', 'false', '1', '0', 'yes', 'no', ''):
+            raise ValueError(f'Invalid completed value: {completed}')
+        completed = completed.strip().lower() in ('true', '1', 'yes')
+    
+    actual_value = raw.get('actual_value')
+    if actual_value in (None, ''):
+        actual_value = None
+    else:
+        try:
+            actual_value = float(actual_value)
+        except (TypeError, ValueError):
+            raise ValueError(f'Invalid actual_value: {actual_value}')
+    
+    mood_rating = raw.get('mood_rating')
+    if mood_rating in (None, ''):
+        mood_rating = None
+    else:
+        try:
+            mood_rating = int(mood_rating)
+        except (TypeError, ValueError):
+            raise ValueError(f'Invalid mood_rating: {mood_rating}')
+        if not 1 <= mood_rating <= 10:
+            raise ValueError('mood_rating must be between 1 and 10')
+    
+    return {
+        'habit_id': habit_id,
+        'date': check_in_date,
+        'completed': bool(completed),
+        'actual_value': actual_value,
+        'mood_rating': mood_rating
+    }
+
+@check_ins_bp.route('/import', methods=['POST'])
+@jwt_required()
+@invalidates_cache
+def import_check_ins():
+    """
+    Import historical check-ins across many habits and dates
+    Rows (habit_id, date, completed, actual_value, mood_rating) are validated
+    individually; invalid rows are reported without aborting the import.
+    Valid rows are upserted in chunks and streaks and goals are recomputed
+    once at the end.
+    """
+    current_user_id = get_jwt_identity()
+    
+    try:
+        # One lookup covers ownership checks for every row
+        user_habits = {habit.id: habit for habit in Habit.query.filter_by(user_id=current_user_id).all()}
+        
+        # Later rows for the same habit and date replace earlier ones
+        rows = {}
+        errors = []
+        row_count = 0
+        try:
+            for row_number, raw in enumerate(_read_import_rows(), start=1):
+                row_count = row_number
+                if row_count > MAX_IMPORT_ROWS:
+                    return jsonify({'error': f'Imports are limited to {MAX_IMPORT_ROWS} rows'}), 413
+                try:
+                    row = _parse_import_row(raw, user_habits)
+                except ValueError as e:
+                    errors.append({'row': row_number, 'error': str(e)})
+                    continue
+                row['user_id'] = current_user_id
+                rows[(row['habit_id'], row['date'])] = row
+        except (ValueError, UnicodeDecodeError, csv.Error) as e:
+            return jsonify({'error': 'Invalid import body', 'details': str(e)}), 400
+        
+        if row_count == 0:
+            return jsonify({'error': 'No rows to import'}), 400
+        
+        # Write in chunks so each statement stays within parameter limits
+        values = list(rows.values())
+        for start in range(0, len(values), IMPORT_CHUNK_SIZE):
+            CheckIn.upsert_many(values[start:start + IMPORT_CHUNK_SIZE])
+        
+        # Backfilled history can reshape any run, so recompute from scratch once
+        imported_habits = [user_habits[habit_id] for habit_id in {row['habit_id'] for row in values}]
+        recalculate_streaks_for(imported_habits)
+        mark_streaks_modified(imported_habits)
+        Goal.update_progress_for_habits(current_user_id, [habit.id for habit in imported_habits])
+        UserDailyRollup.refresh(current_user_id, {row['date'] for row in values})
+        
+        db.session.commit()
+        
+        return jsonify({
+            'message': 'Check-ins imported successfully',
+            'row_count': row_count,
+            'imported_count': len(values),
+            'error_count': len(errors),
+            'errors': errors[:MAX_REPORTED_IMPORT_ERRORS],
+            'habits_updated': len(imported_habits)
+        }), 201 if values else 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to import check-ins', 'details': str(e)}), 500
@@ -1,12 +1,11 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from datetime import datetime, timedelta, date
-from sqlalchemy import func, and_, desc
+from datetime import date
 from app.models.user import User
-from app.models.habit import Habit, HabitFrequency
-from app.models.check_in import CheckIn
+from app.models.habit import Habit
 from app.models.goal import Goal, GoalStatus
-from app import db
+from app.utils.dashboard_aggregates import DashboardAggregator
+from app.utils.response_cache import cached_response, conditional_get
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
@@ -21,108 +20,6 @@ def handle_dashboard_preflight():
     response.headers.add('Access-Control-Allow-Credentials', 'true')
     return response, 200
 
-def calculate_current_streak(user_id):
-    """Calculate the current streak for the user's habits"""
-    try:
-        # Get all active habits for the user
-        active_habits = Habit.query.filter_by(user_id=user_id, active=True).all()
-        
-        if not active_habits:
-            return 0
-        
-        # Get the most recent check-in date across all habits
-        latest_check_in = CheckIn.query.filter(
-            CheckIn.user_id == user_id,
-            CheckIn.completed == True
-        ).order_by(desc(CheckIn.date)).first()
-        
-        if not latest_check_in:
-            return 0
-        
-        today = date.today()
-        current_streak = 0
-        current_date = today
-        
-        # Check consecutive days backwards from today
-        while current_date >= latest_check_in.date:
-            # Check if any habit was completed on this date
-            day_check_ins = CheckIn.query.filter(
-                and_(
-                    CheckIn.user_id == user_id,
-                    CheckIn.date == current_date,
-                    CheckIn.completed == True
-                )
-            ).count()
-            
-            if day_check_ins > 0:
-                current_streak += 1
-                current_date -= timedelta(days=1)
-            else:
-                break
-        
-        return current_streak
-    except Exception as e:
-        print(f"Error calculating streak: {e}")
-        return 0
-
-def calculate_completion_rate(user_id, days=30):
-    """Calculate completion rate over the last N days"""
-    try:
-        end_date = date.today()
-        start_date = end_date - timedelta(days=days)
-        
-        # Get all active habits
-        active_habits = Habit.query.filter_by(user_id=user_id, active=True).all()
-        
-        if not active_habits:
-            return 0
-        
-        total_expected = 0
-        total_completed = 0
-        
-        for habit in active_habits:
-            # Calculate expected completions based on frequency
-            current_date = start_date
-            while current_date <= end_date:
-                if current_date >= habit.start_date:
-                    if habit.frequency == HabitFrequency.DAILY:
-                        total_expected += 1
-                    elif habit.frequency == HabitFrequency.WEEKLY:
-                        # Count weeks in the period
-                        if current_date.weekday() == 0:  # Start of week (Monday)
-                            total_expected += max(habit.frequency_count, 1)
-                    elif habit.frequency == HabitFrequency.MONTHLY:
-                        # Count months in the period
-                        if current_date.day == 1:  # Start of month
-                            total_expected += max(habit.frequency_count, 1)
-                    elif habit.frequency == HabitFrequency.CUSTOM:
-                        # For custom frequency, treat as daily with custom count
-                        total_expected += max(habit.frequency_count, 1)
-                current_date += timedelta(days=1)
-            
-            # Count completed check-ins for this habit in the period
-            completed_check_ins = CheckIn.query.filter(
-                and_(
-                    CheckIn.habit_id == habit.id,
-                    CheckIn.user_id == user_id,
-                    CheckIn.date >= start_date,
-                    CheckIn.date <= end_date,
-                    CheckIn.completed == True
-                )
-            ).count()
-            
-            total_completed += completed_check_ins
-        
-        # Calculate completion rate and cap at 100%
-        if total_expected > 0:
-            completion_rate = (total_completed / total_expected) * 100
-            return min(round(completion_rate), 100)  # Cap at 100%
-        else:
-            return 0
-    except Exception as e:
-        print(f"Error calculating completion rate: {e}")
-        return 0
-
 def calculate_goal_progress(user_id):
     """Calculate goal progress and achievements"""
     try:
@@ -165,6 +62,8 @@ def calculate_goal_progress(user_id):
 @dashboard_bp.route('/dashboard', methods=['GET'])
 @dashboard_bp.route('/dashboard/', methods=['GET'])
 @jwt_required()
+@conditional_get
+@cached_response
 def get_dashboard_data():
     """Get dashboard data for the authenticated user"""
     try:
@@ -178,110 +77,39 @@ def get_dashboard_data():
         # Get today's date
         today = date.today()
         
-        # Calculate real statistics
-        active_habits_count = Habit.query.filter_by(
+        # Active habits and all check-in aggregates are loaded once, up front
+        habits = Habit.query.filter_by(
             user_id=current_user_id, 
             active=True
-        ).count()
+        ).all()
+        active_habits_count = len(habits)
+        
+        aggregates = DashboardAggregator(current_user_id, today).load()
 
-        current_streak = calculate_current_streak(current_user_id)
-        completion_rate = calculate_completion_rate(current_user_id, days=30)
+        current_streak = aggregates.current_streak()
+        completion_rate = aggregates.completion_rate(habits, days=30)
         goal_data = calculate_goal_progress(current_user_id)
 
         # Get streak data for the last 7 days
-        streak_data = []
-        labels = []
-        for i in range(6, -1, -1):
-            date_check = today - timedelta(days=i)
-            labels.append(date_check.strftime('%a'))
-            
-            # Count completed check-ins for this day
-            day_check_ins = CheckIn.query.filter(
-                and_(
-                    CheckIn.user_id == current_user_id,
-                    CheckIn.date == date_check,
-                    CheckIn.completed == True
-                )
-            ).count()
-            streak_data.append(day_check_ins)
+        labels, streak_data = aggregates.chart_data(days=7)
 
         # Get today's habits with check-in status
         today_habits_list = []
-        habits = Habit.query.filter_by(
-            user_id=current_user_id, 
-            active=True
-        ).all()
-        
         for habit in habits:
-            # Check if habit was completed today
-            check_in = CheckIn.query.filter(
-                and_(
-                    CheckIn.habit_id == habit.id,
-                    CheckIn.user_id == current_user_id,
-                    CheckIn.date == today
-                )
-            ).first()
-            
-            # Get mood from check-in if exists
-            mood = check_in.mood_rating if check_in else None
-            
-            # Calculate actual streak for this habit
-            habit_streak = 0
-            if check_in and check_in.completed:
-                # Calculate streak backwards from today
-                current_date = today
-                while True:
-                    day_check_in = CheckIn.query.filter(
-                        and_(
-                            CheckIn.habit_id == habit.id,
-                            CheckIn.user_id == current_user_id,
-                            CheckIn.date == current_date,
-                            CheckIn.completed == True
-                        )
-                    ).first()
-                    
-                    if day_check_in:
-                        habit_streak += 1
-                        current_date -= timedelta(days=1)
-                    else:
-                        break
+            completed, mood = aggregates.today_status.get(habit.id, (False, None))
             
             today_habits_list.append({
                 'id': habit.id,
                 'name': habit.title,
                 'category': habit.category.value,
-                'streak': habit_streak,
-                'completed': check_in is not None and check_in.completed,
+                'streak': habit.active_streak(today) if completed else 0,
+                'completed': completed,
                 'time': 'Throughout day',
                 'mood': mood
             })
 
         # Get mood summary from recent check-ins
-        recent_check_ins = CheckIn.query.filter(
-            CheckIn.user_id == current_user_id
-        ).order_by(desc(CheckIn.created_at)).limit(20).all()
-        
-        mood_counts = {}
-        total_check_ins = len(recent_check_ins)
-        
-        for check_in in recent_check_ins:
-            if check_in.mood_rating:
-                mood_counts[check_in.mood_rating] = mood_counts.get(check_in.mood_rating, 0) + 1
-        
-        recent_moods = []
-        for mood, count in mood_counts.items():
-            percentage = round((count / total_check_ins) * 100) if total_check_ins > 0 else 0
-            recent_moods.append({
-                'mood': mood,
-                'count': count,
-                'percentage': percentage
-            })
-        
-        # Sort by count descending
-        recent_moods.sort(key=lambda x: x['count'], reverse=True)
-        
-        # Get average mood (most common)
-        average_mood = recent_moods[0]['mood'] if recent_moods else 'neutral'
+        mood_summary = aggregates.mood_summary()
 
         dashboard_data = {
             'stats': {
@@ -306,11 +134,7 @@ def get_dashboard_data():
                 }]
             },
             'todaysHabits': today_habits_list,
-            'moodSummary': {
-                'recentMoods': recent_moods,
-                'averageMood': average_mood,
-                'totalCheckIns': total_check_ins
-            }
+            'moodSummary': mood_summary
         }
 
         return jsonify(dashboard_data), 200
@@ -4,6 +4,8 @@ from app import db
 from app.models.goal import Goal, GoalType, GoalStatus
 from app.models.habit import Habit
 from app.utils.validation import validate_goal_status, validate_goal_type, get_enum_values
+from app.utils.pagination import parse_page_args, keyset_page
+from app.utils.response_cache import invalidates_cache
 from datetime import datetime, date
 import traceback
 import sys
@@ -15,8 +17,10 @@ goals_bp = Blueprint('goals', __name__)
 @jwt_required()
 def get_goals():
     """
-    Get all goals for the current user with optional filters
-    Supports filtering by habit and status
+    Get goals for the current user with optional filters
+    Supports filtering by habit and status.
+    Results are paginated newest first (limit, cursor -> next_cursor);
+    paginate=false returns the full unpaginated list.
     """
     # Extract user ID from JWT token
     current_user_id = get_jwt_identity()
@@ -25,6 +29,11 @@ def get_goals():
         # Extract query parameters for filtering
         habit_id = request.args.get('habit_id')  # Filter by specific habit
         status = request.args.get('status')  # Filter by goal status
+        
+        try:
+            paginate, limit, cursor = parse_page_args(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
 
         # Start building the query for current user's goals
         query = Goal.query.filter_by(user_id=current_user_id)
@@ -43,6 +52,19 @@ def get_goals():
                 return jsonify({'error': str(e)}), 400
         
         
+        if paginate:
+            try:
+                goals, next_cursor = keyset_page(query, Goal.created_at, Goal.id, limit, cursor, sort_type=datetime)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            return jsonify({
+                'goals': [goal.to_dict() for goal in goals],
+                'count': len(goals),
+                'limit': limit,
+                'next_cursor': next_cursor
+            }), 200
+        
         # Execute query with ordering (most recent first)
         goals = query.order_by(Goal.created_at.desc()).all()
         
@@ -56,6 +78,7 @@ def get_goals():
 
 @goals_bp.route('/', methods=['POST'])
 @jwt_required()
+@invalidates_cache
 def create_goal():
     """
     Create a new goal
@@ -167,6 +190,7 @@ def get_goal(goal_id):
 
 @goals_bp.route('/<goal_id>', methods=['PUT', 'PATCH'])
 @jwt_required()
+@invalidates_cache
 def update_goal(goal_id):
     """
     Update a specific goal
@@ -241,6 +265,7 @@ def update_goal(goal_id):
 
 @goals_bp.route('/<goal_id>', methods=['DELETE'])
 @jwt_required()
+@invalidates_cache
 def delete_goal(goal_id):
     """
     Delete a specific goal
@@ -269,6 +294,7 @@ def delete_goal(goal_id):
 
 @goals_bp.route('/<goal_id>/progress', methods=['PUT'])
 @jwt_required()
+@invalidates_cache
 def update_goal_progress(goal_id):
     """
     Update goal progress
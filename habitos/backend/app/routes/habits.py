@@ -1,7 +1,8 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
-from app.models.habit import Habit, HabitCategory, HabitFrequency
+from app.models.habit import Habit, HabitCategory, HabitFrequency, serialize_habits, load_completion_counts
+from app.utils.response_cache import cached_response, conditional_get, invalidates_cache
 
 # Create blueprint for habit management routes
 habits_bp = Blueprint('habits', __name__)
@@ -20,6 +21,7 @@ def handle_preflight():
 @habits_bp.route('/', methods=['GET'])
 @habits_bp.route('', methods=['GET'])
 @jwt_required()
+@conditional_get
 def get_habits():
     """
     Get all habits for the current user
@@ -33,7 +35,7 @@ def get_habits():
         habits = Habit.query.filter_by(user_id=current_user_id).all()
         
         return jsonify({
-            'habits': [habit.to_dict() for habit in habits],
+            'habits': serialize_habits(habits, current_user_id),
             'count': len(habits)
         }), 200
         
@@ -43,6 +45,7 @@ def get_habits():
 @habits_bp.route('/', methods=['POST'])
 @habits_bp.route('', methods=['POST'])
 @jwt_required()
+@invalidates_cache
 def create_habit():
     """
     Create a new habit
@@ -126,6 +129,7 @@ def get_habit(habit_id):
 
 @habits_bp.route('/<habit_id>', methods=['PUT'])
 @jwt_required()
+@invalidates_cache
 def update_habit(habit_id):
     """
     Update a specific habit
@@ -186,6 +190,7 @@ def update_habit(habit_id):
 
 @habits_bp.route('/<habit_id>', methods=['DELETE'])
 @jwt_required()
+@invalidates_cache
 def delete_habit(habit_id):
     """
     Delete a specific habit
@@ -201,8 +206,19 @@ def delete_habit(habit_id):
         if not habit:
             return jsonify({'error': 'Habit not found'}), 404
         
+        from app.models.check_in import CheckIn
+        from app.models.journal_entry import JournalEntry
+        from app.models.user_daily_rollup import UserDailyRollup
+        
+        # Days whose rollups lose this habit's check-ins and their journal entries
+        rollup_dates = {day for (day,) in db.session.query(CheckIn.date).filter_by(habit_id=habit.id).distinct()}
+        rollup_dates.update(day for (day,) in db.session.query(JournalEntry.entry_date).join(
+            CheckIn, JournalEntry.checkin_id == CheckIn.id
+        ).filter(CheckIn.habit_id == habit.id).distinct())
+        
         # Delete habit (cascade will handle related data)
         db.session.delete(habit)
+        UserDailyRollup.refresh(current_user_id, rollup_dates)
         db.session.commit()
         
         return jsonify({'message': 'Habit deleted successfully'}), 200
@@ -269,6 +285,8 @@ def get_frequencies():
 
 @habits_bp.route('/stats', methods=['GET'])
 @jwt_required()
+@conditional_get
+@cached_response
 def get_habit_stats():
     """
     Get comprehensive statistics for all habits of the current user
@@ -277,9 +295,10 @@ def get_habit_stats():
     current_user_id = get_jwt_identity()
     
     try:
-        from datetime import date, timedelta
+        from datetime import date, timedelta, datetime, timezone
         from sqlalchemy import func, and_
         from app.models.check_in import CheckIn
+        from app.utils.schedule import expected_occurrences, completion_rate
         
         # Get all habits for the user
         habits = Habit.query.filter_by(user_id=current_user_id).all()
@@ -300,26 +319,17 @@ def get_habit_stats():
         active_habits = len([h for h in habits if h.active])
         
         # Calculate due today (habits that are due AND not completed today)
-        today = date.today()
+        today = datetime.now(timezone.utc).date()
+        completion_counts = load_completion_counts(habits, current_user_id, today)
         due_today = 0
         for habit in habits:
-            if habit.active and habit.is_due_today():
-                # Check if this habit has been completed today
-                today_check_in = CheckIn.query.filter(
-                    and_(
-                        CheckIn.habit_id == habit.id,
-                        CheckIn.user_id == current_user_id,
-                        CheckIn.date == today,
-                        CheckIn.completed == True
-                    )
-                ).first()
-                
-                # Only count as due if not completed today
-                if not today_check_in:
-                    due_today += 1
+            counts = completion_counts[habit.id]
+            # Only count as due if not completed today
+            if habit.active and habit.is_due_today(counts) and counts[0] == 0:
+                due_today += 1
         
         best_streak = max([h.longest_streak for h in habits]) if habits else 0
-        habits_with_streaks = len([h for h in habits if h.current_streak > 0])
+        habits_with_streaks = len([h for h in habits if h.active_streak(today) > 0])
         
         # Calculate category breakdown
         category_breakdown = {}
@@ -336,39 +346,25 @@ def get_habit_stats():
         total_completion_rate = 0
         active_habits_count = 0
         
+        # Completed check-ins per habit in the window, in one grouped query
+        completed_counts = dict(
+            db.session.query(CheckIn.habit_id, func.count(CheckIn.id)).filter(
+                and_(
+                    CheckIn.user_id == current_user_id,
+                    CheckIn.date >= start_date,
+                    CheckIn.date <= today,
+                    CheckIn.completed == True
+                )
+            ).group_by(CheckIn.habit_id).all()
+        )
+        
         for habit in habits:
             if habit.active:
-                # Get check-ins for this habit in the last 30 days
-                check_ins = CheckIn.query.filter(
-                    and_(
-                        CheckIn.habit_id == habit.id,
-                        CheckIn.user_id == current_user_id,
-                        CheckIn.date >= start_date,
-                        CheckIn.date <= today,
-                        CheckIn.completed == True
-                    )
-                ).count()
-                
-                # Calculate expected completions based on frequency
-                expected = 0
-                current_date = start_date
-                while current_date <= today:
-                    if current_date >= habit.start_date:
-                        if habit.frequency.value == 'daily':
-                            expected += 1
-                        elif habit.frequency.value == 'weekly':
-                            if current_date.weekday() == 0:  # Monday
-                                expected += max(habit.frequency_count, 1)
-                        elif habit.frequency.value == 'monthly':
-                            if current_date.day == 1:  # First of month
-                                expected += max(habit.frequency_count, 1)
-                        elif habit.frequency.value == 'custom':
-                            expected += max(habit.frequency_count, 1)
-                    current_date += timedelta(days=1)
+                expected = expected_occurrences(habit, start_date, today)
                 
                 if expected > 0:
-                    completion_rate = min((check_ins / expected) * 100, 100)
-                    total_completion_rate += completion_rate
+                    check_ins = completed_counts.get(habit.id, 0)
+                    total_completion_rate += completion_rate(check_ins, expected)
                     active_habits_count += 1
         
         avg_completion_rate = round(total_completion_rate / active_habits_count) if active_habits_count > 0 else 0
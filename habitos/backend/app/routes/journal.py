@@ -5,7 +5,12 @@ from app.models.journal_entry import JournalEntry
 from app.models.check_in import CheckIn
 from app.models.habit import Habit
 from app.models.goal import Goal
+from app.models.user_daily_rollup import UserDailyRollup
+from app.models.journal_summary import JournalSummary
 from app.utils.ai_service import get_ai_service
+from app.utils.pagination import parse_page_args, keyset_page
+from app.utils.response_cache import invalidates_cache
+from app.utils.enrichment_queue import enqueue_enrichment
 from datetime import datetime, date, timedelta
 
 # Create blueprint for journal management routes
@@ -15,8 +20,10 @@ journal_bp = Blueprint('journal', __name__)
 @jwt_required()
 def get_journal_entries():
     """
-    Get all journal entries for the current user with optional filters
-    Supports filtering by check-in, date range, and AI data inclusion
+    Get journal entries for the current user with optional filters
+    Supports filtering by check-in, date range, and AI data inclusion.
+    Results are paginated newest first (limit, cursor -> next_cursor);
+    paginate=false returns the full unpaginated list.
     """
     # Extract user ID from JWT token
     current_user_id = get_jwt_identity()
@@ -28,8 +35,13 @@ def get_journal_entries():
         end_date = request.args.get('end_date')  # Filter by end date
         include_ai_data = request.args.get('include_ai_data', 'false').lower() == 'true'  # Include AI analysis
         
+        try:
+            paginate, limit, cursor = parse_page_args(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         # Start building the query for current user's journal entries
-        query = JournalEntry.query.filter_by(user_id=current_user_id)
+        query = JournalEntry.with_mood().filter_by(user_id=current_user_id)
         
         # Apply check-in filter if provided
         if checkin_id:
@@ -52,6 +64,19 @@ def get_journal_entries():
             except ValueError:
                 return jsonify({'error': 'Invalid end_date format. Use YYYY-MM-DD'}), 400
         
+        if paginate:
+            try:
+                entries, next_cursor = keyset_page(query, JournalEntry.entry_date, JournalEntry.id, limit, cursor)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            return jsonify({
+                'journal_entries': [entry.to_dict(include_ai_data=include_ai_data) for entry in entries],
+                'count': len(entries),
+                'limit': limit,
+                'next_cursor': next_cursor
+            }), 200
+        
         # Execute query with ordering (most recent first)
         entries = query.order_by(JournalEntry.entry_date.desc()).all()
         
@@ -65,6 +90,7 @@ def get_journal_entries():
 
 @journal_bp.route('/', methods=['POST'])
 @jwt_required()
+@invalidates_cache
 def create_journal_entry():
     """
     Create a new journal entry
@@ -106,6 +132,8 @@ def create_journal_entry():
         
         # Save entry to database
         db.session.add(entry)
+        UserDailyRollup.refresh(current_user_id, [entry_date])
+        enqueue_enrichment(entry)
         db.session.commit()
         
         return jsonify({
@@ -144,6 +172,7 @@ def get_journal_entry(entry_id):
 
 @journal_bp.route('/<entry_id>', methods=['PUT'])
 @jwt_required()
+@invalidates_cache
 def update_journal_entry(entry_id):
     """
     Update a specific journal entry
@@ -160,9 +189,12 @@ def update_journal_entry(entry_id):
         if not entry:
             return jsonify({'error': 'Journal entry not found'}), 404
         
+        previous_date = entry.entry_date
+        
         # Update fields if provided in request data
-        if 'content' in data:
+        if 'content' in data and data['content'] != entry.content:
             entry.content = data['content']
+            enqueue_enrichment(entry)
         
         if 'entry_date' in data:
             try:
@@ -171,6 +203,8 @@ def update_journal_entry(entry_id):
             except ValueError:
                 return jsonify({'error': 'Invalid entry_date format. Use YYYY-MM-DD'}), 400
         
+        UserDailyRollup.refresh(current_user_id, [previous_date, entry.entry_date])
+        
         # Save changes to database
         db.session.commit()
         
@@ -186,6 +220,7 @@ def update_journal_entry(entry_id):
 
 @journal_bp.route('/<entry_id>', methods=['DELETE'])
 @jwt_required()
+@invalidates_cache
 def delete_journal_entry(entry_id):
     """
     Delete a specific journal entry
@@ -203,6 +238,7 @@ def delete_journal_entry(entry_id):
         
         # Delete journal entry from database
         db.session.delete(entry)
+        UserDailyRollup.refresh(current_user_id, [entry.entry_date])
         db.session.commit()
         
         return jsonify({'message': 'Journal entry deleted successfully'}), 200
@@ -229,7 +265,7 @@ def get_checkin_journal_entries(checkin_id):
             return jsonify({'error': 'Check-in not found'}), 404
         
         # Query all journal entries for this check-in
-        entries = JournalEntry.query.filter_by(checkin_id=checkin_id, user_id=current_user_id).all()
+        entries = JournalEntry.with_mood().filter_by(checkin_id=checkin_id, user_id=current_user_id).all()
         
         return jsonify({
             'checkin_id': checkin_id,
@@ -253,7 +289,7 @@ def get_today_entries():
     
     try:
         # Query all journal entries for today
-        entries = JournalEntry.query.filter_by(
+        entries = JournalEntry.with_mood().filter_by(
             user_id=current_user_id,
             entry_date=today
         ).all()
@@ -361,31 +397,35 @@ def generate_insights_summary():
     
     try:
         period = data.get('period', 'week')  # week, month, year
+        force_refresh = data.get('force_refresh', False)
         
         # Calculate date range based on period
         end_date = date.today()
-        if period == 'week':
-            start_date = end_date - timedelta(days=7)
-        elif period == 'month':
+        if period == 'month':
             start_date = end_date - timedelta(days=30)
         elif period == 'year':
             start_date = end_date - timedelta(days=365)
         else:
-            start_date = end_date - timedelta(days=7)  # Default to week
+            period = 'week'  # Default to week
+            start_date = end_date - timedelta(days=7)
         
         # Get journal entries for the period
-        entries = JournalEntry.query.filter_by(user_id=current_user_id)\
+        entries = JournalEntry.with_mood().filter_by(user_id=current_user_id)\
             .filter(JournalEntry.entry_date >= start_date, JournalEntry.entry_date <= end_date)\
             .order_by(JournalEntry.entry_date.desc())\
             .all()
         
-        # Get user context
-        user_context = _build_user_context(current_user_id)
-        
-        # Generate summary using AI service
+        # Serve the stored summary while the window's entries are unchanged
         ai_service = get_ai_service()
-        entries_data = [entry.to_dict() for entry in entries]
-        summary = ai_service.generate_monthly_summary(entries_data)
+        source_hash = JournalSummary.source_hash_for(entries, ai_service.model_name)
+        summary = None if force_refresh else JournalSummary.lookup(
+            current_user_id, JournalSummary.INSIGHTS, period, source_hash
+        )
+        if summary is None:
+            entries_data = [entry.to_dict() for entry in entries]
+            summary = ai_service.generate_monthly_summary(entries_data, force_refresh=force_refresh)
+            JournalSummary.store(current_user_id, JournalSummary.INSIGHTS, period, source_hash, summary)
+            db.session.commit()
         
         return jsonify({
             'period': period,
@@ -396,6 +436,7 @@ def generate_insights_summary():
         }), 200
         
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': 'Failed to generate insights summary', 'details': str(e)}), 500
 
 @journal_bp.route('/habit-correlations', methods=['POST'])
@@ -416,7 +457,7 @@ def analyze_habit_correlations():
         days_back = data.get('days_back', 30)
         start_date = date.today() - timedelta(days=days_back)
         
-        entries = JournalEntry.query.filter_by(user_id=current_user_id)\
+        entries = JournalEntry.with_mood().filter_by(user_id=current_user_id)\
             .filter(JournalEntry.entry_date >= start_date)\
             .order_by(JournalEntry.entry_date.desc())\
             .all()
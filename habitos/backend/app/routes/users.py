@@ -1,12 +1,16 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
 from app.models.user import User
-from app.models.habit import Habit
+from app.models.habit import Habit, serialize_habits
 from app.models.check_in import CheckIn
 from app.models.goal import Goal, GoalStatus
 from app.models.journal_entry import JournalEntry
+from app.models.user_daily_rollup import UserDailyRollup
 from datetime import datetime, date, timedelta
+from sqlalchemy import func, case
+from app.utils.data_export import UserDataExporter, gzip_chunks
+from app.utils.response_cache import cached_response, conditional_get, invalidates_cache
 
 # Create blueprint for user management routes
 users_bp = Blueprint('users', __name__)
@@ -35,6 +39,7 @@ def get_user_profile():
 
 @users_bp.route('/profile', methods=['PUT', 'PATCH'])
 @jwt_required()
+@invalidates_cache
 def update_user_profile():
     """
     Update current user's profile information
@@ -83,6 +88,8 @@ def update_user_profile():
 
 @users_bp.route('/stats', methods=['GET'])
 @jwt_required()
+@conditional_get
+@cached_response
 def get_user_stats():
     """
     Get comprehensive user statistics and analytics
@@ -100,14 +107,11 @@ def get_user_stats():
         total_habits = Habit.query.filter_by(user_id=current_user_id).count()
         active_habits = Habit.query.filter_by(user_id=current_user_id, active=True).count()
         
-        # Get check-in statistics for the date range
-        check_ins = CheckIn.query.filter(
-            CheckIn.user_id == current_user_id,
-            CheckIn.date >= start_date
-        ).all()
+        # Check-in, mood and journal totals for the date range, one row per day
+        totals = UserDailyRollup.window_totals(current_user_id, start_date)
         
-        total_check_ins = len(check_ins)
-        completed_check_ins = len([ci for ci in check_ins if ci.completed])
+        total_check_ins = totals['check_in_count']
+        completed_check_ins = totals['completed_count']
         completion_rate = (completed_check_ins / total_check_ins * 100) if total_check_ins > 0 else 0
         
         # Get goal statistics
@@ -116,18 +120,14 @@ def get_user_stats():
         completed_goals = Goal.query.filter_by(user_id=current_user_id, status=GoalStatus.COMPLETED.value).count()
         
         # Get journal entry statistics
-        journal_entries = JournalEntry.query.filter(
-            JournalEntry.user_id == current_user_id,
-            JournalEntry.entry_date >= start_date
-        ).count()
+        journal_entries = totals['journal_count']
         
         # Calculate average mood rating
-        mood_ratings = [ci.mood_rating for ci in check_ins if ci.mood_rating is not None]
-        avg_mood = sum(mood_ratings) / len(mood_ratings) if mood_ratings else None
+        avg_mood = totals['mood_sum'] / totals['mood_count'] if totals['mood_count'] else None
         
         # Get longest streak
         habits = Habit.query.filter_by(user_id=current_user_id).all()
-        max_streak = max([habit.current_streak for habit in habits]) if habits else 0
+        max_streak = max([habit.active_streak() for habit in habits]) if habits else 0
         
         stats = {
             'period_days': days,
@@ -157,6 +157,8 @@ def get_user_stats():
 
 @users_bp.route('/dashboard', methods=['GET'])
 @jwt_required()
+@conditional_get
+@cached_response
 def get_dashboard_data():
     """
     Get dashboard data for the current user
@@ -182,7 +184,7 @@ def get_dashboard_data():
         active_goals = Goal.query.filter_by(user_id=current_user_id, status=GoalStatus.IN_PROGRESS.value).all()
         
         # Get recent journal entries (last 5)
-        recent_journal_entries = JournalEntry.query.filter_by(
+        recent_journal_entries = JournalEntry.with_mood().filter_by(
             user_id=current_user_id
         ).order_by(JournalEntry.entry_date.desc()).limit(5).all()
         
@@ -194,7 +196,7 @@ def get_dashboard_data():
         ).all()
         
         dashboard_data = {
-            'active_habits': [habit.to_dict() for habit in active_habits],
+            'active_habits': serialize_habits(active_habits, current_user_id),
             'today_check_ins': [check_in.to_dict() for check_in in today_check_ins],
             'active_goals': [goal.to_dict() for goal in active_goals],
             'recent_journal_entries': [entry.to_dict() for entry in recent_journal_entries],
@@ -209,6 +211,8 @@ def get_dashboard_data():
 
 @users_bp.route('/habits/summary', methods=['GET'])
 @jwt_required()
+@conditional_get
+@cached_response
 def get_habits_summary():
     """
     Get summary of user's habits with progress data
@@ -225,20 +229,25 @@ def get_habits_summary():
         # Get all user's habits
         habits = Habit.query.filter_by(user_id=current_user_id).all()
         
-        habits_summary = []
-        for habit in habits:
-            # Get check-ins for this habit in the date range
-            check_ins = CheckIn.query.filter(
-                CheckIn.habit_id == habit.id,
+        # Count check-ins per habit in the date range with one grouped query
+        range_counts = dict(
+            (habit_id, (total, int(completed or 0))) for habit_id, total, completed in db.session.query(
+                CheckIn.habit_id,
+                func.count(CheckIn.id),
+                func.sum(case((CheckIn.completed == True, 1), else_=0))
+            ).filter(
+                CheckIn.user_id == current_user_id,
                 CheckIn.date >= start_date
-            ).all()
-            
-            total_days = len(check_ins)
-            completed_days = len([ci for ci in check_ins if ci.completed])
+            ).group_by(CheckIn.habit_id).all()
+        )
+        
+        habits_summary = []
+        for habit, habit_data in zip(habits, serialize_habits(habits, current_user_id)):
+            total_days, completed_days = range_counts.get(habit.id, (0, 0))
             completion_rate = (completed_days / total_days * 100) if total_days > 0 else 0
             
             habits_summary.append({
-                'habit': habit.to_dict(),
+                'habit': habit_data,
                 'completion_rate': round(completion_rate, 2),
                 'completed_days': completed_days,
                 'total_days': total_days
@@ -254,6 +263,8 @@ def get_habits_summary():
 
 @users_bp.route('/goals/summary', methods=['GET'])
 @jwt_required()
+@conditional_get
+@cached_response
 def get_goals_summary():
     """
     Get summary of user's goals with progress data
@@ -285,6 +296,8 @@ def get_goals_summary():
 
 @users_bp.route('/journal/summary', methods=['GET'])
 @jwt_required()
+@conditional_get
+@cached_response
 def get_journal_summary():
     """
     Get summary of user's journal entries
@@ -320,11 +333,22 @@ def get_journal_summary():
 def export_user_data():
     """
     Export all user data for backup or migration
-    Returns comprehensive user data in JSON format
+    Returns comprehensive user data in JSON format.
+    
+    Query params:
+        format=ndjson: stream one JSON object per line instead
+        stream=true: stream the JSON document instead of building it in memory
+        gzip=true: gzip-compress a streamed export
     """
     # Extract user ID from JWT token
     current_user_id = get_jwt_identity()
     
+    stream_format = 'ndjson' if request.args.get('format') == 'ndjson' else (
+        'json' if request.args.get('stream', 'false').lower() == 'true' else None
+    )
+    if stream_format:
+        return stream_user_data_export(current_user_id, stream_format)
+    
     try:
         # Get user data
         user = User.query.get(current_user_id)
@@ -335,12 +359,12 @@ def export_user_data():
         habits = Habit.query.filter_by(user_id=current_user_id).all()
         check_ins = CheckIn.query.filter_by(user_id=current_user_id).all()
         goals = Goal.query.filter_by(user_id=current_user_id).all()
-        journal_entries = JournalEntry.query.filter_by(user_id=current_user_id).all()
+        journal_entries = JournalEntry.with_mood().filter_by(user_id=current_user_id).all()
         
         # Prepare export data
         export_data = {
             'user': user.to_dict(),
-            'habits': [habit.to_dict() for habit in habits],
+            'habits': serialize_habits(habits, current_user_id),
             'check_ins': [check_in.to_dict() for check_in in check_ins],
             'goals': [goal.to_dict() for goal in goals],
             'journal_entries': [entry.to_dict() for entry in journal_entries],
@@ -357,3 +381,24 @@ def export_user_data():
         
     except Exception as e:
         return jsonify({'error': 'Failed to export user data', 'details': str(e)}), 500
+
+def stream_user_data_export(user_id, stream_format):
+    """Streaming variant of export_user_data (NDJSON or chunked JSON, optionally gzipped)"""
+    try:
+        exporter = UserDataExporter.for_user_id(user_id)
+        if not exporter:
+            return jsonify({'error': 'User not found'}), 404
+        
+        chunks = exporter.ndjson() if stream_format == 'ndjson' else exporter.json()
+        mimetype = 'application/x-ndjson' if stream_format == 'ndjson' else 'application/json'
+        filename = f"habitos-export-{date.today().isoformat()}.{stream_format}"
+        headers = {'Content-Disposition': f'attachment; filename={filename}'}
+        
+        if request.args.get('gzip', 'false').lower() == 'true':
+            chunks = gzip_chunks(chunks)
+            headers['Content-Encoding'] = 'gzip'
+        
+        return Response(stream_with_context(chunks), mimetype=mimetype, headers=headers), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to export user data', 'details': str(e)}), 500
@@ -1,17 +1,331 @@
 import os
+import time
+import random
 import logging
 import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from typing import List, Dict, Optional, Any
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
 import google.generativeai as genai
+import redis
+from flask import current_app, has_app_context
+from app.utils import metrics, tracing
+from app.utils.response_cache import LocalCache
+from app.utils.sentiment import scorer as sentiment_scorer
 
 logger = logging.getLogger(__name__)
 
+# How long a call waits for a free concurrency slot before falling back
+SLOT_WAIT_SECONDS = 1.0
+
+class AIUnavailableError(Exception):
+    """Gemini could not answer: circuit open, no free slot, timed out or failed"""
+
+def _is_rate_limited(error):
+    """Whether an upstream error is a 429 / quota error"""
+    # google.api_core errors carry the HTTP status in .code
+    if getattr(error, 'code', None) == 429:
+        return True
+    message = str(error).lower()
+    return '429' in message or 'quota' in message or 'resource exhausted' in message
+
+class CircuitBreaker:
+    """
+    Fails calls fast while the upstream is unhealthy. Opens after
+    failure_threshold consecutive failures; after reset_timeout seconds one
+    trial call is let through (half-open) and closes it again on success.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def allow(self):
+        """Whether a call may go upstream now"""
+        with self._lock:
+            state = self._state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.opened_at is not None:
+                logger.info("Gemini circuit closed")
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            failed_trial = self._trial_in_flight
+            self._trial_in_flight = False
+            self.failures += 1
+            if failed_trial or self.failures >= self.failure_threshold:
+                if failed_trial or self.opened_at is None:
+                    logger.warning(f"Gemini circuit opened after {self.failures} consecutive failures")
+                self.opened_at = time.monotonic()
+
+class GeminiExecutor:
+    """
+    Runs generate_content calls on a bounded thread pool so a slow or
+    throttled upstream can't pin request threads: at most max_concurrency
+    calls are in flight, each caller waits at most timeout seconds, 429s are
+    retried with jittered exponential backoff within that time, and a
+    CircuitBreaker fails calls fast while Gemini keeps failing. Every
+    failure surfaces as AIUnavailableError so callers can fall back.
+    """
+
+    def __init__(self, max_concurrency=4, timeout=15.0, max_retries=2,
+                 backoff_base=0.5, backoff_max=4.0, breaker=None):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='gemini')
+
+    def submit(self, model, prompt):
+        """
+        Start model.generate_content(prompt) on the pool without waiting
+
+        Returns:
+            Future of the Gemini response
+
+        Raises:
+            AIUnavailableError: No slot freed up in time or the circuit is open
+        """
+        return self._start(model, prompt)[0]
+
+    def call(self, model, prompt):
+        """Run model.generate_content(prompt), waiting at most self.timeout seconds"""
+        future, state = self._start(model, prompt)
+        try:
+            try:
+                return future.result(timeout=self.timeout)
+            except FutureTimeoutError:
+                with state['lock']:
+                    state['abandoned'] = not state['finished']
+                if not state['abandoned']:
+                    return future.result()
+                # The worker can't be interrupted; it keeps its slot until
+                # the call returns but no longer reports to the breaker
+                self.breaker.record_failure()
+                metrics.AI_CALLS_REJECTED.inc(reason='timeout')
+                raise AIUnavailableError(f"Gemini call timed out after {self.timeout}s")
+        except AIUnavailableError:
+            raise
+        except Exception as e:
+            raise AIUnavailableError(str(e)) from e
+
+    def _start(self, model, prompt):
+        if not self._slots.acquire(timeout=SLOT_WAIT_SECONDS):
+            metrics.AI_CALLS_REJECTED.inc(reason='no_slot')
+            raise AIUnavailableError(f"all {self.max_concurrency} Gemini slots busy")
+        if not self.breaker.allow():
+            self._slots.release()
+            metrics.AI_CALLS_REJECTED.inc(reason='circuit_open')
+            raise AIUnavailableError("Gemini circuit is open")
+
+        state = {'lock': threading.Lock(), 'finished': False, 'abandoned': False}
+        deadline = time.monotonic() + self.timeout
+        # The pool's threads don't see the caller's span; hand it over
+        parent_span = tracing.current_span()
+        return self._pool.submit(self._run, model, prompt, deadline, state, parent_span), state
+
+    def _run(self, model, prompt, deadline, state, parent_span=None):
+        succeeded = False
+        started_at = time.perf_counter()
+        metrics.AI_CALLS_IN_FLIGHT.inc()
+        try:
+            with tracing.span('ai.generate_content', parent=parent_span) as span:
+                attempt = 0
+                while True:
+                    try:
+                        response = model.generate_content(prompt)
+                        succeeded = True
+                        span.set('retries', attempt)
+                        return response
+                    except Exception as e:
+                        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                        if not _is_rate_limited(e) or attempt >= self.max_retries or time.monotonic() + delay >= deadline:
+                            raise
+                        attempt += 1
+                        logger.warning(f"Gemini rate limited, retry {attempt}/{self.max_retries} in {delay:.2f}s: {e}")
+                        time.sleep(delay)
+        finally:
+            metrics.AI_CALLS_IN_FLIGHT.dec()
+            metrics.AI_CALL_DURATION.observe(time.perf_counter() - started_at,
+                                             outcome='success' if succeeded else 'error')
+            with state['lock']:
+                state['finished'] = True
+                if not state['abandoned']:
+                    if succeeded:
+                        self.breaker.record_success()
+                    else:
+                        self.breaker.record_failure()
+            self._slots.release()
+
+# Read a namespace's generation and then the entry under it in one round
+# trip. KEYS[1] is the generation key; ARGV is the namespace prefix, the
+# entry key and, for a write, the JSON value and TTL in seconds.
+CACHE_GET_SCRIPT = """
+local generation = redis.call('GET', KEYS[1]) or '0'
+return redis.call('GET', ARGV[1] .. ':' .. generation .. ':' .. ARGV[2])
+"""
+
+CACHE_SET_SCRIPT = """
+local generation = redis.call('GET', KEYS[1]) or '0'
+redis.call('SET', ARGV[1] .. ':' .. generation .. ':' .. ARGV[2], ARGV[3], 'EX', ARGV[4])
+return 1
+"""
+
+class AICache:
+    """
+    TTL + LRU cache for generated content, shared by all workers through
+    Redis when REDIS_URL is reachable and held in-process (LocalCache)
+    otherwise. Values are stored as JSON. Each namespace has a generation
+    counter embedded in its keys, so clear() is a single increment; with
+    Redis, get and set resolve the generation inside a script, one round
+    trip each.
+    """
+
+    KEY_PREFIX = 'ai_cache'
+
+    def __init__(self, ttl=300, max_entries=1000, redis_url=None, client=None):
+        self.ttl = ttl
+        self.client = client
+        self.backend = None
+        if client is not None:
+            self.backend = 'memory' if isinstance(client, LocalCache) else 'redis'
+        if self.client is None and redis_url:
+            try:
+                self.client = redis.from_url(
+                    redis_url,
+                    password=os.getenv('REDIS_PASSWORD') or None,
+                    db=int(os.getenv('REDIS_DB', 0)),
+                    decode_responses=True,
+                    socket_connect_timeout=2,
+                    socket_timeout=2
+                )
+                self.client.ping()
+                self.backend = 'redis'
+                logger.info("Redis connection established for AI cache")
+            except Exception as e:
+                logger.warning(f"Redis connection for AI cache failed, using in-process cache: {e}")
+                self.client = None
+        if self.client is None:
+            self.client = LocalCache(max_entries)
+            self.backend = 'memory'
+        self._get_script = self._set_script = None
+        if self.backend == 'redis':
+            self._get_script = self.client.register_script(CACHE_GET_SCRIPT)
+            self._set_script = self.client.register_script(CACHE_SET_SCRIPT)
+
+    def _generation_key(self, namespace):
+        return f"{self.KEY_PREFIX}:generation:{namespace}"
+
+    def _key(self, namespace, key):
+        generation = int(self.client.get(self._generation_key(namespace)) or 0)
+        return f"{self.KEY_PREFIX}:{namespace}:{generation}:{key}"
+
+    def get(self, namespace, key):
+        try:
+            if self._get_script is not None:
+                value = self._get_script(keys=[self._generation_key(namespace)],
+                                         args=[f"{self.KEY_PREFIX}:{namespace}", key])
+            else:
+                value = self.client.get(self._key(namespace, key))
+            metrics.CACHE_REQUESTS.inc(cache='ai', result='miss' if value is None else 'hit')
+            return json.loads(value) if value is not None else None
+        except Exception as e:
+            logger.error(f"AI cache read failed: {e}")
+            return None
+
+    def set(self, namespace, key, value):
+        try:
+            if self._set_script is not None:
+                self._set_script(keys=[self._generation_key(namespace)],
+                                 args=[f"{self.KEY_PREFIX}:{namespace}", key, json.dumps(value), self.ttl])
+            else:
+                self.client.set(self._key(namespace, key), json.dumps(value), ex=self.ttl)
+        except Exception as e:
+            logger.error(f"AI cache write failed: {e}")
+
+    def clear(self, namespace):
+        try:
+            self.client.incr(self._generation_key(namespace))
+        except Exception as e:
+            logger.error(f"AI cache clear failed: {e}")
+
+def content_hash(value):
+    """Stable hash of JSON-serializable content, the same in every process"""
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+def _setting(key, default):
+    """A setting from the app config, or from the environment outside an app context"""
+    if has_app_context() and key in current_app.config:
+        return current_app.config[key]
+    return type(default)(os.getenv(key, default))
+
+# Shared by every AIService in the process so the limits are global
+_gemini_executor = None
+_gemini_executor_lock = threading.Lock()
+
+def get_gemini_executor():
+    """Get or create the process-wide Gemini executor, configured by the GEMINI_* settings"""
+    global _gemini_executor
+    with _gemini_executor_lock:
+        if _gemini_executor is None:
+            _gemini_executor = GeminiExecutor(
+                max_concurrency=_setting('GEMINI_MAX_CONCURRENCY', 4),
+                timeout=_setting('GEMINI_TIMEOUT', 15.0),
+                max_retries=_setting('GEMINI_MAX_RETRIES', 2),
+                breaker=CircuitBreaker(
+                    failure_threshold=_setting('GEMINI_BREAKER_THRESHOLD', 5),
+                    reset_timeout=_setting('GEMINI_BREAKER_RESET', 30.0)
+                )
+            )
+        return _gemini_executor
+
 class AIService:
     """AI service for all journal features using Google Gemini"""
     
-    def __init__(self, api_key=None, model_name=None, max_tokens=None, temperature=None):
-        """Initialize AI service with Gemini API configuration"""
+    def __init__(self, api_key=None, model_name=None, max_tokens=None, temperature=None, model=None, executor=None, cache=None):
+        """
+        Initialize AI service with Gemini API configuration
+
+        model, executor and cache replace the Gemini model, the shared
+        executor and the AICache (e.g. with a local fake model in
+        scripts/check_ai_client.py).
+        """
         # Force reload environment variables to ensure they're available
         from dotenv import load_dotenv
         load_dotenv()
@@ -22,9 +336,19 @@ class AIService:
         self.max_tokens = max_tokens or int(os.getenv('GEMINI_MAX_TOKENS', 1024))
         self.temperature = temperature or float(os.getenv('GEMINI_TEMPERATURE', 0.7))
         
-        # Simple cache for prompts (cache for 5 minutes to reduce API calls)
-        self._prompt_cache = {}
-        self._cache_duration = timedelta(minutes=5)
+        # Generated prompts and summaries are cached to reduce API calls
+        self.cache = cache or AICache(
+            ttl=_setting('AI_CACHE_TTL', 300),
+            max_entries=_setting('AI_CACHE_MAX_ENTRIES', 1000),
+            redis_url=os.getenv('REDIS_URL')
+        )
+        
+        self.executor = executor or get_gemini_executor()
+        
+        if model is not None:
+            self.model = model
+            self.enabled = True
+            return
         
         logger.info(f"Initializing AI Service - API Key set: {bool(self.api_key)}, Model: {self.model_name}")
         
@@ -48,6 +372,11 @@ class AIService:
             logger.error(f"Failed to initialize Gemini service: {e}")
             self.enabled = False
 
+    def _generate(self, prompt: str):
+        """Call Gemini through the executor; raises AIUnavailableError on any failure"""
+        return self.executor.call(self.model, prompt)
+
+    @tracing.traced
     def analyze_journal_sentiment(self, content: str) -> Dict[str, Any]:
         """
         Analyze sentiment of journal content using Gemini
@@ -59,7 +388,7 @@ class AIService:
             Dict containing sentiment analysis results
         """
         if not self.enabled or not content:
-            return self._get_fallback_sentiment()
+            return self._get_fallback_sentiment(content)
         
         try:
             prompt = f"""
@@ -83,7 +412,7 @@ class AIService:
             }}
             """
             
-            response = self.model.generate_content(prompt)
+            response = self._generate(prompt)
             result = self._parse_json_response(response.text)
             
             if result:
@@ -98,14 +427,16 @@ class AIService:
         except Exception as e:
             logger.error(f"Error analyzing sentiment: {e}")
         
-        return self._get_fallback_sentiment()
+        return self._get_fallback_sentiment(content)
 
-    def generate_monthly_summary(self, entries: List[Dict]) -> Dict[str, Any]:
+    @tracing.traced
+    def generate_monthly_summary(self, entries: List[Dict], force_refresh: bool = False) -> Dict[str, Any]:
         """
         Generate a monthly summary from journal entries using Gemini
         
         Args:
             entries (List[Dict]): List of journal entries for the month
+            force_refresh (bool): Skip the cache and generate a new summary
         Returns:
             Dict containing monthly summary
         """
@@ -114,25 +445,21 @@ class AIService:
         if not entries:
             raise ValueError("No journal entries provided for summary.")
         
-        # Create a cache key based on entry count and content hash
-        import hashlib
-        entries_hash = hashlib.md5(str(entries).encode()).hexdigest()
-        cache_key = f"monthly_summary_{len(entries)}_{entries_hash}"
+        # Key on exactly what the prompt and result are built from
+        excerpts = [entry.get('content', '')[:200] for entry in entries[:20]]  # Limit to 20 entries
+        cache_key = content_hash([self.model_name, len(entries), excerpts])
         
         # Check cache first
-        if cache_key in self._prompt_cache:
-            cached_data = self._prompt_cache[cache_key]
-            if datetime.now() - cached_data['timestamp'] < self._cache_duration:
-                return cached_data['data']
-            else:
-                # Remove expired cache entry
-                del self._prompt_cache[cache_key]
+        if not force_refresh:
+            cached = self.cache.get('monthly_summary', cache_key)
+            if cached is not None:
+                return cached
         
         # Generate summary
         # Prepare entries summary
         entries_text = "\n\n".join([
-            f"Entry {i+1}: {entry.get('content', '')[:200]}..."
-            for i, entry in enumerate(entries[:20])  # Limit to 20 entries
+            f"Entry {i+1}: {excerpt}..."
+            for i, excerpt in enumerate(excerpts)
         ])
         
         prompt = f"""
@@ -146,7 +473,11 @@ class AIService:
         Respond with just the summary text, no JSON formatting.
         """
         
-        response = self.model.generate_content(prompt)
+        try:
+            response = self._generate(prompt)
+        except AIUnavailableError as e:
+            logger.warning(f"Gemini unavailable, using fallback monthly summary: {e}")
+            return self._get_fallback_monthly_summary(entries)
         summary = response.text.strip()
         
         result = {
@@ -158,12 +489,74 @@ class AIService:
         }
         
         # Cache the results
-        self._prompt_cache[cache_key] = {
-            'data': result,
-            'timestamp': datetime.now()
-        }
+        self.cache.set('monthly_summary', cache_key, result)
         return result
 
+    @tracing.traced
+    def generate_entry_insights(self, contents: List[str]) -> List[Dict[str, Any]]:
+        """
+        Generate insights for several journal entries in one Gemini call
+        
+        Args:
+            contents (List[str]): Journal entry contents
+            
+        Returns:
+            List of insight objects, one per content in the same order,
+            shaped as the frontend reads JournalEntry.ai_insights
+            
+        Raises:
+            AIUnavailableError: Gemini is disabled, failed or returned
+                something other than one insight per entry
+        """
+        if not self.enabled:
+            raise AIUnavailableError("AI service is not enabled")
+        
+        entries_text = "\n\n".join([
+            f"Entry {i+1}:\n{content[:1000]}"
+            for i, content in enumerate(contents)
+        ])
+        
+        prompt = f"""
+        For each of these {len(contents)} journal entries, write a short supportive insight
+        and a one-sentence summary, name the main emotion and up to three themes, and
+        suggest up to two small next steps.
+        
+        Journal Entries:
+        {entries_text}
+        
+        Respond in JSON format with an array of exactly {len(contents)} objects, in entry order:
+        [
+            {{
+                "insight": "insight text",
+                "summary": "one sentence summary",
+                "emotion": "main emotion",
+                "themes": ["theme1", "theme2"],
+                "recommendations": ["step1", "step2"]
+            }}
+        ]
+        """
+        
+        response = self._generate(prompt)
+        result = self._parse_json_response(response.text)
+        if not isinstance(result, list) or len(result) != len(contents) or not all(isinstance(item, dict) for item in result):
+            raise AIUnavailableError(f"Gemini returned unusable insights for {len(contents)} entries")
+        
+        generated_at = datetime.now(timezone.utc).isoformat()
+        # Scored locally so a batch still costs one Gemini call
+        sentiments = sentiment_scorer.score_batch(contents)
+        return [{
+            'insight': str(item.get('insight', '')),
+            'summary': str(item.get('summary', '')),
+            'emotion': str(item.get('emotion', 'neutral')),
+            'themes': list(item.get('themes') or [])[:3],
+            'recommendations': list(item.get('recommendations') or [])[:2],
+            'sentiment': sentiment['sentiment'],
+            'sentiment_score': sentiment['sentiment_score'],
+            'generated_at': generated_at,
+            'type': 'entry_insight'
+        } for item, sentiment in zip(result, sentiments)]
+
+    @tracing.traced
     def generate_prompts(self, count: int = 5) -> List[Dict[str, str]]:
         """
         Generate journal writing prompts using Gemini
@@ -179,15 +572,11 @@ class AIService:
             return self._get_fallback_prompts(count)
         
         # Check cache first
-        cache_key = f"prompts_{count}"
-        if cache_key in self._prompt_cache:
-            cached_data = self._prompt_cache[cache_key]
-            if datetime.now() - cached_data['timestamp'] < self._cache_duration:
-                logger.info(f"Returning cached prompts for count {count}")
-                return cached_data['prompts']
-            else:
-                # Remove expired cache entry
-                del self._prompt_cache[cache_key]
+        cache_key = f"{self.model_name}:{count}"
+        cached = self.cache.get('prompts', cache_key)
+        if cached is not None:
+            logger.info(f"Returning cached prompts for count {count}")
+            return cached
         
         try:
             prompt = f"""
@@ -198,7 +587,7 @@ class AIService:
             Respond with just the prompts, one per line, no numbering or formatting.
             """
             
-            response = self.model.generate_content(prompt)
+            response = self._generate(prompt)
             prompts_text = response.text.strip()
             
             # Parse prompts from response
@@ -221,40 +610,32 @@ class AIService:
                 })
             
             # Cache the results
-            self._prompt_cache[cache_key] = {
-                'prompts': prompts[:count],
-                'timestamp': datetime.now()
-            }
+            self.cache.set('prompts', cache_key, prompts[:count])
             
             logger.info(f"Successfully generated {len(prompts)} AI prompts")
             return prompts[:count]
             
         except Exception as e:
-            error_msg = str(e)
-            if "429" in error_msg or "quota" in error_msg.lower():
-                logger.warning(f"Rate limit exceeded for Gemini API: {error_msg}")
-                logger.info("Falling back to randomized prompts due to rate limit")
+            if isinstance(e, AIUnavailableError):
+                logger.warning(f"Gemini unavailable, using fallback prompts: {e}")
             else:
                 logger.error(f"Error generating prompts: {e}")
             return self._get_fallback_prompts(count)
 
     def clear_prompt_cache(self):
         """Clear the prompt cache to force fresh generation"""
-        self._prompt_cache.clear()
+        self.cache.clear('prompts')
         logger.info("Prompt cache cleared")
 
     def clear_monthly_summary_cache(self):
         """Clear the monthly summary cache to force fresh generation"""
-        # Remove only monthly summary cache entries
-        keys_to_remove = [key for key in self._prompt_cache.keys() if key.startswith('monthly_summary_')]
-        for key in keys_to_remove:
-            del self._prompt_cache[key]
-        logger.info(f"Monthly summary cache cleared ({len(keys_to_remove)} entries)")
+        self.cache.clear('monthly_summary')
+        logger.info("Monthly summary cache cleared")
 
     def clear_all_cache(self):
         """Clear all cache entries"""
-        self._prompt_cache.clear()
-        logger.info("All cache entries cleared")
+        self.clear_prompt_cache()
+        self.clear_monthly_summary_cache()
 
     def _parse_json_response(self, response_text: str) -> Optional[Dict]:
         """Parse JSON response from Gemini, handling common formatting issues"""
@@ -276,8 +657,10 @@ class AIService:
             logger.debug(f"Response text: {response_text}")
             return None
 
-    def _get_fallback_sentiment(self) -> Dict[str, Any]:
-        """Fallback sentiment analysis when Gemini is disabled"""
+    def _get_fallback_sentiment(self, content: Optional[str] = None) -> Dict[str, Any]:
+        """Fallback sentiment analysis when Gemini is disabled or unavailable: the local lexicon scorer"""
+        if content:
+            return sentiment_scorer.score(content)
         return {
             'sentiment': 'neutral',
             'sentiment_score': 0.0,
@@ -430,11 +813,14 @@ class AIService:
 
 # Global instance - will be initialized when needed
 ai_service = None
+_ai_service_lock = threading.Lock()
 
 def get_ai_service():
-    """Get or create the AI service instance"""
+    """Get the process-wide AI service instance, creating it on first use"""
     global ai_service
-    # Always create a fresh instance to ensure proper configuration
-    ai_service = AIService()
-    logger.info(f"AI Service initialized - Enabled: {ai_service.enabled}, Model: {ai_service.model_name}")
+    if ai_service is None:
+        with _ai_service_lock:
+            if ai_service is None:
+                ai_service = AIService()
+                logger.info(f"AI Service initialized - Enabled: {ai_service.enabled}, Model: {ai_service.model_name}")
     return ai_service 
\ No newline at end of file
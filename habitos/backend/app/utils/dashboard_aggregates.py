@@ -0,0 +1,155 @@
+"""
+Set-based check-in aggregation for the dashboard
+"""
+
+from collections import defaultdict
+from datetime import date, timedelta
+from sqlalchemy import func, case, or_, desc
+from app import db
+from app.models.check_in import CheckIn
+from app.models.user_daily_rollup import UserDailyRollup
+from app.utils.schedule import expected_occurrences
+
+
+class DashboardAggregator:
+    """
+    Loads a user's recent check-ins and daily rollups in a fixed number of
+    queries and answers every dashboard question (chart, streak, completion
+    rate, moods) in memory, so the cost follows the days shown rather than the
+    user's check-in history.
+    """
+
+    def __init__(self, user_id, today=None):
+        self.user_id = user_id
+        self.today = today or date.today()
+
+        # habit_id -> set of dates in the window with a completed check-in
+        self.completed_dates = defaultdict(set)
+        # (habit_id, date) -> number of completed check-in rows
+        self.completed_counts = {}
+        # date -> number of completed check-in rows across all habits (chart window)
+        self.daily_completed = defaultdict(int)
+        # habit_id -> (completed, mood_rating) for today's check-in
+        self.today_status = {}
+        # mood ratings of the most recent check-ins (newest first)
+        self.recent_moods = []
+        # consecutive days up to today with any completed habit
+        self.streak = 0
+
+    def load(self, window_days=30, chart_days=7, mood_sample_size=20):
+        """
+        Run the queries and build the in-memory indexes
+
+        Args:
+            window_days (int): Days of per-habit completions to load (completion rate)
+            chart_days (int): Days of daily totals to load (chart)
+            mood_sample_size (int): Recent check-ins in the mood summary
+        """
+        completed_rows = func.sum(case((CheckIn.completed == True, 1), else_=0))
+
+        # One row per (habit, day) in the window: completed days plus today's check-ins
+        rows = db.session.query(
+            CheckIn.habit_id,
+            CheckIn.date,
+            completed_rows,
+            func.max(CheckIn.mood_rating)
+        ).filter(
+            CheckIn.user_id == self.user_id,
+            CheckIn.date >= self.today - timedelta(days=window_days),
+            CheckIn.date <= self.today,
+            or_(CheckIn.completed == True, CheckIn.date == self.today)
+        ).group_by(CheckIn.habit_id, CheckIn.date).all()
+
+        for habit_id, day, completed, mood in rows:
+            completed = int(completed or 0)
+            if completed:
+                self.completed_dates[habit_id].add(day)
+                self.completed_counts[(habit_id, day)] = completed
+            if day == self.today:
+                self.today_status[habit_id] = (completed > 0, mood)
+
+        # Totals across habits come from the per-day rollups, read newest
+        # first until both the chart window and the current streak are covered
+        chart_start = self.today - timedelta(days=chart_days - 1)
+        expected = self.today
+        for day, completed in UserDailyRollup.completed_days(self.user_id, self.today):
+            if day >= chart_start:
+                self.daily_completed[day] = completed
+            if day == expected:
+                self.streak += 1
+                expected -= timedelta(days=1)
+            elif day < chart_start:
+                break
+
+        # Mood summary only needs the latest ratings, not whole rows
+        self.recent_moods = [
+            mood for (mood,) in db.session.query(CheckIn.mood_rating)
+            .filter(CheckIn.user_id == self.user_id)
+            .order_by(desc(CheckIn.date), desc(CheckIn.id))
+            .limit(mood_sample_size)
+            .all()
+        ]
+
+        return self
+
+    def chart_data(self, days=7):
+        """Completed check-ins per day for the last N days (oldest first; N up to chart_days)"""
+        labels = []
+        data = []
+        for i in range(days - 1, -1, -1):
+            day = self.today - timedelta(days=i)
+            labels.append(day.strftime('%a'))
+            data.append(self.daily_completed.get(day, 0))
+        return labels, data
+
+    def current_streak(self):
+        """Consecutive days, counting back from today, with any completed habit"""
+        return self.streak
+
+    def completion_rate(self, habits, days=30):
+        """Completed vs expected check-ins for the given habits, capped at 100"""
+        start_date = self.today - timedelta(days=days)
+
+        total_expected = 0
+        total_completed = 0
+
+        for habit in habits:
+            total_expected += expected_occurrences(habit, start_date, self.today)
+            total_completed += sum(
+                self.completed_counts.get((habit.id, day), 0)
+                for day in self.completed_dates.get(habit.id, ())
+                if start_date <= day <= self.today
+            )
+
+        if total_expected > 0:
+            completion_rate = (total_completed / total_expected) * 100
+            return min(round(completion_rate), 100)
+        return 0
+
+    def mood_summary(self):
+        """Mood distribution over the most recent check-ins"""
+        mood_counts = {}
+        total_check_ins = len(self.recent_moods)
+
+        for mood in self.recent_moods:
+            if mood:
+                mood_counts[mood] = mood_counts.get(mood, 0) + 1
+
+        recent_moods = []
+        for mood, count in mood_counts.items():
+            percentage = round((count / total_check_ins) * 100) if total_check_ins > 0 else 0
+            recent_moods.append({
+                'mood': mood,
+                'count': count,
+                'percentage': percentage
+            })
+
+        # Sort by count descending; the most common mood is the "average"
+        recent_moods.sort(key=lambda x: x['count'], reverse=True)
+
+        return {
+            'recentMoods': recent_moods,
+            'averageMood': recent_moods[0]['mood'] if recent_moods else 'neutral',
+            'totalCheckIns': total_check_ins
+        }
+
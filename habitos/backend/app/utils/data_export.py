@@ -0,0 +1,133 @@
+"""
+Streaming user data export for HabitOS
+
+Serializes a user's data one row at a time from server-side cursors
+(yield_per), so memory stays flat however long the user's history is.
+"""
+
+import json
+import zlib
+from datetime import datetime
+from app import db
+from app.models.user import User
+from app.models.habit import Habit, serialize_habits
+from app.models.check_in import CheckIn
+from app.models.goal import Goal
+from app.models.journal_entry import JournalEntry
+
+
+class UserDataExporter:
+    """
+    Streams a user's export as NDJSON lines or as the same JSON document the
+    non-streaming export returns, in chunks of roughly chunk_size bytes.
+    """
+
+    def __init__(self, user, batch_size=1000, chunk_size=64 * 1024):
+        self.user = user
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.total_records = {'habits': 0, 'check_ins': 0, 'goals': 0, 'journal_entries': 0}
+
+    @classmethod
+    def for_user_id(cls, user_id, **kwargs):
+        """Exporter for a user id, or None if the user does not exist"""
+        user = db.session.get(User, user_id)
+        return cls(user, **kwargs) if user else None
+
+    def _habits(self):
+        # Habits are few per user; serialize them together to batch their counts
+        habits = Habit.query.filter_by(user_id=self.user.id).all()
+        yield from serialize_habits(habits, self.user.id)
+
+    def _check_ins(self):
+        query = CheckIn.query.filter_by(user_id=self.user.id).order_by(CheckIn.date, CheckIn.id)
+        for check_in in query.yield_per(self.batch_size):
+            yield check_in.to_dict()
+
+    def _goals(self):
+        query = Goal.query.filter_by(user_id=self.user.id).order_by(Goal.created_at, Goal.id)
+        for goal in query.yield_per(self.batch_size):
+            yield goal.to_dict()
+
+    def _journal_entries(self):
+        # with_mood() joins the check-in, so to_dict reads the mood rating
+        # without a query per entry
+        query = JournalEntry.with_mood().filter_by(
+            user_id=self.user.id
+        ).order_by(JournalEntry.entry_date, JournalEntry.id)
+        for entry in query.yield_per(self.batch_size):
+            yield entry.to_dict()
+
+    def _sections(self):
+        """(name, row iterator) for every exported entity type, counting rows"""
+        for name, rows in (
+            ('habits', self._habits()),
+            ('check_ins', self._check_ins()),
+            ('goals', self._goals()),
+            ('journal_entries', self._journal_entries()),
+        ):
+            yield name, self._counted(name, rows)
+
+    def _counted(self, name, rows):
+        for row in rows:
+            self.total_records[name] += 1
+            yield row
+
+    def ndjson(self):
+        """
+        One JSON object per line: an 'export' header with the user, one line
+        per record ({"type": ..., "data": ...}) and a closing 'summary' line.
+        """
+        def lines():
+            yield _dumps({'type': 'export', 'user': self.user.to_dict(), 'export_date': datetime.now().isoformat()}) + '\n'
+            for name, rows in self._sections():
+                for row in rows:
+                    yield _dumps({'type': name, 'data': row}) + '\n'
+            yield _dumps({'type': 'summary', 'total_records': self.total_records}) + '\n'
+
+        return self._buffered(lines())
+
+    def json(self):
+        """The {'export_data': {...}} document of the non-streaming export, streamed"""
+        def parts():
+            yield '{"export_data":{"user":' + _dumps(self.user.to_dict())
+            for name, rows in self._sections():
+                yield f',"{name}":['
+                for index, row in enumerate(rows):
+                    yield (',' if index else '') + _dumps(row)
+                yield ']'
+            yield ',"export_date":' + _dumps(datetime.now().isoformat())
+            yield ',"total_records":' + _dumps(self.total_records) + '}}'
+
+        return self._buffered(parts())
+
+    def _buffered(self, parts):
+        """Join small string parts into byte chunks of about chunk_size"""
+        buffer = []
+        size = 0
+        for part in parts:
+            buffer.append(part)
+            size += len(part)
+            if size >= self.chunk_size:
+                yield ''.join(buffer).encode('utf-8')
+                buffer = []
+                size = 0
+        if buffer:
+            yield ''.join(buffer).encode('utf-8')
+
+
+def gzip_chunks(chunks, level=6):
+    """
+    Gzip a byte-chunk stream. Each chunk is sync-flushed so compressed bytes
+    reach the client as they are produced instead of at the end.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def _dumps(value):
+    return json.dumps(value, separators=(',', ':'))
@@ -0,0 +1,213 @@
+"""
+Background AI enrichment of journal entries
+
+Creating or updating a journal entry queues an EnrichmentJob in the same
+transaction (enqueue_enrichment). EnrichmentWorker drains the queue: it
+claims jobs in batches, asks Gemini for one batch of insights per call
+under a rate limit, writes ai_insights/ai_summary/insights_generated_at
+and deletes the jobs. Failed batches are retried with backoff. The worker
+runs in-process (start/stop or drain) or on its own through
+scripts/run_enrichment_worker.py.
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from flask import current_app
+from app import db
+from app.models.enrichment_job import EnrichmentJob
+from app.models.journal_entry import JournalEntry
+from app.utils.ai_service import AIUnavailableError, get_ai_service
+
+logger = logging.getLogger(__name__)
+
+# Job latencies kept for the percentiles in stats()
+LATENCY_SAMPLES = 1000
+
+def enqueue_enrichment(entry):
+    """Queue AI insights for a created or updated journal entry, when enabled"""
+    if current_app.config.get('ENABLE_AI_INSIGHTS', False):
+        EnrichmentJob.enqueue(entry)
+
+class RateLimiter:
+    """Blocks callers so acquire() succeeds at most rate times per second (token bucket)"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+class EnrichmentWorker:
+    """
+    Pool of threads draining the enrichment queue
+
+    Every job is idempotent: claims are conditional updates, results only
+    overwrite the entry's AI columns, and they are only written if the
+    entry is unchanged since the batch read it (an edit queues a new job),
+    so a retried or reclaimed job can never store insights for old content.
+    """
+
+    def __init__(self, app, ai_service=None, batch_size=None, concurrency=None, rate_limit=None,
+                 max_attempts=None, retry_backoff=None, lease_seconds=None, poll_interval=None):
+        config = app.config
+        self.app = app
+        self.ai_service = ai_service
+        self.batch_size = batch_size or config.get('ENRICHMENT_BATCH_SIZE', 10)
+        self.concurrency = concurrency or config.get('ENRICHMENT_WORKERS', 2)
+        self.max_attempts = max_attempts or config.get('ENRICHMENT_MAX_ATTEMPTS', 5)
+        self.retry_backoff = retry_backoff if retry_backoff is not None else config.get('ENRICHMENT_RETRY_BACKOFF', 30)
+        self.lease_seconds = lease_seconds or config.get('ENRICHMENT_LEASE_SECONDS', 300)
+        self.poll_interval = poll_interval or config.get('ENRICHMENT_POLL_INTERVAL', 5)
+        # Gemini calls (one per batch) per second, shared by the pool's threads
+        self.rate_limiter = RateLimiter(rate_limit or config.get('ENRICHMENT_RATE_LIMIT', 0.5))
+
+        self._stop = threading.Event()
+        self._threads = []
+        self._stats_lock = threading.Lock()
+        self._counts = dict.fromkeys(('batches', 'enriched', 'stale', 'retried', 'failed'), 0)
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        app.extensions['enrichment_worker'] = self
+
+    def start(self):
+        """Start the worker threads"""
+        self._stop.clear()
+        for i in range(self.concurrency):
+            thread = threading.Thread(target=self._loop, name=f'enrichment-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Enrichment worker started with {self.concurrency} threads, batches of {self.batch_size}")
+
+    def stop(self, timeout=None):
+        """Stop the worker threads after their current batch"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                processed = self.run_once()
+            except Exception as e:
+                logger.error(f"Enrichment batch failed: {e}")
+                processed = 0
+            if not processed:
+                self._stop.wait(self.poll_interval)
+
+    def drain(self):
+        """Process due jobs on the calling thread until none are left. Returns the number processed."""
+        total = 0
+        while True:
+            processed = self.run_once()
+            if not processed:
+                return total
+            total += processed
+
+    def run_once(self):
+        """Claim and process one batch. Returns the number of jobs claimed."""
+        with self.app.app_context():
+            try:
+                jobs = EnrichmentJob.claim(self.batch_size, self.lease_seconds)
+                if jobs:
+                    self._process(jobs)
+                return len(jobs)
+            finally:
+                db.session.remove()
+
+    def _process(self, jobs):
+        entries = {entry.id: entry for entry in JournalEntry.query.filter(
+            JournalEntry.id.in_({job.entry_id for job in jobs})
+        )}
+        # Read what the batch needs, then end the transaction before calling Gemini
+        snapshots = {entry_id: (entry.content, entry.updated_at) for entry_id, entry in entries.items()}
+        job_ids = [job.id for job in jobs]
+        created = {job.id: job.created_at for job in jobs}
+        db.session.commit()
+
+        entry_ids = list(snapshots)
+        try:
+            insights = []
+            if entry_ids:
+                self.rate_limiter.acquire()
+                ai_service = self.ai_service or get_ai_service()
+                insights = ai_service.generate_entry_insights([snapshots[entry_id][0] for entry_id in entry_ids])
+        except AIUnavailableError as e:
+            self._retry(job_ids, e)
+            return
+
+        now = datetime.now(timezone.utc)
+        stale = 0
+        for entry_id, insight in zip(entry_ids, insights):
+            if not JournalEntry.store_insights(entry_id, snapshots[entry_id][1], insight, now):
+                stale += 1
+        # Jobs of deleted or since-edited entries are done too; edits queued their own job
+        EnrichmentJob.query.filter(EnrichmentJob.id.in_(job_ids)).delete(synchronize_session=False)
+        db.session.commit()
+
+        with self._stats_lock:
+            self._counts['batches'] += 1
+            self._counts['enriched'] += len(entry_ids) - stale
+            self._counts['stale'] += stale + len(job_ids) - len(entry_ids)
+            for created_at in created.values():
+                if created_at.tzinfo is None:
+                    created_at = created_at.replace(tzinfo=timezone.utc)
+                self._latencies.append((now - created_at).total_seconds())
+
+    def _retry(self, job_ids, error):
+        logger.warning(f"Enrichment batch of {len(job_ids)} jobs failed, retrying later: {error}")
+        jobs = EnrichmentJob.query.filter(EnrichmentJob.id.in_(job_ids)).all()
+        for job in jobs:
+            job.retry_or_fail(error, self.max_attempts, self.retry_backoff)
+        db.session.commit()
+        failed = sum(1 for job in jobs if job.status == EnrichmentJob.FAILED)
+        with self._stats_lock:
+            self._counts['failed'] += failed
+            self._counts['retried'] += len(jobs) - failed
+
+    def stats(self):
+        """Queue depth and, for jobs completed by this process, counts and enqueue-to-done latency"""
+        with self._stats_lock:
+            counts = dict(self._counts)
+            latencies = sorted(self._latencies)
+        if latencies:
+            latency = {
+                'avg_seconds': round(sum(latencies) / len(latencies), 3),
+                'p50_seconds': round(latencies[len(latencies) // 2], 3),
+                'p95_seconds': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+                'max_seconds': round(latencies[-1], 3)
+            }
+        else:
+            latency = {}
+        with self.app.app_context():
+            depth = queue_depth()
+        return {
+            'running': bool(self._threads),
+            'depth': depth,
+            **counts,
+            'latency': latency
+        }
+
+def queue_depth():
+    """Job counts by status across all workers, or None if the table can't be read"""
+    try:
+        return EnrichmentJob.depth()
+    except Exception as e:
+        logger.error(f"Enrichment queue depth lookup failed: {e}")
+        db.session.rollback()
+        return None
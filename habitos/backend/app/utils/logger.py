@@ -3,11 +3,15 @@ Logging configuration and utilities for HabitOS
 """
 
 import os
+import time
 import logging
 import logging.handlers
-from datetime import datetime
+from datetime import datetime, timezone
 from flask import request, g, has_app_context
 import json
+from app.utils import tracing
+
+performance_logger = logging.getLogger('performance')
 
 class RequestFormatter(logging.Formatter):
     """Custom formatter that includes request information"""
@@ -35,13 +39,15 @@ class RequestFormatter(logging.Formatter):
 def setup_logging(app):
     """Setup logging configuration for the application"""
     
+    log_file = app.config.get('LOG_FILE')
+    
     # Create logs directory if it doesn't exist
-    log_dir = os.path.dirname(app.config['LOG_FILE'])
+    log_dir = os.path.dirname(log_file) if log_file else None
     if log_dir and not os.path.exists(log_dir):
         os.makedirs(log_dir)
     
     # Set log level
-    log_level = getattr(logging, app.config['LOG_LEVEL'].upper(), logging.INFO)
+    log_level = getattr(logging, app.config.get('LOG_LEVEL', 'INFO').upper(), logging.INFO)
     
     # Create formatters
     detailed_formatter = RequestFormatter(
@@ -53,30 +59,32 @@ def setup_logging(app):
         '%(asctime)s [%(levelname)s] %(name)s:%(lineno)d - %(message)s'
     )
     
-    # File handler with rotation
-    file_handler = logging.handlers.RotatingFileHandler(
-        app.config['LOG_FILE'],
-        maxBytes=app.config['LOG_MAX_SIZE'],
-        backupCount=app.config['LOG_BACKUP_COUNT']
-    )
-    file_handler.setFormatter(detailed_formatter)
-    file_handler.setLevel(log_level)
-    
-    # Console handler
+    # Console handler, plus a rotating file handler when LOG_FILE is set
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(simple_formatter)
     console_handler.setLevel(log_level)
+    handlers = [console_handler]
+    
+    if log_file:
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file,
+            maxBytes=app.config.get('LOG_MAX_SIZE', 10 * 1024 * 1024),
+            backupCount=app.config.get('LOG_BACKUP_COUNT', 10)
+        )
+        file_handler.setFormatter(detailed_formatter)
+        file_handler.setLevel(log_level)
+        handlers.append(file_handler)
     
     # Configure root logger
     root_logger = logging.getLogger()
     root_logger.setLevel(log_level)
-    root_logger.addHandler(file_handler)
-    root_logger.addHandler(console_handler)
+    for handler in handlers:
+        root_logger.addHandler(handler)
     
     # Configure Flask logger
     app.logger.handlers.clear()  # Remove default handlers
-    app.logger.addHandler(file_handler)
-    app.logger.addHandler(console_handler)
+    for handler in handlers:
+        app.logger.addHandler(handler)
     app.logger.setLevel(log_level)
     
     # Configure SQLAlchemy logger
@@ -140,33 +148,45 @@ def log_user_action(user_id, action, details=None):
     
     logger.info(f"User action: {json.dumps(action_data, indent=2)}")
 
-def log_performance(operation, duration, details=None):
-    """Log performance metrics"""
-    logger = logging.getLogger('performance')
+def log_performance(operation, duration, details=None, logger=None):
+    """Log performance metrics as one line of JSON, built only when INFO is enabled"""
+    logger = logger or performance_logger
+    if not logger.isEnabledFor(logging.INFO):
+        return
     
     perf_data = {
         'operation': operation,
         'duration_ms': round(duration * 1000, 2),
-        'timestamp': datetime.utcnow().isoformat(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
         'details': details or {}
     }
     
-    logger.info(f"Performance metric: {json.dumps(perf_data, indent=2)}")
+    logger.info(f"Performance metric: {json.dumps(perf_data, default=str)}")
 
 # Context manager for timing operations
 class PerformanceTimer:
-    """Context manager for timing operations"""
+    """
+    Context manager for timing operations with the monotonic clock
+    
+    The operation also runs in a tracing span (app/utils/tracing.py), so it
+    shows up nested in the request's trace when tracing is on.
+    """
     
-    def __init__(self, operation, logger=None):
+    def __init__(self, operation, logger=None, details=None):
         self.operation = operation
-        self.logger = logger or logging.getLogger('performance')
-        self.start_time = None
+        self.logger = logger or performance_logger
+        self.details = details
+        self.duration = None
+        self._span = None
+        self._start_ns = None
     
     def __enter__(self):
-        self.start_time = datetime.utcnow()
+        self._span = tracing.span(self.operation).start()
+        self._start_ns = time.perf_counter_ns()
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
-        if self.start_time:
-            duration = (datetime.utcnow() - self.start_time).total_seconds()
-            log_performance(self.operation, duration) 
\ No newline at end of file
+        self.duration = (time.perf_counter_ns() - self._start_ns) / 1e9
+        self._span.finish(exc_val)
+        log_performance(self.operation, self.duration, self.details, logger=self.logger)
+        return False 
\ No newline at end of file
@@ -0,0 +1,336 @@
+"""
+In-process Prometheus metrics for HabitOS
+
+A small registry of counters, gauges and fixed-bucket histograms, rendered
+in the Prometheus text exposition format (version 0.0.4) by GET /metrics.
+Metrics are module-level objects so any code can record into them without
+an app: request duration and DB queries per request are recorded by
+app.utils.monitoring.RequestMetricsMiddleware, AI call latency by
+GeminiExecutor, cache hits and misses by the response and AI caches, and
+sampled span durations by app.utils.tracing when tracing exports to metrics.
+Cache hit ratios are computed at query time from the hit/miss counters.
+
+With METRICS_MULTIPROC_DIR set (one directory shared by all gunicorn
+workers, emptied before the server starts), every process writes a
+snapshot of its metrics to <dir>/metrics_<pid>.json every
+METRICS_SYNC_INTERVAL_MS and when it exits, and a scrape served by any
+worker merges all snapshots: counters and histograms are summed over every
+process that ever ran, gauges over the processes still alive. Other
+workers' values are then up to one sync interval old.
+"""
+
+import os
+import json
+import time
+import atexit
+import bisect
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def format_value(value):
+    """A sample value or bucket bound as Prometheus writes it"""
+    if value == float('inf'):
+        return '+Inf'
+    if value == float('-inf'):
+        return '-Inf'
+    if value != value:
+        return 'NaN'
+    return repr(float(value))
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def escape_help(text):
+    return text.replace('\\', '\\\\').replace('\n', '\\n')
+
+def format_labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in zip(names, values)) + '}'
+
+class Metric:
+    """A named metric with label names; each combination of label values is one series"""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.registry = registry if registry is not None else REGISTRY
+        self._values = {}
+        self.registry.register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self):
+        """JSON-serializable state: [[label values, value], ...]"""
+        with self.registry.lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    def reset(self):
+        with self.registry.lock:
+            self._values.clear()
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        self.registry.touch()
+        with self.registry.lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(Metric):
+    """A value that goes up and down; merged across processes by summing the live ones"""
+
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        self.registry.touch()
+        with self.registry.lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        self.registry.touch()
+        with self.registry.lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram(Metric):
+    """Observations counted into fixed buckets; a series' value is [per-bucket counts, sum, count]"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        self.registry.touch()
+        with self.registry.lock:
+            series = self._values.get(key)
+            if series is None:
+                # Not cumulative; the last count is for the +Inf bucket
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self):
+        with self.registry.lock:
+            return [[list(key), [list(series[0]), series[1], series[2]]] for key, series in self._values.items()]
+
+class MetricsRegistry:
+    """The metrics of this process, and in multiprocess mode the snapshots of every worker"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+        self.multiproc_dir = None
+        self.sync_interval = 1.0
+        self._pid = os.getpid()
+        self._thread = None
+        self._stop = threading.Event()
+        self._exit_hook = False
+
+    def register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+
+    def configure(self, app):
+        """Apply METRICS_MULTIPROC_DIR and METRICS_SYNC_INTERVAL_MS and start syncing when set"""
+        self.multiproc_dir = app.config.get('METRICS_MULTIPROC_DIR') or None
+        self.sync_interval = app.config.get('METRICS_SYNC_INTERVAL_MS', 1000) / 1000
+        if self.multiproc_dir:
+            os.makedirs(self.multiproc_dir, exist_ok=True)
+            self._start_sync()
+
+    def touch(self):
+        """Called before every write: after a fork, start over with this process's own values and sync thread"""
+        if self._pid != os.getpid():
+            with self.lock:
+                if self._pid == os.getpid():
+                    return
+                self._pid = os.getpid()
+                # The parent keeps reporting what it recorded before the fork
+                for metric in self.metrics.values():
+                    metric._values.clear()
+                self._thread = None
+            if self.multiproc_dir:
+                self._start_sync()
+
+    def _start_sync(self):
+        with self.lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._sync_loop, name='metrics-sync', daemon=True)
+            self._thread.start()
+            if not self._exit_hook:
+                atexit.register(self.stop)
+                self._exit_hook = True
+
+    def _sync_loop(self):
+        while not self._stop.wait(self.sync_interval):
+            self.sync()
+
+    def stop(self):
+        """Stop syncing and write this process's final snapshot"""
+        self._stop.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(5)
+        self._thread = None
+        self.sync()
+
+    def snapshot(self):
+        """This process's metrics as JSON-serializable data"""
+        return {
+            name: {
+                'kind': metric.kind,
+                'help': metric.documentation,
+                'labelnames': list(metric.labelnames),
+                'buckets': list(getattr(metric, 'buckets', ())),
+                'values': metric.snapshot()
+            }
+            for name, metric in self.metrics.items()
+        }
+
+    def _snapshot_path(self, pid):
+        return os.path.join(self.multiproc_dir, f'metrics_{pid}.json')
+
+    def sync(self):
+        """Write this process's snapshot to the multiprocess directory"""
+        if not self.multiproc_dir:
+            return
+        path = self._snapshot_path(os.getpid())
+        temp_path = f'{path}.tmp'
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump({'pid': os.getpid(), 'written_at': time.time(), 'metrics': self.snapshot()}, f)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.error(f"Failed to write metrics snapshot {path}: {e}")
+
+    def collect(self):
+        """Snapshot of this process, or merged over all processes in multiprocess mode"""
+        if not self.multiproc_dir:
+            return self.snapshot()
+
+        self.sync()
+        snapshots = []
+        for filename in os.listdir(self.multiproc_dir):
+            if not (filename.startswith('metrics_') and filename.endswith('.json')):
+                continue
+            try:
+                with open(os.path.join(self.multiproc_dir, filename)) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError) as e:
+                logger.error(f"Skipping unreadable metrics snapshot {filename}: {e}")
+        return merge_snapshots(snapshots)
+
+    def expose(self):
+        """All metrics in the Prometheus text format"""
+        return render(self.collect())
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def merge_snapshots(snapshots):
+    """Sum counters and histograms over all snapshots and gauges over live processes"""
+    merged = {}
+    for snapshot in snapshots:
+        alive = _pid_alive(snapshot['pid'])
+        for name, metric in snapshot['metrics'].items():
+            target = merged.setdefault(name, {**metric, 'values': {}})
+            if metric['kind'] == 'gauge' and not alive:
+                continue
+            for labels, value in metric['values']:
+                key = tuple(labels)
+                current = target['values'].get(key)
+                if metric['kind'] == 'histogram':
+                    if current is None:
+                        current = target['values'][key] = [[0] * len(value[0]), 0.0, 0]
+                    current[0] = [a + b for a, b in zip(current[0], value[0])]
+                    current[1] += value[1]
+                    current[2] += value[2]
+                else:
+                    target['values'][key] = (current or 0) + value
+    for metric in merged.values():
+        metric['values'] = [[list(key), value] for key, value in metric['values'].items()]
+    return merged
+
+def render(snapshot):
+    """Prometheus text exposition of a snapshot"""
+    lines = []
+    for name in sorted(snapshot):
+        metric = snapshot[name]
+        names = metric['labelnames']
+        lines.append(f"# HELP {name} {escape_help(metric['help'])}")
+        lines.append(f"# TYPE {name} {metric['kind']}")
+        for labels, value in sorted(metric['values'], key=lambda item: item[0]):
+            if metric['kind'] != 'histogram':
+                lines.append(f"{name}{format_labels(names, labels)} {format_value(value)}")
+                continue
+            counts, total, count = value
+            cumulative = 0
+            for bound, bucket_count in zip(list(metric['buckets']) + [float('inf')], counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{format_labels(names + ['le'], labels + [format_value(bound)])} "
+                             f"{format_value(cumulative)}")
+            lines.append(f"{name}_sum{format_labels(names, labels)} {format_value(total)}")
+            lines.append(f"{name}_count{format_labels(names, labels)} {format_value(count)}")
+    return '\n'.join(lines) + '\n'
+
+REGISTRY = MetricsRegistry()
+
+# Requests
+HTTP_REQUESTS = Counter('habitos_http_requests_total', 'HTTP requests by route pattern, method and status',
+                        ['method', 'endpoint', 'status'])
+HTTP_REQUEST_DURATION = Histogram('habitos_http_request_duration_seconds', 'HTTP request duration by route pattern',
+                                  ['method', 'endpoint'])
+
+# Database, per request
+DB_QUERIES_PER_REQUEST = Histogram('habitos_db_queries_per_request', 'SQL statements executed per request',
+                                   ['endpoint'], buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200))
+DB_QUERY_TIME_PER_REQUEST = Histogram('habitos_db_query_seconds_per_request', 'Time spent in SQL statements per request',
+                                      ['endpoint'])
+
+# Gemini
+AI_CALL_DURATION = Histogram('habitos_ai_call_duration_seconds', 'Gemini call duration including 429 retries',
+                             ['outcome'], buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0, 30.0, 60.0))
+AI_CALLS_REJECTED = Counter('habitos_ai_calls_rejected_total', 'Gemini calls failed without an answer',
+                            ['reason'])
+AI_CALLS_IN_FLIGHT = Gauge('habitos_ai_calls_in_flight', 'Gemini calls running')
+
+# Caches
+CACHE_REQUESTS = Counter('habitos_cache_requests_total', 'Cache lookups by cache and result (hit or miss)',
+                         ['cache', 'result'])
+
+# Tracing (app/utils/tracing.py), sampled spans only
+SPAN_DURATION = Histogram('habitos_span_duration_seconds', 'Duration of sampled trace spans by span name', ['span'])
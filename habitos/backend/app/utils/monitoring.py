@@ -2,14 +2,21 @@
 Monitoring and health check utilities for HabitOS
 """
 
+import os
 import time
+import atexit
+import bisect
 import psutil
 import logging
+import threading
+from collections import defaultdict
 from datetime import datetime, timedelta
-from flask import current_app, jsonify
-from sqlalchemy import text
+from flask import current_app, jsonify, request, g, has_request_context
+from sqlalchemy import text, event
 import redis
 import requests
+from app.utils import metrics
+from app.utils.metrics import LATENCY_BUCKETS
 
 logger = logging.getLogger(__name__)
 
@@ -186,12 +193,40 @@ class HealthChecker:
         }
 
 class MetricsCollector:
-    """Collect and store application metrics"""
+    """
+    Collect and store application metrics
+
+    Request metrics are aggregated in-process and written to Redis by a
+    background thread in one MULTI/EXEC pipeline, every flush_every requests
+    or flush_interval_ms milliseconds, so recording a request never touches
+    the network. Latencies go into fixed histogram buckets: the hash
+    latency:{date}:{method}:{endpoint} holds a count per bucket upper bound
+    (not cumulative, '+Inf' for the rest) plus 'count' and 'sum'. A batch
+    that fails to write is kept for the next flush, and the buffer is
+    flushed once more when the process exits.
+    """
     
-    def __init__(self, app):
+    def __init__(self, app, redis_client=None):
         self.app = app
-        self.redis_client = None
-        self._init_redis()
+        self.redis_client = redis_client
+        self.flush_every = app.config.get('METRICS_FLUSH_EVERY', 100)
+        self.flush_interval = app.config.get('METRICS_FLUSH_INTERVAL_MS', 1000) / 1000
+        self.retention = app.config.get('METRICS_RETENTION_DAYS', 30) * 86400
+        if self.redis_client is None:
+            self._init_redis()
+        
+        self._lock = threading.Lock()
+        self._counts = defaultdict(int)  # (hash key, field) -> HINCRBY amount
+        self._sums = defaultdict(float)  # (hash key, field) -> HINCRBYFLOAT amount
+        self._pending = 0  # Requests in the buffer
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._exit_hook = False
+        self._stats = dict.fromkeys(('recorded', 'flushed', 'flushes', 'failed_flushes'), 0)
+        app.extensions['metrics_collector'] = self
     
     def _init_redis(self):
         """Initialize Redis connection for metrics storage"""
@@ -206,29 +241,138 @@ class MetricsCollector:
             except Exception as e:
                 logger.warning(f"Redis connection for metrics failed: {e}")
     
+    def start(self):
+        """Start the flush thread; record_request_metric calls this in a new (or forked) process"""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                # Forked: the parent flushes what it buffered, and its thread didn't come along
+                self._counts.clear()
+                self._sums.clear()
+                self._pending = 0
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name='metrics-flush', daemon=True)
+            self._thread.start()
+            if not self._exit_hook:
+                atexit.register(self.stop)
+                self._exit_hook = True
+    
+    def stop(self, timeout=5):
+        """Stop the flush thread and flush what is left"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout)
+        self._thread = None
+        self._pid = None
+        self.flush()
+        with self._lock:
+            if self._pending:
+                logger.error(f"Dropped metrics of {self._pending} requests on shutdown")
+    
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+    
     def record_request_metric(self, endpoint, method, status_code, duration):
-        """Record request metrics"""
+        """Record request metrics (buffered; see flush)"""
         if not self.redis_client:
             return
+        if self._pid != os.getpid():
+            self.start()
         
-        try:
-            timestamp = datetime.utcnow()
-            date_key = timestamp.strftime('%Y-%m-%d')
-            hour_key = timestamp.strftime('%Y-%m-%d:%H')
-            
-            # Record request count
-            self.redis_client.hincrby(f"requests:{date_key}", f"{method}:{endpoint}", 1)
-            self.redis_client.hincrby(f"requests:{hour_key}", f"{method}:{endpoint}", 1)
-            
-            # Record response times
-            self.redis_client.lpush(f"response_times:{date_key}:{method}:{endpoint}", duration)
-            self.redis_client.ltrim(f"response_times:{date_key}:{method}:{endpoint}", 0, 999)  # Keep last 1000
+        timestamp = datetime.utcnow()
+        date_key = timestamp.strftime('%Y-%m-%d')
+        hour_key = timestamp.strftime('%Y-%m-%d:%H')
+        route = f"{method}:{endpoint}"
+        latency_key = f"latency:{date_key}:{route}"
+        index = bisect.bisect_left(LATENCY_BUCKETS, duration)
+        bucket = str(LATENCY_BUCKETS[index]) if index < len(LATENCY_BUCKETS) else '+Inf'
+        
+        with self._lock:
+            counts = self._counts
+            counts[(f"requests:{date_key}", route)] += 1
+            counts[(f"requests:{hour_key}", route)] += 1
+            counts[(f"status_codes:{date_key}", str(status_code))] += 1
+            counts[(latency_key, bucket)] += 1
+            counts[(latency_key, 'count')] += 1
+            self._sums[(latency_key, 'sum')] += duration
+            self._pending += 1
+            self._stats['recorded'] += 1
+            pending = self._pending
+        if pending >= self.flush_every:
+            self._wake.set()
+    
+    def flush(self):
+        """Write the buffered request metrics to Redis in one pipeline. Returns the number of requests written."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                counts, sums, pending = self._counts, self._sums, self._pending
+                self._counts, self._sums, self._pending = defaultdict(int), defaultdict(float), 0
             
-            # Record status codes
-            self.redis_client.hincrby(f"status_codes:{date_key}", str(status_code), 1)
+            try:
+                # MULTI/EXEC, so a failed batch was applied entirely or not at all
+                pipe = self.redis_client.pipeline(transaction=True)
+                for (key, field), amount in counts.items():
+                    pipe.hincrby(key, field, amount)
+                for (key, field), amount in sums.items():
+                    pipe.hincrbyfloat(key, field, amount)
+                for key in {key for key, _ in counts}:
+                    pipe.expire(key, self.retention)
+                pipe.execute()
+            except Exception as e:
+                logger.error(f"Failed to flush metrics of {pending} requests, keeping them for the next flush: {e}")
+                with self._lock:
+                    for item, amount in counts.items():
+                        self._counts[item] += amount
+                    for item, amount in sums.items():
+                        self._sums[item] += amount
+                    self._pending += pending
+                    self._stats['failed_flushes'] += 1
+                return 0
             
+            with self._lock:
+                self._stats['flushed'] += pending
+                self._stats['flushes'] += 1
+            return pending
+    
+    def stats(self):
+        """Requests recorded and flushed by this process, and the buffer size"""
+        with self._lock:
+            return {
+                **self._stats,
+                'pending': self._pending,
+                'running': self._thread is not None and self._thread.is_alive()
+            }
+    
+    def get_latency_histogram(self, method, endpoint, date=None):
+        """Cumulative latency buckets, count and sum for one endpoint on one day (default today)"""
+        if not self.redis_client:
+            return {}
+        
+        date = date or datetime.utcnow().strftime('%Y-%m-%d')
+        try:
+            values = self.redis_client.hgetall(f"latency:{date}:{method}:{endpoint}")
         except Exception as e:
-            logger.error(f"Failed to record request metric: {e}")
+            logger.error(f"Failed to get latency histogram: {e}")
+            return {}
+        
+        buckets = {}
+        total = 0
+        for bound in [str(b) for b in LATENCY_BUCKETS] + ['+Inf']:
+            total += int(values.get(bound, 0))
+            buckets[bound] = total
+        return {
+            'buckets': buckets,
+            'count': int(values.get('count', 0)),
+            'sum': float(values.get('sum', 0))
+        }
     
     def record_user_action(self, user_id, action, details=None):
         """Record user action metrics"""
@@ -280,6 +424,55 @@ class MetricsCollector:
             logger.error(f"Failed to get metrics summary: {e}")
             return {}
 
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'db_query_count' in g:
+        conn.info.setdefault('request_query_started_at', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('request_query_started_at')
+    if started and has_request_context() and 'db_query_count' in g:
+        g.db_query_count += 1
+        g.db_query_time += time.perf_counter() - started.pop()
+
+class RequestMetricsMiddleware:
+    """
+    Times every request and records it with the app's MetricsCollector
+    (Redis) and in the Prometheus metrics of app.utils.metrics, along with
+    the number of SQL statements the request ran and the time spent in them
+    """
+    
+    def __init__(self, app, collector=None):
+        self.app = app
+        self.collector = collector or MetricsCollector(app)
+        app.before_request(self._start_timer)
+        app.after_request(self._record)
+        if 'sqlalchemy' in app.extensions:
+            from app import db
+            with app.app_context():
+                engine = db.engine
+            if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+                event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+                event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+        app.extensions['request_metrics'] = self
+    
+    def _start_timer(self):
+        g.request_started_at = time.perf_counter()
+        g.db_query_count = 0
+        g.db_query_time = 0.0
+    
+    def _record(self, response):
+        started_at = g.get('request_started_at')
+        if started_at is not None:
+            duration = time.perf_counter() - started_at
+            # The route pattern, not the path, so ids don't make a series per resource
+            endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+            self.collector.record_request_metric(endpoint, request.method, response.status_code, duration)
+            metrics.HTTP_REQUESTS.inc(method=request.method, endpoint=endpoint, status=response.status_code)
+            metrics.HTTP_REQUEST_DURATION.observe(duration, method=request.method, endpoint=endpoint)
+            metrics.DB_QUERIES_PER_REQUEST.observe(g.db_query_count, endpoint=endpoint)
+            metrics.DB_QUERY_TIME_PER_REQUEST.observe(g.db_query_time, endpoint=endpoint)
+        return response
+
 def create_health_check_blueprint():
     """Create Flask blueprint for health check endpoints"""
     from flask import Blueprint
@@ -303,8 +496,13 @@ def create_health_check_blueprint():
     
     @health_bp.route('/metrics')
     def get_metrics():
-        """Get application metrics"""
-        collector = MetricsCollector(current_app)
+        """Application metrics in the Prometheus text format"""
+        return current_app.response_class(metrics.REGISTRY.expose(), content_type=metrics.CONTENT_TYPE)
+    
+    @health_bp.route('/metrics/summary')
+    def get_metrics_summary():
+        """Daily request, status code and user action counts from Redis"""
+        collector = current_app.extensions.get('metrics_collector') or MetricsCollector(current_app)
         return jsonify(collector.get_metrics_summary())
     
     return health_bp 
\ No newline at end of file
@@ -0,0 +1,88 @@
+"""
+Keyset (cursor) pagination for HabitOS list endpoints
+
+Pages are ordered newest first on (sort column, id) and continue from the
+last row of the previous page, so every page is a bounded index range scan
+instead of an OFFSET that re-reads all earlier rows.
+"""
+
+import base64
+import json
+from datetime import date, datetime
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(sort_value, row_id):
+    """Opaque cursor for the row a page ended on"""
+    payload = json.dumps([sort_value.isoformat(), row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort_type):
+    """
+    Decode a cursor into (sort_value, row_id)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if sort_type is datetime:
+            return datetime.fromisoformat(sort_value), str(row_id)
+        return date.fromisoformat(sort_value), str(row_id)
+    except (ValueError, TypeError, UnicodeError, json.JSONDecodeError):
+        raise ValueError('Invalid cursor')
+
+
+def parse_page_args(args):
+    """
+    Read pagination query parameters
+
+    Returns:
+        tuple: (paginate, limit, cursor) where paginate is False when the
+            caller asked for the legacy unpaginated response (paginate=false)
+
+    Raises:
+        ValueError: If limit is not a positive integer
+    """
+    paginate = args.get('paginate', 'true').lower() != 'false'
+    try:
+        limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    if limit < 1:
+        raise ValueError('limit must be at least 1')
+    return paginate, min(limit, MAX_PAGE_SIZE), args.get('cursor')
+
+
+def keyset_page(query, sort_column, id_column, limit, cursor=None, sort_type=date):
+    """
+    Fetch one page of query ordered by (sort_column, id_column) descending
+
+    Args:
+        query: Filtered query to paginate
+        sort_column: Column the endpoint orders by (a date or datetime)
+        id_column: Primary key column used as the tie-breaker
+        limit (int): Page size
+        cursor (str): next_cursor from the previous page, if any
+        sort_type: date or datetime, the Python type of sort_column
+
+    Returns:
+        tuple: (rows, next_cursor) where next_cursor is None on the last page
+    """
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor, sort_type)
+        query = query.filter(tuple_(sort_column, id_column) < tuple_(sort_value, row_id))
+
+    rows = query.order_by(sort_column.desc(), id_column.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+    return rows, next_cursor
@@ -0,0 +1,175 @@
+"""
+Per-request SQL query profiling and N+1 detection
+
+QueryProfiler (enabled by QUERY_PROFILER_ENABLED) records every SQL
+statement a request runs, through SQLAlchemy cursor events: the count, the
+total time in the database and how often each statement shape (the SQL
+with literals and IN lists normalized) repeated. When one shape runs more
+than QUERY_PROFILER_REPEAT_THRESHOLD times in a request it logs a warning
+naming the route and the statement, which is what a per-row query loop
+looks like; with QUERY_PROFILER_SERVER_TIMING it also adds a Server-Timing
+header so the browser's network panel shows the database share of each
+response.
+
+profile_queries and assert_max_queries do the same outside requests, for
+scripts and tests; scripts/pytest_plugin.py wraps the latter as a pytest
+fixture.
+"""
+
+import re
+import time
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Profiles recording on the current thread (a request's and any profile_queries blocks)
+_active = threading.local()
+_install_lock = threading.Lock()
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%\(\w+\)s|%s|:\w+|\$\d+|\?')
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*\?\s*,?)+\)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+_SELECT_LIST = re.compile(r'^SELECT .+? FROM ')
+
+def normalize_statement(statement):
+    """The shape of a SQL statement: literals and placeholders as ?, IN lists as IN (...), whitespace collapsed"""
+    shape = _STRING_LITERAL.sub('?', statement)
+    shape = _NUMBER_LITERAL.sub('?', shape)
+    shape = _PLACEHOLDER.sub('?', shape)
+    shape = _IN_LIST.sub('IN (...)', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+def abbreviate(shape, length=300):
+    """A shape for messages: the column list of a SELECT elided, then cut to length"""
+    return _SELECT_LIST.sub('SELECT ... FROM ', shape)[:length]
+
+class QueryProfile:
+    """Statements recorded while the profile was active"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.statements = []  # (statement, parameters, seconds), in order
+        self.shapes = Counter()
+
+    def record(self, statement, duration, parameters=None):
+        self.count += 1
+        self.total_time += duration
+        self.statements.append((statement, parameters, duration))
+        self.shapes[normalize_statement(statement)] += 1
+
+    def repeated(self, threshold):
+        """(shape, count) of the shapes run more than threshold times, most repeated first"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > threshold]
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'total_time_ms': round(self.total_time * 1000, 2),
+            'distinct_statements': len(self.shapes),
+            'most_repeated': self.shapes.most_common(5)
+        }
+
+def _profiles():
+    profiles = getattr(_active, 'profiles', None)
+    if profiles is None:
+        profiles = _active.profiles = []
+    return profiles
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if getattr(_active, 'profiles', None):
+        conn.info.setdefault('query_profiler_started_at', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profiles = getattr(_active, 'profiles', None)
+    started = conn.info.get('query_profiler_started_at')
+    if profiles and started:
+        duration = time.perf_counter() - started.pop()
+        for profile in profiles:
+            profile.record(statement, duration, parameters)
+
+def install():
+    """Listen to the cursor events of every engine; statements are only recorded while a profile is active"""
+    with _install_lock:
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+@contextmanager
+def profile_queries():
+    """Record the statements run on this thread inside the block: with profile_queries() as profile: ..."""
+    install()
+    profile = QueryProfile()
+    _profiles().append(profile)
+    try:
+        yield profile
+    finally:
+        _profiles().remove(profile)
+
+@contextmanager
+def assert_max_queries(limit, label='block'):
+    """Raise AssertionError if the block runs more than limit SQL statements"""
+    with profile_queries() as profile:
+        yield profile
+    if profile.count > limit:
+        repeated = ''.join(f"\n  {count}x {abbreviate(shape, 200)}" for shape, count in profile.repeated(1))
+        raise AssertionError(
+            f"{label} ran {profile.count} SQL statements, more than the {limit} allowed"
+            + (f"; repeated:{repeated}" if repeated else '')
+        )
+
+class QueryProfiler:
+    """Profiles the SQL statements of every request of the app"""
+
+    def __init__(self, app):
+        self.app = app
+        self.repeat_threshold = app.config.get('QUERY_PROFILER_REPEAT_THRESHOLD', 10)
+        self.server_timing = app.config.get('QUERY_PROFILER_SERVER_TIMING', False)
+        install()
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._teardown)
+        app.extensions['query_profiler'] = self
+
+    def _start(self):
+        g.query_profile = QueryProfile()
+        g.query_profile_started_at = time.perf_counter()
+        _profiles().append(g.query_profile)
+
+    def _finish(self, response):
+        profile = g.get('query_profile')
+        if profile is None:
+            return response
+        self._stop(profile)
+
+        endpoint = request.url_rule.rule if request.url_rule else request.path
+        for shape, count in profile.repeated(self.repeat_threshold):
+            logger.warning(
+                f"Possible N+1 query in {request.method} {endpoint}: statement ran {count} times "
+                f"({profile.count} statements, {profile.total_time * 1000:.1f}ms in total): {abbreviate(shape)}"
+            )
+
+        if self.server_timing:
+            elapsed = time.perf_counter() - g.query_profile_started_at
+            response.headers.add('Server-Timing', f'db;dur={profile.total_time * 1000:.2f};desc="{profile.count} queries"')
+            response.headers.add('Server-Timing', f'app;dur={(elapsed - profile.total_time) * 1000:.2f}')
+        return response
+
+    def _teardown(self, exc):
+        # after_request doesn't run when a request fails with an unhandled error
+        profile = g.get('query_profile')
+        if profile is not None:
+            self._stop(profile)
+
+    def _stop(self, profile):
+        profiles = _profiles()
+        if profile in profiles:
+            profiles.remove(profile)
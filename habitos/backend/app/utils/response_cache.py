@@ -0,0 +1,260 @@
+"""
+Per-user response caching for read-heavy analytics endpoints
+"""
+
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import date
+from functools import wraps
+from flask import current_app, request
+from flask_jwt_extended import get_jwt_identity
+import redis
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'response_cache'
+
+class LocalCache:
+    """
+    In-process stand-in for the subset of Redis the response cache uses.
+    Payloads are evicted least recently used first; version counters are
+    kept apart so eviction can never resurrect an old version's payloads.
+    Each worker process has its own copy, so with several workers and no
+    Redis a write only invalidates the worker that served it and other
+    workers serve stale payloads and ETags until their TTL runs out.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def ping(self):
+        return True
+
+    def get(self, key):
+        with self._lock:
+            if key in self._counters:
+                return self._counters[key]
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ex=None):
+        expires_at = time.monotonic() + ex if ex else float('inf')
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return True
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+class ResponseCache:
+    """
+    Versioned per-user cache of JSON responses
+
+    Every cached payload key embeds the user's current version number, so a
+    write only has to increment that one counter (invalidate) for all of the
+    user's cached payloads to stop being read; they are never scanned or
+    deleted and simply expire after RESPONSE_CACHE_TTL seconds. The same
+    version backs the ETags of conditional_get. Uses Redis when REDIS_URL is
+    configured and reachable, LocalCache otherwise.
+    """
+
+    def __init__(self, app, redis_client=None):
+        self.app = app
+        self.ttl = app.config.get('RESPONSE_CACHE_TTL', 300)
+        self.client = redis_client
+        self.backend = 'redis' if redis_client is not None else None
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+        if self.client is None:
+            self._init_redis()
+        app.extensions['response_cache'] = self
+
+    def _init_redis(self):
+        """Initialize Redis connection, falling back to an in-process LRU cache"""
+        if self.app.config.get('REDIS_URL'):
+            try:
+                self.client = redis.from_url(
+                    self.app.config['REDIS_URL'],
+                    password=self.app.config.get('REDIS_PASSWORD'),
+                    db=self.app.config.get('REDIS_DB', 0),
+                    decode_responses=True,
+                    socket_connect_timeout=2,
+                    socket_timeout=2
+                )
+                self.client.ping()
+                self.backend = 'redis'
+                logger.info("Redis connection established for response cache")
+                return
+            except Exception as e:
+                logger.warning(f"Redis connection for response cache failed, using in-process cache: {e}")
+
+        self.client = LocalCache(self.app.config.get('RESPONSE_CACHE_MAX_ENTRIES', 10000))
+        self.backend = 'memory'
+
+    @property
+    def enabled(self):
+        return self.app.config.get('RESPONSE_CACHE_ENABLED', True)
+
+    def _version_key(self, user_id):
+        return f"{KEY_PREFIX}:version:{user_id}"
+
+    def version_tag(self, user_id):
+        """The user's current data version, or None if it can't be read"""
+        try:
+            version = int(self.client.get(self._version_key(user_id)) or 0)
+        except Exception as e:
+            logger.error(f"Response cache version lookup failed: {e}")
+            return None
+        if self.backend == 'memory':
+            # Writes served by other workers never reach this process's
+            # counter, so versions also roll over every TTL to bound staleness
+            return f"{version}.{int(time.time() // self.ttl)}"
+        return str(version)
+
+    def payload_key(self, user_id, version):
+        """Cache key for the current request at the given data version"""
+        # Responses that depend on today's date must not outlive it
+        return f"{KEY_PREFIX}:{user_id}:{version}:{date.today().isoformat()}:{request.full_path}"
+
+    def etag(self, user_id, version):
+        """Strong ETag for the current request at the given data version"""
+        return hashlib.sha1(self.payload_key(user_id, version).encode()).hexdigest()
+
+    def get(self, key):
+        try:
+            return self.client.get(key)
+        except Exception as e:
+            logger.error(f"Response cache read failed: {e}")
+            return None
+
+    def set(self, key, body):
+        try:
+            self.client.set(key, body, ex=self.ttl)
+        except Exception as e:
+            logger.error(f"Response cache write failed: {e}")
+
+    def invalidate(self, user_id):
+        """Make every cached response of the user stale"""
+        try:
+            self.client.incr(self._version_key(user_id))
+        except Exception as e:
+            logger.error(f"Response cache invalidation failed for user {user_id}: {e}")
+
+    def record(self, endpoint, hit):
+        metrics.CACHE_REQUESTS.inc(cache='response', result='hit' if hit else 'miss')
+        with self._stats_lock:
+            counts = self._stats.setdefault(endpoint, {'hits': 0, 'misses': 0})
+            counts['hits' if hit else 'misses'] += 1
+
+    def stats(self):
+        """Hit and miss counters of this process, in total and per endpoint"""
+        with self._stats_lock:
+            endpoints = {endpoint: dict(counts) for endpoint, counts in self._stats.items()}
+        hits = sum(counts['hits'] for counts in endpoints.values())
+        misses = sum(counts['misses'] for counts in endpoints.values())
+        return {
+            'backend': self.backend,
+            'enabled': self.enabled,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses) * 100, 2) if hits + misses else 0,
+            'endpoints': endpoints
+        }
+
+def cached_response(view):
+    """
+    Serve a view's successful JSON response from the current user's cache.
+    Place below @jwt_required(). Responses carry X-Cache: HIT or MISS.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        cache = current_app.extensions.get('response_cache')
+        if cache is None or not cache.enabled:
+            return view(*args, **kwargs)
+
+        user_id = get_jwt_identity()
+        version = cache.version_tag(user_id)
+        key = cache.payload_key(user_id, version) if version is not None else None
+        if key is not None:
+            body = cache.get(key)
+            if body is not None:
+                cache.record(request.endpoint, hit=True)
+                return current_app.response_class(
+                    body, status=200, mimetype='application/json', headers={'X-Cache': 'HIT'}
+                )
+
+        cache.record(request.endpoint, hit=False)
+        response = current_app.make_response(view(*args, **kwargs))
+        if key is not None and response.status_code == 200:
+            cache.set(key, response.get_data(as_text=True))
+        response.headers['X-Cache'] = 'MISS'
+        return response
+    return wrapper
+
+def conditional_get(view):
+    """
+    Answer 304 Not Modified, without running the view, when If-None-Match
+    carries the ETag of the current user's data version. Place below
+    @jwt_required() and above @cached_response.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        cache = current_app.extensions.get('response_cache')
+        user_id = get_jwt_identity()
+        version = cache.version_tag(user_id) if cache is not None else None
+        if version is None:
+            return view(*args, **kwargs)
+
+        # Taken before the view runs, so a write racing with it can only
+        # make the next request miss, never serve stale data as current
+        etag = cache.etag(user_id, version)
+        if request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+        else:
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    return wrapper
+
+def invalidates_cache(view):
+    """
+    Invalidate the current user's cached responses after a successful write.
+    Place below @jwt_required() on every route that changes user data.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        response = current_app.make_response(view(*args, **kwargs))
+        cache = current_app.extensions.get('response_cache')
+        if cache is not None and response.status_code < 400:
+            cache.invalidate(get_jwt_identity())
+        return response
+    wrapper.invalidates_cache = True
+    return wrapper
+
+def invalidate_users(user_ids):
+    """Invalidate cached responses and ETags of users whose data changed outside a request"""
+    cache = current_app.extensions.get('response_cache')
+    if cache is not None:
+        for user_id in set(user_ids):
+            cache.invalidate(user_id)
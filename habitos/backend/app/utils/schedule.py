@@ -0,0 +1,97 @@
+"""
+Habit schedule arithmetic for HabitOS
+
+Counts expected habit occurrences over a date range without walking it day
+by day. Weekly and monthly habits count one occurrence per selected weekday
+or day of month; habits with no selection fall back to frequency_count per
+week (counted on Mondays) or per month (counted on the 1st).
+"""
+
+import calendar
+from app.models.habit import HabitFrequency
+
+ALL_MONTH_DAYS = (1 << 31) - 1
+
+
+def count_weekdays(start_date, end_date, weekday_mask):
+    """Number of days between two dates (inclusive) whose weekday bit is set (bit 0 = Monday)"""
+    total_days = (end_date - start_date).days + 1
+    if total_days <= 0:
+        return 0
+
+    full_weeks, remainder = divmod(total_days, 7)
+    count = full_weeks * weekday_mask.bit_count()
+
+    # The leftover days cover weekdays start_date.weekday() .. + remainder - 1
+    first_weekday = start_date.weekday()
+    for offset in range(remainder):
+        count += weekday_mask >> ((first_weekday + offset) % 7) & 1
+    return count
+
+
+def count_month_days(start_date, end_date, month_day_mask):
+    """Number of dates between two dates (inclusive) whose day-of-month bit is set (bit 0 = the 1st)"""
+    if end_date < start_date:
+        return 0
+
+    count = 0
+    year, month = start_date.year, start_date.month
+    while (year, month) <= (end_date.year, end_date.month):
+        days_in_month = calendar.monthrange(year, month)[1]
+        low = start_date.day if (year, month) == (start_date.year, start_date.month) else 1
+        high = end_date.day if (year, month) == (end_date.year, end_date.month) else days_in_month
+
+        # Keep only bits low..high of the mask
+        window = ALL_MONTH_DAYS >> (31 - high) & ~((1 << (low - 1)) - 1)
+        count += (month_day_mask & window).bit_count()
+
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+    return count
+
+
+def expected_occurrences(habit, start_date, end_date):
+    """
+    Expected check-ins for a habit between two dates (inclusive)
+
+    Args:
+        habit: Habit (or any object with frequency, frequency_count,
+            weekday_mask, month_day_mask and start_date)
+        start_date (date): First day of the window
+        end_date (date): Last day of the window
+
+    Returns:
+        int: Expected number of completions in the window
+    """
+    start_date = max(start_date, habit.start_date)
+    if end_date < start_date:
+        return 0
+
+    per_period = max(habit.frequency_count or 0, 1)
+
+    if habit.frequency == HabitFrequency.DAILY:
+        return (end_date - start_date).days + 1
+
+    if habit.frequency == HabitFrequency.CUSTOM:
+        # Custom frequency is treated as daily with a custom count
+        return ((end_date - start_date).days + 1) * per_period
+
+    if habit.frequency == HabitFrequency.WEEKLY:
+        if habit.weekday_mask:
+            return count_weekdays(start_date, end_date, habit.weekday_mask)
+        return count_weekdays(start_date, end_date, 1) * per_period
+
+    if habit.frequency == HabitFrequency.MONTHLY:
+        if habit.month_day_mask:
+            return count_month_days(start_date, end_date, habit.month_day_mask)
+        return count_month_days(start_date, end_date, 1) * per_period
+
+    return 0
+
+
+def completion_rate(completed, expected):
+    """Completion percentage, capped at 100"""
+    if expected <= 0:
+        return 0
+    return min(completed / expected * 100, 100)
@@ -2,24 +2,162 @@
 Security utilities and middleware for HabitOS
 """
 
+import math
 import time
+import uuid
 import hashlib
 import logging
+import threading
+from collections import deque
 from functools import wraps
-from flask import request, jsonify, g, current_app
+from flask import request, jsonify, g, current_app, make_response
 from flask_cors import CORS
 import redis
 import re
 
 logger = logging.getLogger(__name__)
 
+# Lua scripts run atomically by Redis, one round trip per check. Both take
+# KEYS[1] and ARGV now (ms), window (ms), limit, cost and return
+# {allowed, remaining, reset_after (ms), retry_after (ms)}; a cost of 0 only
+# reads the state. LocalRateLimitStore implements the same algorithms.
+SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+local count = redis.call('ZCARD', KEYS[1])
+local allowed = count + cost <= limit
+if allowed and cost > 0 then
+    for i = 1, cost do
+        redis.call('ZADD', KEYS[1], now, ARGV[5] .. ':' .. i)
+    end
+    count = count + cost
+    redis.call('PEXPIRE', KEYS[1], window)
+end
+local retry_after = 0
+if not allowed then
+    local index = count + cost - limit - 1
+    local freeing = redis.call('ZRANGE', KEYS[1], index, index, 'WITHSCORES')
+    retry_after = freeing[2] and (tonumber(freeing[2]) + window - now) or window
+end
+local reset_after = 0
+if count > 0 then
+    local newest = redis.call('ZRANGE', KEYS[1], -1, -1, 'WITHSCORES')
+    reset_after = tonumber(newest[2]) + window - now
+end
+return {allowed and 1 or 0, math.max(limit - count, 0), reset_after, retry_after}
+"""
+
+GCRA_SCRIPT = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local interval = window / limit
+local tat = math.max(tonumber(redis.call('GET', KEYS[1])) or now, now)
+local new_tat = tat + interval * cost
+if new_tat - window > now then
+    return {0, math.floor((window - (tat - now)) / interval + 1e-9), math.ceil(tat - now), math.ceil(new_tat - window - now)}
+end
+if cost > 0 then
+    redis.call('SET', KEYS[1], string.format('%.3f', new_tat), 'PX', math.ceil(new_tat - now))
+end
+return {1, math.floor((window - (new_tat - now)) / interval + 1e-9), math.ceil(new_tat - now), 0}
+"""
+
+SLIDING_WINDOW = 'sliding_window'
+GCRA = 'gcra'
+
+class LocalRateLimitStore:
+    """
+    In-process stand-in for the Redis scripts, used when REDIS_URL is unset
+    or Redis fails. Each worker process keeps its own counts, so with
+    several workers a client gets up to the limit from each of them.
+    """
+
+    # Idle keys are swept after this many checks
+    SWEEP_EVERY = 1000
+
+    def __init__(self):
+        self._windows = {}  # key -> timestamps (ms) of counted requests, oldest first
+        self._tats = {}  # key -> theoretical arrival time (ms)
+        self._expires = {}  # key -> when it has nothing left to limit (ms)
+        self._checks = 0
+        self._lock = threading.Lock()
+
+    def run(self, algorithm, key, now, window, limit, cost):
+        with self._lock:
+            self._checks += 1
+            if self._checks % self.SWEEP_EVERY == 0:
+                self._sweep(now)
+            if algorithm == GCRA:
+                return self._gcra(key, now, window, limit, cost)
+            return self._sliding_window(key, now, window, limit, cost)
+
+    def _sliding_window(self, key, now, window, limit, cost):
+        hits = self._windows.get(key)
+        if hits is None:
+            hits = self._windows[key] = deque()
+        while hits and hits[0] <= now - window:
+            hits.popleft()
+        allowed = len(hits) + cost <= limit
+        if allowed:
+            hits.extend([now] * cost)
+        retry_after = 0
+        if not allowed:
+            index = len(hits) + cost - limit - 1
+            retry_after = hits[index] + window - now if index < len(hits) else window
+        reset_after = hits[-1] + window - now if hits else 0
+        self._expires[key] = now + reset_after
+        return [int(allowed), max(limit - len(hits), 0), reset_after, retry_after]
+
+    def _gcra(self, key, now, window, limit, cost):
+        interval = window / limit
+        tat = max(self._tats.get(key, now), now)
+        new_tat = tat + interval * cost
+        if new_tat - window > now:
+            return [0, math.floor((window - (tat - now)) / interval + 1e-9), math.ceil(tat - now),
+                    math.ceil(new_tat - window - now)]
+        if cost > 0:
+            self._tats[key] = new_tat
+            self._expires[key] = new_tat
+        return [1, math.floor((window - (new_tat - now)) / interval + 1e-9), math.ceil(new_tat - now), 0]
+
+    def _sweep(self, now):
+        """Forget keys with nothing left to limit"""
+        for key in [key for key, expires in self._expires.items() if expires <= now]:
+            del self._expires[key]
+            self._windows.pop(key, None)
+            self._tats.pop(key, None)
+
 class RateLimiter:
-    """Rate limiting utility using Redis"""
-    
-    def __init__(self, app):
+    """
+    Rate limiting with Redis, or in-process when Redis is not configured
+
+    Two algorithms, each one atomic Redis call per check: 'sliding_window'
+    keeps a log of request times and allows at most max_requests in any
+    window_seconds; 'gcra' (a token bucket tracked as one timestamp) allows
+    bursts of max_requests and then one request every
+    window_seconds / max_requests. Denied requests are not counted.
+    """
+
+    def __init__(self, app, redis_client=None):
         self.app = app
-        self.redis_client = None
-        self._init_redis()
+        self.algorithm = app.config.get('RATE_LIMIT_ALGORITHM', SLIDING_WINDOW)
+        self.redis_client = redis_client
+        self.local_store = LocalRateLimitStore()
+        self.backend = 'redis' if redis_client is not None else 'memory'
+        if self.redis_client is None:
+            self._init_redis()
+        self._scripts = {}
+        if self.redis_client is not None:
+            self._scripts = {
+                SLIDING_WINDOW: self.redis_client.register_script(SLIDING_WINDOW_SCRIPT),
+                GCRA: self.redis_client.register_script(GCRA_SCRIPT)
+            }
+        app.extensions['rate_limiter'] = self
     
     def _init_redis(self):
         """Initialize Redis connection for rate limiting"""
@@ -34,10 +172,11 @@ class RateLimiter:
                     socket_timeout=2
                 )
                 self.redis_client.ping()
+                self.backend = 'redis'
                 logger.info("Redis connection established for rate limiting")
             except Exception as e:
                 # Only log warning if we're in a request context or during app startup
-                logger.warning(f"Redis connection for rate limiting failed: {e}")
+                logger.warning(f"Redis connection for rate limiting failed, limiting in-process: {e}")
                 self.redis_client = None
     
     def _get_client_ip(self):
@@ -58,51 +197,59 @@ class RateLimiter:
         # Fall back to IP address
         return f"ip:{self._get_client_ip()}"
     
+    def check(self, key_prefix, max_requests, window_seconds, algorithm=None, identifier=None, cost=1):
+        """
+        Count a request against the limit
+
+        Args:
+            key_prefix (str): Name of the limit
+            max_requests (int): Requests allowed per window
+            window_seconds (float): Window length
+            algorithm (str): 'sliding_window' or 'gcra' (default RATE_LIMIT_ALGORITHM)
+            identifier (str): Client being limited (default the current user or IP)
+            cost (int): Requests this one counts as; 0 only reads the state
+
+        Returns:
+            Dict with allowed, limit, remaining, and reset_after (seconds
+            until the full limit is available again) and retry_after
+            (seconds until this request would be allowed, 0 if it was)
+        """
+        algorithm = algorithm or self.algorithm
+        identifier = identifier or self._get_user_identifier()
+        # The algorithms store different types, so they never share a key
+        key = f"rate_limit:{algorithm}:{key_prefix}:{identifier}"
+        now = int(time.time() * 1000)
+        window = int(window_seconds * 1000)
+
+        result = None
+        script = self._scripts.get(algorithm)
+        if script is not None:
+            try:
+                args = [now, window, max_requests, cost]
+                if algorithm == SLIDING_WINDOW:
+                    args.append(uuid.uuid4().hex)  # Log members must be unique within a millisecond
+                result = script(keys=[key], args=args)
+            except Exception as e:
+                logger.error(f"Rate limiting check failed, limiting in-process: {e}")
+        if result is None:
+            result = self.local_store.run(algorithm, key, now, window, max_requests, cost)
+
+        allowed, remaining, reset_after, retry_after = result
+        return {
+            'allowed': bool(allowed),
+            'limit': max_requests,
+            'remaining': int(remaining),
+            'reset_after': int(reset_after) / 1000,
+            'retry_after': int(retry_after) / 1000
+        }
+
     def is_rate_limited(self, key_prefix, max_requests, window_seconds):
         """Check if request is rate limited"""
-        if not self.redis_client:
-            return False
-        
-        try:
-            identifier = self._get_user_identifier()
-            key = f"rate_limit:{key_prefix}:{identifier}"
-            current_time = int(time.time())
-            
-            # Get current request count
-            pipe = self.redis_client.pipeline()
-            pipe.zremrangebyscore(key, 0, current_time - window_seconds)
-            pipe.zadd(key, {str(current_time): current_time})
-            pipe.zcard(key)
-            pipe.expire(key, window_seconds)
-            results = pipe.execute()
-            
-            current_requests = results[2]
-            
-            return current_requests > max_requests
-            
-        except Exception as e:
-            logger.error(f"Rate limiting check failed: {e}")
-            return False
+        return not self.check(key_prefix, max_requests, window_seconds)['allowed']
     
     def get_remaining_requests(self, key_prefix, max_requests, window_seconds):
         """Get remaining requests for the current window"""
-        if not self.redis_client:
-            return max_requests
-        
-        try:
-            identifier = self._get_user_identifier()
-            key = f"rate_limit:{key_prefix}:{identifier}"
-            current_time = int(time.time())
-            
-            # Clean old entries and get current count
-            self.redis_client.zremrangebyscore(key, 0, current_time - window_seconds)
-            current_requests = self.redis_client.zcard(key)
-            
-            return max(0, max_requests - current_requests)
-            
-        except Exception as e:
-            logger.error(f"Failed to get remaining requests: {e}")
-            return max_requests
+        return self.check(key_prefix, max_requests, window_seconds, cost=0)['remaining']
 
 class SecurityMiddleware:
     """Security middleware for request processing"""
@@ -182,26 +329,35 @@ class SecurityMiddleware:
         
         return True, None
 
-def rate_limit(max_requests, window_seconds, key_prefix='default'):
-    """Decorator for rate limiting endpoints"""
+def rate_limit(max_requests, window_seconds, key_prefix='default', algorithm=None):
+    """Decorator for rate limiting endpoints; sets RateLimit-* headers on its responses"""
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
             if not current_app.config.get('ENABLE_RATE_LIMITING', True):
                 return f(*args, **kwargs)
             
-            rate_limiter = RateLimiter(current_app)
+            rate_limiter = current_app.extensions.get('rate_limiter') or RateLimiter(current_app)
+            result = rate_limiter.check(key_prefix, max_requests, window_seconds, algorithm=algorithm)
             
-            if rate_limiter.is_rate_limited(key_prefix, max_requests, window_seconds):
-                remaining = rate_limiter.get_remaining_requests(key_prefix, max_requests, window_seconds)
-                return jsonify({
+            if not result['allowed']:
+                retry_after = math.ceil(result['retry_after'])
+                response = make_response(jsonify({
                     'error': 'Rate limit exceeded',
-                    'message': f'Too many requests. Try again in {window_seconds} seconds.',
-                    'remaining_requests': remaining,
-                    'reset_time': int(time.time()) + window_seconds
-                }), 429
+                    'message': f'Too many requests. Try again in {retry_after} seconds.',
+                    'remaining_requests': result['remaining'],
+                    'reset_time': int(time.time()) + retry_after
+                }), 429)
+                response.headers['Retry-After'] = str(retry_after)
+            else:
+                response = make_response(f(*args, **kwargs))
             
-            return f(*args, **kwargs)
+            # IETF RateLimit header fields (draft-ietf-httpapi-ratelimit-headers)
+            response.headers['RateLimit-Limit'] = str(max_requests)
+            response.headers['RateLimit-Remaining'] = str(result['remaining'])
+            response.headers['RateLimit-Reset'] = str(math.ceil(result['reset_after']))
+            response.headers['RateLimit-Policy'] = f'{max_requests};w={int(window_seconds)}'
+            return response
         return decorated_function
     return decorator
 
@@ -0,0 +1,223 @@
+"""
+Local lexicon-based sentiment scoring for journal entries
+
+Scores text without Gemini, as the fallback of
+AIService.analyze_journal_sentiment and for bulk backfills, returning the
+same shape as the Gemini analysis. Words carry a valence from -4 to 4
+(multi-word phrases are matched first); a valence is boosted or damped by
+the word before it and flipped by a negation within the three words before
+it. The score is the mean valence of the matched words over 4, pulled
+towards 0 when fewer than two words matched.
+
+Pure Python (no numpy): score_batch tokenizes a whole batch with one regular
+expression pass and filters it down to sentiment words in C, so Python only
+steps through the few tokens that matter (see scripts/benchmark_sentiment.py).
+"""
+
+import re
+from itertools import compress
+
+# Word valences, -4 (most negative) to 4 (most positive)
+LEXICON = {
+    # Positive
+    'amazing': 3.2, 'awesome': 3.1, 'incredible': 3.0, 'incredibly': 2.5, 'fantastic': 3.2, 'wonderful': 3.1,
+    'excellent': 3.1, 'great': 2.6, 'good': 1.9, 'nice': 1.8, 'fine': 0.8, 'okay': 0.5, 'ok': 0.5,
+    'best': 3.0, 'better': 1.8, 'perfect': 3.0, 'perfectly': 2.8, 'beautiful': 2.8, 'lovely': 2.6,
+    'happy': 2.7, 'happier': 2.8, 'happiest': 3.3, 'happiness': 2.8, 'glad': 2.0, 'joy': 3.0, 'joyful': 3.0,
+    'cheerful': 2.4, 'delighted': 3.0, 'thrilled': 3.3, 'excited': 2.5, 'exciting': 2.4, 'overjoyed': 3.7,
+    'ecstatic': 3.7, 'elated': 3.6, 'blissful': 3.5, 'love': 3.0, 'loved': 2.9, 'loving': 2.8,
+    'grateful': 2.7, 'thankful': 2.6, 'gratitude': 2.6, 'blessed': 2.6, 'proud': 2.4, 'confident': 2.1,
+    'calm': 1.6, 'peaceful': 2.2, 'relaxed': 1.9, 'rested': 1.6, 'refreshed': 2.0, 'content': 1.5,
+    'hopeful': 2.2, 'optimistic': 2.3, 'motivated': 2.2, 'inspired': 2.5, 'energized': 2.3, 'energetic': 2.0,
+    'productive': 2.1, 'accomplished': 2.3, 'achieved': 2.2, 'achievement': 2.2, 'success': 2.5,
+    'successful': 2.5, 'progress': 1.6, 'improved': 1.8, 'improving': 1.7, 'win': 2.2, 'won': 2.3,
+    'fun': 2.3, 'enjoyed': 2.3, 'enjoy': 2.2, 'enjoying': 2.2, 'pleased': 2.1, 'satisfied': 2.0,
+    'smile': 2.0, 'smiled': 2.0, 'laughed': 2.2, 'laugh': 2.1, 'celebrate': 2.6, 'celebrated': 2.6,
+    'strong': 1.6, 'healthy': 1.8, 'kind': 1.8, 'support': 1.4, 'supported': 1.8, 'helpful': 1.8,
+    'focused': 1.5, 'clear': 1.0, 'easy': 1.2, 'interesting': 1.6, 'fulfilled': 2.6, 'fulfilling': 2.6,
+    'brilliant': 3.0, 'superb': 3.2, 'terrific': 3.1, 'glorious': 3.2, 'magnificent': 3.3,
+    # Negative
+    'bad': -2.5, 'worse': -2.6, 'worst': -3.4, 'terrible': -3.4, 'horrible': -3.4, 'awful': -3.3,
+    'sad': -2.3, 'sadness': -2.4, 'unhappy': -2.4, 'upset': -2.3, 'down': -1.2, 'depressed': -3.2,
+    'depressing': -3.0, 'miserable': -3.5, 'devastated': -3.8, 'heartbroken': -3.7, 'hopeless': -3.5,
+    'helpless': -3.0, 'lonely': -2.4, 'alone': -1.3, 'empty': -2.0, 'hurt': -2.3, 'pain': -2.3,
+    'painful': -2.6, 'cry': -2.0, 'cried': -2.2, 'crying': -2.2, 'tears': -1.6, 'grief': -3.0,
+    'angry': -2.7, 'anger': -2.6, 'mad': -2.3, 'furious': -3.3, 'annoyed': -1.8, 'irritated': -1.9,
+    'frustrated': -2.4, 'frustrating': -2.4, 'frustration': -2.4, 'disappointed': -2.4,
+    'disappointing': -2.4, 'disappointment': -2.4, 'hate': -3.0, 'hated': -3.0, 'resent': -2.4,
+    'anxious': -2.3, 'anxiety': -2.4, 'worried': -2.1, 'worry': -1.9, 'nervous': -1.8, 'scared': -2.3,
+    'afraid': -2.2, 'fear': -2.4, 'panic': -3.0, 'stressed': -2.3, 'stress': -2.0, 'stressful': -2.3,
+    'overwhelmed': -2.5, 'overwhelming': -2.3, 'tired': -1.6, 'exhausted': -2.4, 'drained': -2.2,
+    'sick': -2.1, 'ill': -1.9, 'failed': -2.4, 'failure': -2.7, 'fail': -2.2, 'lost': -1.6,
+    'wrong': -2.0, 'mistake': -1.8, 'problem': -1.6, 'problems': -1.6, 'struggle': -1.9,
+    'struggled': -2.0, 'struggling': -2.1, 'difficult': -1.6, 'hard': -1.1, 'boring': -1.5, 'bored': -1.5,
+    'guilty': -2.2, 'ashamed': -2.6, 'embarrassed': -2.0, 'regret': -2.2, 'jealous': -2.0,
+    'useless': -2.6, 'worthless': -3.2, 'miserably': -3.0, 'disaster': -3.1, 'dread': -2.7,
+    'terrified': -3.3, 'awfully': -2.0, 'broken': -2.4, 'crushed': -3.0, 'defeated': -2.6,
+}
+
+# Multi-word expressions, matched before single words
+PHRASES = {
+    ("couldn't", 'be', 'happier'): 3.6,
+    ("couldn't", 'be', 'better'): 3.3,
+    ("can't", 'complain'): 1.5,
+    ('not', 'bad'): 1.3,
+    ('best', 'day', 'ever'): 3.6,
+    ('worst', 'day', 'ever'): -3.6,
+    ('falling', 'apart'): -3.0,
+    ('fell', 'apart'): -3.0,
+    ("can't", 'take', 'this', 'anymore'): -3.4,
+    ("can't", 'take', 'it', 'anymore'): -3.4,
+    ('give', 'up'): -2.0,
+    ('gave', 'up'): -2.0,
+    ('burned', 'out'): -2.6,
+    ('burnt', 'out'): -2.6,
+    ('looking', 'forward'): 2.2,
+    ('proud', 'of', 'myself'): 2.8,
+    ('fed', 'up'): -2.4,
+}
+MAX_PHRASE_LENGTH = max(len(phrase) for phrase in PHRASES)
+
+# Words that strengthen or weaken the valence of the next word
+BOOSTERS = {
+    'very': 1.3, 'so': 1.3, 'really': 1.3, 'extremely': 1.4, 'absolutely': 1.4, 'completely': 1.3,
+    'totally': 1.3, 'incredibly': 1.4, 'truly': 1.25, 'super': 1.3, 'deeply': 1.3, 'utterly': 1.4,
+    'slightly': 0.6, 'somewhat': 0.7, 'little': 0.7, 'bit': 0.7, 'kinda': 0.7, 'barely': 0.5,
+}
+
+NEGATIONS = {
+    'not', 'no', 'never', 'nothing', 'nobody', 'none', 'neither', 'nor', 'without', 'hardly',
+    "don't", "didn't", "doesn't", "isn't", "wasn't", "aren't", "weren't", "won't", "wouldn't",
+    "can't", "couldn't", "shouldn't", "haven't", "hasn't", "hadn't", 'cannot',
+}
+NEGATION_WINDOW = 3
+NEGATION_SCALAR = -0.74
+
+# Words behind each emotional theme, for emotional_themes
+THEMES = {
+    'joy': {'happy', 'happier', 'happiest', 'happiness', 'joy', 'joyful', 'cheerful', 'delighted', 'thrilled',
+            'overjoyed', 'ecstatic', 'elated', 'blissful', 'fun', 'smile', 'smiled', 'laughed', 'laugh', 'amazing'},
+    'gratitude': {'grateful', 'thankful', 'gratitude', 'blessed'},
+    'accomplishment': {'accomplished', 'achieved', 'achievement', 'success', 'successful', 'progress',
+                       'productive', 'proud', 'win', 'won', 'improved', 'improving'},
+    'calm': {'calm', 'peaceful', 'relaxed', 'rested', 'refreshed', 'content'},
+    'hope': {'hopeful', 'optimistic', 'motivated', 'inspired', 'excited', 'exciting'},
+    'sadness': {'sad', 'sadness', 'unhappy', 'depressed', 'depressing', 'miserable', 'devastated',
+                'heartbroken', 'lonely', 'empty', 'cry', 'cried', 'crying', 'tears', 'grief', 'hopeless'},
+    'anger': {'angry', 'anger', 'mad', 'furious', 'annoyed', 'irritated', 'hate', 'hated', 'resent'},
+    'frustration': {'frustrated', 'frustrating', 'frustration', 'disappointed', 'disappointing',
+                    'disappointment', 'failed', 'failure', 'wrong', 'struggle', 'struggled', 'struggling'},
+    'anxiety': {'anxious', 'anxiety', 'worried', 'worry', 'nervous', 'scared', 'afraid', 'fear', 'panic',
+                'stressed', 'stress', 'stressful', 'overwhelmed', 'overwhelming', 'dread', 'terrified'},
+    'fatigue': {'tired', 'exhausted', 'drained', 'sick', 'ill'},
+}
+THEME_OF = {word: theme for theme, words in THEMES.items() for word in words}
+
+# Mean valence over 4 at which a result is labelled positive/negative and very_
+LABEL_THRESHOLD = 0.2
+STRONG_LABEL_THRESHOLD = 0.8
+
+# Tokens are lowercased words, with contractions; '\n\x00\n'
+# separates the texts of a batch
+TOKEN_PATTERN = re.compile(r"[a-z]+(?:'[a-z]+)?|\x00")
+BATCH_SEPARATOR = '\n\x00\n'
+PHRASE_STARTS = {phrase[0] for phrase in PHRASES}
+HIT_TOKENS = set(LEXICON) | PHRASE_STARTS | {'\x00'}
+
+
+class LexiconSentimentScorer:
+    """Scores journal text with the module's lexicon, in the shape of AIService.analyze_journal_sentiment"""
+
+    def score(self, text):
+        """Sentiment analysis of one text"""
+        return self.score_batch([text])[0]
+
+    def score_batch(self, texts):
+        """Sentiment analyses of several texts, in order"""
+        if not texts:
+            return []
+        joined = BATCH_SEPARATOR.join(text.replace('\x00', ' ') if text else '' for text in texts)
+        tokens = TOKEN_PATTERN.findall(joined.lower().replace('’', "'"))
+        # Positions worth a look (sentiment words, phrase starts, text
+        # separators), found without a Python-level step per token
+        hits = compress(range(len(tokens)), map(HIT_TOKENS.__contains__, tokens))
+
+        results = []
+        valences = []
+        themes = {}
+        start = 0  # First token of the current text
+        resume = 0  # First token after the last matched phrase
+        for i in hits:
+            token = tokens[i]
+            if token == '\x00':
+                results.append(self._result(valences, themes))
+                valences = []
+                themes = {}
+                start = resume = i + 1
+                continue
+            if i < resume:
+                continue
+
+            valence = None
+            if token in PHRASE_STARTS:
+                for n in range(MAX_PHRASE_LENGTH, 1, -1):
+                    valence = PHRASES.get(tuple(tokens[i:i + n]))
+                    if valence is not None:
+                        resume = i + n
+                        break
+            if valence is None:
+                valence = LEXICON.get(token)
+                if valence is None:
+                    continue
+                if i > start and tokens[i - 1] in BOOSTERS:
+                    valence = max(-4.0, min(4.0, valence * BOOSTERS[tokens[i - 1]]))
+                if not NEGATIONS.isdisjoint(tokens[max(start, i - NEGATION_WINDOW):i]):
+                    valence *= NEGATION_SCALAR
+                elif token in THEME_OF:
+                    theme = THEME_OF[token]
+                    themes[theme] = themes.get(theme, 0) + 1
+            valences.append(valence)
+
+        results.append(self._result(valences, themes))
+        return results
+
+    @staticmethod
+    def _result(valences, themes):
+        if not valences:
+            return {
+                'sentiment': 'neutral',
+                'sentiment_score': 0.0,
+                'emotional_themes': [],
+                'confidence': 0.2,
+                'reasoning': 'Local lexicon analysis found no sentiment words'
+            }
+
+        total = sum(valences)
+        score = total / (4 * max(len(valences), 2))
+
+        if score >= STRONG_LABEL_THRESHOLD:
+            sentiment = 'very_positive'
+        elif score >= LABEL_THRESHOLD:
+            sentiment = 'positive'
+        elif score <= -STRONG_LABEL_THRESHOLD:
+            sentiment = 'very_negative'
+        elif score <= -LABEL_THRESHOLD:
+            sentiment = 'negative'
+        else:
+            sentiment = 'neutral'
+
+        # More matched words that agree with each other give more confidence
+        positive = sum(1 for valence in valences if valence > 0)
+        negative = len(valences) - positive
+        agreement = abs(total) / sum(abs(valence) for valence in valences)
+        coverage = min(1.0, len(valences) / 5)
+        return {
+            'sentiment': sentiment,
+            'sentiment_score': round(score, 3),
+            'emotional_themes': sorted(themes, key=lambda theme: -themes[theme])[:3],
+            'confidence': round(0.3 + 0.6 * coverage * agreement, 2),
+            'reasoning': f'Local lexicon analysis of {positive} positive and {negative} negative expressions'
+        }
+
+
+scorer = LexiconSentimentScorer()
@@ -0,0 +1,341 @@
+"""
+Request tracing for HabitOS
+
+Spans time a unit of work with time.perf_counter_ns and nest through a
+context variable, so one trace follows a request through the service
+layer, its SQL statements and its Gemini calls:
+
+    http.request GET /api/journal/<entry_id>
+      app.utils.ai_service.AIService.analyze_journal_sentiment
+        ai.generate_content
+      db.query
+
+A span is a context manager (`with span('rollups.rebuild', users=n):`) or
+a decorator (`@traced` or `@traced('name')`, under the route decorator on
+route handlers). TracingMiddleware opens the request span, SQL statements
+get spans through SQLAlchemy cursor events and GeminiExecutor passes the
+caller's span to its worker threads.
+
+Tracing is off unless TRACING_ENABLED; span() then returns a shared no-op
+span, which costs well under a microsecond (scripts/benchmark_tracing.py).
+When on, TRACING_SAMPLE_RATE of traces are recorded, decided once at the
+root span, and finished spans go to the exporters in TRACING_EXPORTERS:
+'metrics' observes habitos_span_duration_seconds{span} in the Prometheus
+registry and 'jsonl' appends one JSON object per span to TRACING_JSONL_PATH.
+"""
+
+import os
+import json
+import time
+import atexit
+import random
+import logging
+import functools
+import itertools
+import threading
+from contextvars import ContextVar
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.utils import metrics
+from app.utils.query_profiler import abbreviate, normalize_statement
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('habitos_current_span', default=None)
+_span_ids = itertools.count(1)
+
+class NoopSpan:
+    """Stands in for a span that isn't recorded; every method does nothing"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def start(self):
+        return self
+
+    def finish(self, error=None):
+        pass
+
+    def set(self, key, value):
+        pass
+
+NOOP_SPAN = NoopSpan()
+
+class UnsampledSpan(NoopSpan):
+    """The root of a trace that sampling skipped: makes its children no-ops too"""
+
+    __slots__ = ('_token',)
+
+    def start(self):
+        self._token = _current.set(NOOP_SPAN)
+        return self
+
+    def finish(self, error=None):
+        _restore(self._token, None)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.finish()
+        return False
+
+class Span:
+    """A recorded unit of work"""
+
+    __slots__ = ('tracer', 'name', 'trace_id', 'span_id', 'parent_id', 'attributes',
+                 'start_ns', 'end_ns', 'error', '_parent', '_token')
+
+    def __init__(self, tracer, name, parent, attributes):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else os.urandom(8).hex()
+        self.span_id = f'{os.getpid():x}.{next(_span_ids):x}'
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes = attributes
+        self.start_ns = None
+        self.end_ns = None
+        self.error = None
+        self._parent = parent
+        self._token = None
+
+    def start(self):
+        self._token = _current.set(self)
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def finish(self, error=None):
+        self.end_ns = time.perf_counter_ns()
+        if error is not None:
+            self.error = type(error).__name__
+        _restore(self._token, self._parent)
+        self.tracer.export(self)
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.finish(exc_value)
+        return False
+
+    @property
+    def duration(self):
+        """Seconds, once finished"""
+        return (self.end_ns - self.start_ns) / 1e9
+
+    def to_dict(self):
+        # perf_counter_ns has no epoch; place the span on the wall clock as it is exported
+        started_at_ns = time.time_ns() - (time.perf_counter_ns() - self.start_ns)
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start_unix_ns': started_at_ns,
+            'duration_us': (self.end_ns - self.start_ns) / 1000,
+            'error': self.error,
+            'attributes': self.attributes
+        }
+
+def _restore(token, previous):
+    try:
+        _current.reset(token)
+    except (ValueError, RuntimeError):
+        # Finished in another context than it started in (e.g. a worker thread)
+        _current.set(previous)
+
+class MetricsExporter:
+    """Observes span durations in the Prometheus registry (app/utils/metrics.py)"""
+
+    def export(self, span):
+        metrics.SPAN_DURATION.observe(span.duration, span=span.name)
+
+    def flush(self):
+        pass
+
+class JsonLinesExporter:
+    """Appends one JSON object per span to a file, written in batches and whenever a trace ends"""
+
+    def __init__(self, path, flush_every=100):
+        self.path = path
+        self.flush_every = flush_every
+        self._lines = []
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked: the parent writes what it buffered before the fork
+                self._pid = os.getpid()
+                self._lines = []
+            self._lines.append(line)
+            full = len(self._lines) >= self.flush_every
+        if full or span.parent_id is None:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            lines, self._lines = self._lines, []
+        if not lines:
+            return
+        try:
+            with open(self.path, 'a') as f:
+                f.write('\n'.join(lines) + '\n')
+        except OSError as e:
+            logger.error(f"Failed to write {len(lines)} spans to {self.path}: {e}")
+
+class Tracer:
+    """Creates spans and hands finished ones to the exporters"""
+
+    def __init__(self):
+        self.enabled = False
+        self.sample_rate = 1.0
+        self.exporters = []
+        self._exit_hook = False
+
+    def configure(self, app):
+        """Apply TRACING_ENABLED, TRACING_SAMPLE_RATE, TRACING_EXPORTERS and TRACING_JSONL_PATH"""
+        exporters = []
+        for name in app.config.get('TRACING_EXPORTERS', 'metrics').split(','):
+            name = name.strip()
+            if name == 'metrics':
+                exporters.append(MetricsExporter())
+            elif name == 'jsonl':
+                exporters.append(JsonLinesExporter(app.config.get('TRACING_JSONL_PATH', 'logs/traces.jsonl')))
+            elif name:
+                logger.warning(f"Unknown tracing exporter {name!r} ignored")
+        self.setup(app.config.get('TRACING_ENABLED', False), app.config.get('TRACING_SAMPLE_RATE', 1.0), exporters)
+
+    def setup(self, enabled, sample_rate=1.0, exporters=()):
+        self.flush()
+        self.sample_rate = sample_rate
+        self.exporters = list(exporters)
+        self.enabled = bool(enabled) and sample_rate > 0
+        if self.enabled:
+            install()
+            if not self._exit_hook:
+                atexit.register(self.flush)
+                self._exit_hook = True
+
+    def span(self, name, parent=None, **attributes):
+        """
+        A span named name, to use as a context manager or to start() and finish()
+
+        Args:
+            parent: The span to nest under when it isn't the current one,
+                e.g. a span captured before handing work to another thread
+            **attributes: Exported with the span
+        """
+        if not self.enabled:
+            return NOOP_SPAN
+        if parent is None:
+            parent = _current.get()
+        if parent is None:
+            if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+                return UnsampledSpan()
+        elif parent.__class__ is not Span:
+            return NOOP_SPAN
+        return Span(self, name, parent, attributes)
+
+    def traced(self, name=None):
+        """Decorator running the function in a span named name (module.qualname by default)"""
+        def decorate(function):
+            span_name = name or f'{function.__module__}.{function.__qualname__}'
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with self.span(span_name):
+                    return function(*args, **kwargs)
+            return wrapper
+
+        if callable(name):
+            function, name = name, None
+            return decorate(function)
+        return decorate
+
+    def export(self, span):
+        for exporter in self.exporters:
+            try:
+                exporter.export(span)
+            except Exception as e:
+                logger.error(f"Failed to export span {span.name}: {e}")
+
+    def flush(self):
+        for exporter in self.exporters:
+            exporter.flush()
+
+def current_span():
+    """The span work on this thread runs under: a Span, NOOP_SPAN, or None outside any trace"""
+    return _current.get()
+
+# SQL statements as spans, nested under whatever span runs them
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if TRACER.enabled:
+        conn.info.setdefault('trace_spans', []).append(TRACER.span('db.query').start())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    spans = conn.info.get('trace_spans')
+    if spans:
+        span = spans.pop()
+        if span.__class__ is Span:
+            span.set('statement', abbreviate(normalize_statement(statement)))
+        span.finish()
+
+def _handle_error(context):
+    spans = context.connection.info.get('trace_spans') if context.connection is not None else None
+    if spans:
+        spans.pop().finish(context.original_exception)
+
+_install_lock = threading.Lock()
+
+def install():
+    with _install_lock:
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            event.listen(Engine, 'handle_error', _handle_error)
+
+class TracingMiddleware:
+    """Runs every request in an http.request span labelled with its route pattern"""
+
+    def __init__(self, app, tracer=None):
+        self.tracer = tracer or TRACER
+        app.before_request(self._start)
+        app.after_request(self._record_status)
+        app.teardown_request(self._finish)
+        app.extensions['tracing'] = self
+
+    def _start(self):
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        g.trace_span = self.tracer.span('http.request', method=request.method, route=route).start()
+
+    def _record_status(self, response):
+        span = g.get('trace_span')
+        if span is not None:
+            span.set('status', response.status_code)
+        return response
+
+    def _finish(self, exc):
+        span = g.pop('trace_span', None)
+        if span is not None:
+            span.finish(exc)
+
+TRACER = Tracer()
+span = TRACER.span
+traced = TRACER.traced
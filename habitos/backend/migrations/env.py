@@ -28,7 +28,7 @@ if config.config_file_name is not None:
 
 # Import our Flask app and models
 from app import create_app, db
-from app.models import User, Habit, CheckIn, Goal, JournalEntry
+from app.models import User, Habit, CheckIn, Goal, JournalEntry, UserDailyRollup, JournalSummary, EnrichmentJob
 
 # Create Flask app context
 flask_app = create_app('development')
@@ -0,0 +1,42 @@
+"""add_journal_summaries
+
+Revision ID: a3d8e6b1c472
+Revises: f5a1c7e3d920
+Create Date: 2026-10-17 16:42:09.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d8e6b1c472'
+down_revision: Union[str, Sequence[str], None] = 'f5a1c7e3d920'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('journal_summaries',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('user_id', sa.String(length=36), nullable=False),
+    sa.Column('kind', sa.String(length=32), nullable=False),
+    sa.Column('period', sa.String(length=16), nullable=False),
+    sa.Column('source_hash', sa.String(length=64), nullable=False),
+    sa.Column('entry_count', sa.Integer(), nullable=False),
+    sa.Column('summary', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('id'),
+    sa.UniqueConstraint('user_id', 'kind', 'period', name='unique_journal_summary_period')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('journal_summaries')
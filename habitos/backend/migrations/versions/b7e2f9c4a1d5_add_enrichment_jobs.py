@@ -0,0 +1,45 @@
+"""add_enrichment_jobs
+
+Revision ID: b7e2f9c4a1d5
+Revises: a3d8e6b1c472
+Create Date: 2026-10-17 18:05:51.624117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2f9c4a1d5'
+down_revision: Union[str, Sequence[str], None] = 'a3d8e6b1c472'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('enrichment_jobs',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('entry_id', sa.String(length=36), nullable=False),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('available_at', sa.DateTime(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['entry_id'], ['journal_entries.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('id')
+    )
+    op.create_index(op.f('ix_enrichment_jobs_entry_id'), 'enrichment_jobs', ['entry_id'], unique=False)
+    op.create_index('ix_enrichment_jobs_status_available_at', 'enrichment_jobs', ['status', 'available_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_enrichment_jobs_status_available_at', table_name='enrichment_jobs')
+    op.drop_index(op.f('ix_enrichment_jobs_entry_id'), table_name='enrichment_jobs')
+    op.drop_table('enrichment_jobs')
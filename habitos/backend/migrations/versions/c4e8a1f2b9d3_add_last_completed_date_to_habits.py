@@ -0,0 +1,31 @@
+"""add_last_completed_date_to_habits
+
+Revision ID: c4e8a1f2b9d3
+Revises: 3a9902290eb4
+Create Date: 2026-10-17 09:12:44.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a1f2b9d3'
+down_revision: Union[str, Sequence[str], None] = '3a9902290eb4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('habits', sa.Column('last_completed_date', sa.Date(), nullable=True))
+    # Existing counters were capped at 30 days; run scripts/reconcile_streaks.py
+    # after upgrading to rebuild them. Habits left with a NULL value recalculate
+    # on their next completion.
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('habits', 'last_completed_date')
@@ -0,0 +1,76 @@
+"""add_access_path_indexes
+
+Revision ID: d7b3f0e6a215
+Revises: c4e8a1f2b9d3
+Create Date: 2026-10-17 10:41:09.552871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7b3f0e6a215'
+down_revision: Union[str, Sequence[str], None] = 'c4e8a1f2b9d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    connection = op.get_bind()
+
+    # Collapse duplicate check-ins (keep the most recently updated one for each
+    # habit_id, date combination), moving their journal entries to the survivor
+    connection.execute(sa.text("""
+        CREATE TEMPORARY TABLE check_in_duplicates ON COMMIT DROP AS
+        SELECT id, first_value(id) OVER (
+            PARTITION BY habit_id, date
+            ORDER BY updated_at DESC, created_at DESC, id
+        ) AS keep_id
+        FROM check_ins
+    """))
+    connection.execute(sa.text("""
+        UPDATE journal_entries
+        SET checkin_id = d.keep_id
+        FROM check_in_duplicates d
+        WHERE journal_entries.checkin_id = d.id AND d.id <> d.keep_id
+    """))
+    connection.execute(sa.text("""
+        DELETE FROM check_ins
+        WHERE id IN (SELECT id FROM check_in_duplicates WHERE id <> keep_id)
+    """))
+
+    # The bulk check-in endpoint already assumes one row per habit per day
+    op.create_unique_constraint('unique_habit_date', 'check_ins', ['habit_id', 'date'])
+
+    # check_ins: per-user date lookups (today, stats, dashboard) and
+    # completed-only habit lookups (streaks, goal progress, due-today counts)
+    op.create_index('ix_check_ins_user_id_date', 'check_ins', ['user_id', 'date'])
+    op.create_index(
+        'ix_check_ins_habit_id_date_completed', 'check_ins', ['habit_id', 'date'],
+        postgresql_where=sa.text('completed = true')
+    )
+
+    # journal_entries: per-user date ranges and check-in cascades
+    op.create_index('ix_journal_entries_user_id_entry_date', 'journal_entries', ['user_id', 'entry_date'])
+    op.create_index('ix_journal_entries_checkin_id', 'journal_entries', ['checkin_id'])
+
+    # goals: per-user status filters
+    op.create_index('ix_goals_user_id_status', 'goals', ['user_id', 'status'])
+
+    # habits: every habit listing filters by owner
+    op.create_index('ix_habits_user_id', 'habits', ['user_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_habits_user_id', table_name='habits')
+    op.drop_index('ix_goals_user_id_status', table_name='goals')
+    op.drop_index('ix_journal_entries_checkin_id', table_name='journal_entries')
+    op.drop_index('ix_journal_entries_user_id_entry_date', table_name='journal_entries')
+    op.drop_index('ix_check_ins_habit_id_date_completed', table_name='check_ins')
+    op.drop_index('ix_check_ins_user_id_date', table_name='check_ins')
+    op.drop_constraint('unique_habit_date', 'check_ins', type_='unique')
@@ -0,0 +1,42 @@
+"""add_keyset_pagination_indexes
+
+Revision ID: e2c9a4d8f1b7
+Revises: d7b3f0e6a215
+Create Date: 2026-10-17 11:52:31.207448
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2c9a4d8f1b7'
+down_revision: Union[str, Sequence[str], None] = 'd7b3f0e6a215'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # List endpoints page on (sort column, id) per user; extending the
+    # per-user date indexes with id keeps their existing lookups covered
+    op.create_index('ix_check_ins_user_id_date_id', 'check_ins', ['user_id', 'date', 'id'])
+    op.drop_index('ix_check_ins_user_id_date', table_name='check_ins')
+
+    op.create_index('ix_journal_entries_user_id_entry_date_id', 'journal_entries', ['user_id', 'entry_date', 'id'])
+    op.drop_index('ix_journal_entries_user_id_entry_date', table_name='journal_entries')
+
+    op.create_index('ix_goals_user_id_created_at_id', 'goals', ['user_id', 'created_at', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_goals_user_id_created_at_id', table_name='goals')
+
+    op.create_index('ix_journal_entries_user_id_entry_date', 'journal_entries', ['user_id', 'entry_date'])
+    op.drop_index('ix_journal_entries_user_id_entry_date_id', table_name='journal_entries')
+
+    op.create_index('ix_check_ins_user_id_date', 'check_ins', ['user_id', 'date'])
+    op.drop_index('ix_check_ins_user_id_date_id', table_name='check_ins')
@@ -0,0 +1,57 @@
+"""add_user_daily_rollups
+
+Revision ID: f5a1c7e3d920
+Revises: e2c9a4d8f1b7
+Create Date: 2026-10-17 14:06:18.552930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5a1c7e3d920'
+down_revision: Union[str, Sequence[str], None] = 'e2c9a4d8f1b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_daily_rollups',
+    sa.Column('user_id', sa.String(length=36), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('check_in_count', sa.Integer(), nullable=False),
+    sa.Column('completed_count', sa.Integer(), nullable=False),
+    sa.Column('mood_sum', sa.Integer(), nullable=False),
+    sa.Column('mood_count', sa.Integer(), nullable=False),
+    sa.Column('journal_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'date')
+    )
+
+    # Backfill from existing history in one set-based pass;
+    # scripts/rebuild_daily_rollups.py recomputes them later if needed
+    op.execute("""
+        INSERT INTO user_daily_rollups
+            (user_id, date, check_in_count, completed_count, mood_sum, mood_count, journal_count)
+        SELECT user_id, day, SUM(check_in_count), SUM(completed_count), SUM(mood_sum), SUM(mood_count), SUM(journal_count)
+        FROM (
+            SELECT user_id, date AS day, COUNT(*) AS check_in_count,
+                   SUM(CASE WHEN completed THEN 1 ELSE 0 END) AS completed_count,
+                   COALESCE(SUM(mood_rating), 0) AS mood_sum, COUNT(mood_rating) AS mood_count,
+                   0 AS journal_count
+            FROM check_ins GROUP BY user_id, date
+            UNION ALL
+            SELECT user_id, entry_date, 0, 0, 0, 0, COUNT(*)
+            FROM journal_entries GROUP BY user_id, entry_date
+        ) activity
+        GROUP BY user_id, day
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_daily_rollups')
@@ -1,20 +1,31 @@
 #!/usr/bin/env python3
 """
-Script to backfill sentiment analysis for existing journal entries
-This script can be run independently to process all entries that don't have sentiment data.
+Script to backfill AI insights for existing journal entries
+Streams entries without insights (or all of them with --force-reprocess)
+in keyset-paginated chunks, generates insights for batches of entries on a
+thread pool under a rate limit, and writes ai_insights, ai_summary and
+insights_generated_at one chunk per transaction. After every committed
+chunk the last entry id is saved to the checkpoint file, so --resume
+continues after a crash or interrupt without redoing finished chunks.
 """
 
 import os
+import re
 import sys
+import json
+import time
 import logging
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 
 # Add the backend directory to the Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from app import create_app, db
 from app.models.journal_entry import JournalEntry
-from app.utils.ai_service import get_ai_service
+from app.utils.ai_service import AIService, AIUnavailableError, GeminiExecutor
+from app.utils.enrichment_queue import RateLimiter
+from app.utils.response_cache import invalidate_users
 
 # Configure logging
 logging.basicConfig(
@@ -27,152 +38,209 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def backfill_sentiment_analysis(limit=None, force_reprocess=False, user_id=None):
+DEFAULT_CHECKPOINT = 'backfill_sentiment.checkpoint.json'
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModel:
+    """Stands in for Gemini in --dry-run: one canned insight per entry after latency seconds"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def generate_content(self, prompt):
+        time.sleep(self.latency)
+        count = len(re.findall(r'^\s*Entry \d+:$', prompt, re.M))
+        return StubResponse(json.dumps([{
+            'insight': 'Dry run insight',
+            'summary': 'Dry run summary',
+            'emotion': 'neutral',
+            'themes': [],
+            'recommendations': []
+        }] * count))
+
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_checkpoint(path, checkpoint):
+    """Write the checkpoint atomically so a crash never leaves it half written"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(temp_path, path)
+
+
+def backfill_insights(ai_service, workers=4, rate_limit=2.0, chunk_size=200, batch_size=10,
+                      limit=None, force_reprocess=False, user_id=None, checkpoint_path=None,
+                      resume=False, dry_run=False):
     """
-    Backfill sentiment analysis for journal entries
-    
+    Backfill AI insights for journal entries
+
     Args:
-        limit (int): Maximum number of entries to process (None for all)
-        force_reprocess (bool): Whether to reprocess entries that already have sentiment
+        ai_service (AIService): Service generating the insights
+        workers (int): Batches generated concurrently
+        rate_limit (float): Gemini calls (batches) per second
+        chunk_size (int): Entries read and committed per transaction
+        batch_size (int): Entries per Gemini call
+        limit (int): Maximum number of entries to process this run (None for all)
+        force_reprocess (bool): Whether to reprocess entries that already have insights
         user_id (str): Specific user ID to process (None for all users)
+        checkpoint_path (str): File recording progress (None to not record it)
+        resume (bool): Continue after the entry recorded in checkpoint_path
+        dry_run (bool): Roll every chunk back instead of committing
+
+    Returns:
+        Dict of counters for this run: entries, enriched, stale, failed, batches, chunks
     """
-    app = create_app()
-    
-    with app.app_context():
-        try:
-            # Initialize AI service
-            ai_service = get_ai_service()
-            if not ai_service.enabled:
-                logger.error("AI service is not enabled. Please check GEMINI_API_KEY configuration.")
-                return False
-            
-            # Build query
-            query = JournalEntry.query
-            
+    options = {'force_reprocess': force_reprocess, 'user_id': user_id}
+    stats = dict.fromkeys(('entries', 'enriched', 'stale', 'failed', 'batches', 'chunks'), 0)
+    last_id = None
+    if resume and checkpoint_path:
+        checkpoint = load_checkpoint(checkpoint_path)
+        if checkpoint and checkpoint['options'] == options:
+            last_id = checkpoint['last_id']
+            logger.info(f"Resuming after entry {last_id}")
+        elif checkpoint:
+            logger.warning("Checkpoint was written with different options, starting over")
+
+    rate_limiter = RateLimiter(rate_limit)
+
+    def generate(contents):
+        rate_limiter.acquire()
+        return ai_service.generate_entry_insights(contents)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='backfill') as pool:
+        while limit is None or stats['entries'] < limit:
+            query = db.session.query(JournalEntry.id, JournalEntry.user_id, JournalEntry.content, JournalEntry.updated_at)
             if user_id:
-                query = query.filter_by(user_id=user_id)
-            
+                query = query.filter(JournalEntry.user_id == user_id)
             if not force_reprocess:
-                # Only process entries that don't have sentiment data
-                query = query.filter(JournalEntry.sentiment.is_(None))
-            
-            # Order by most recent first
-            query = query.order_by(JournalEntry.created_at.desc())
-            
-            if limit:
-                query = query.limit(limit)
-            
-            entries = query.all()
-            
-            if not entries:
-                logger.info("No entries found for sentiment analysis")
-                return True
-            
-            logger.info(f"Found {len(entries)} entries to process")
-            
-            # Process entries
-            processed = 0
-            skipped = 0
-            errors = []
-            
-            for i, entry in enumerate(entries, 1):
-                try:
-                    logger.info(f"Processing entry {i}/{len(entries)}: {entry.id}")
-                    
-                    # Skip if already has sentiment and not forcing reprocess
-                    if entry.sentiment and not force_reprocess:
-                        logger.info(f"Skipping entry {entry.id} - already has sentiment")
-                        skipped += 1
-                        continue
-                    
-                    # Analyze sentiment
-                    entry.analyze_sentiment()
-                    processed += 1
-                    
-                    logger.info(f"Successfully processed entry {entry.id} - sentiment: {entry.sentiment.value if entry.sentiment else 'None'}")
-                    
-                    # Commit every 10 entries to avoid long transactions
-                    if processed % 10 == 0:
-                        db.session.commit()
-                        logger.info(f"Committed {processed} entries so far")
-                    
-                except Exception as e:
-                    logger.error(f"Error processing entry {entry.id}: {e}")
-                    errors.append({
-                        'entry_id': entry.id,
-                        'error': str(e)
-                    })
-                    skipped += 1
-            
-            # Final commit
+                query = query.filter(JournalEntry.ai_insights.is_(None))
+            if last_id is not None:
+                query = query.filter(JournalEntry.id > last_id)
+            size = chunk_size if limit is None else min(chunk_size, limit - stats['entries'])
+            rows = query.order_by(JournalEntry.id).limit(size).all()
+            if not rows:
+                break
+            # Don't hold the read transaction open while Gemini works
             db.session.commit()
-            
-            logger.info(f"Backfill completed!")
-            logger.info(f"Processed: {processed}")
-            logger.info(f"Skipped: {skipped}")
-            logger.info(f"Errors: {len(errors)}")
-            
-            if errors:
-                logger.error("Errors encountered:")
-                for error in errors:
-                    logger.error(f"  Entry {error['entry_id']}: {error['error']}")
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"Failed to backfill sentiment: {e}")
-            db.session.rollback()
-            return False
+
+            batches = [rows[i:i + batch_size] for i in range(0, len(rows), batch_size)]
+            futures = [pool.submit(generate, [row.content for row in batch]) for batch in batches]
+
+            generated_at = datetime.now(timezone.utc)
+            changed_users = set()
+            for batch, future in zip(batches, futures):
+                stats['batches'] += 1
+                try:
+                    insights = future.result()
+                except AIUnavailableError as e:
+                    logger.error(f"Batch of {len(batch)} entries from {batch[0].id} failed: {e}")
+                    stats['failed'] += len(batch)
+                    continue
+                for row, insight in zip(batch, insights):
+                    if JournalEntry.store_insights(row.id, row.updated_at, insight, generated_at):
+                        stats['enriched'] += 1
+                        changed_users.add(row.user_id)
+                    else:
+                        # Edited since it was read; its edit queued enrichment of the new content
+                        stats['stale'] += 1
+
+            last_id = rows[-1].id
+            stats['entries'] += len(rows)
+            stats['chunks'] += 1
+            if dry_run:
+                db.session.rollback()
+            else:
+                db.session.commit()
+                invalidate_users(changed_users)
+                if checkpoint_path:
+                    save_checkpoint(checkpoint_path, {'last_id': last_id, 'options': options})
+            logger.info(f"Chunk {stats['chunks']}: {stats['entries']} entries, {stats['enriched']} enriched, "
+                        f"{stats['failed']} failed")
+
+    return stats
+
 
 def main():
     """Main function to run the backfill script"""
     import argparse
-    
-    parser = argparse.ArgumentParser(description='Backfill sentiment analysis for journal entries')
+
+    parser = argparse.ArgumentParser(description='Backfill AI insights for journal entries')
     parser.add_argument('--limit', type=int, help='Maximum number of entries to process')
-    parser.add_argument('--force-reprocess', action='store_true', help='Reprocess entries that already have sentiment')
+    parser.add_argument('--force-reprocess', action='store_true', help='Reprocess entries that already have insights')
     parser.add_argument('--user-id', type=str, help='Process entries for specific user only')
-    parser.add_argument('--dry-run', action='store_true', help='Show what would be processed without making changes')
-    
+    parser.add_argument('--workers', type=int, default=4, help='Batches generated concurrently')
+    parser.add_argument('--rate-limit', type=float, default=2.0, help='Gemini calls per second')
+    parser.add_argument('--chunk-size', type=int, default=200, help='Entries committed per transaction')
+    parser.add_argument('--batch-size', type=int, default=10, help='Entries per Gemini call')
+    parser.add_argument('--checkpoint', type=str, default=DEFAULT_CHECKPOINT, help='Progress file for --resume')
+    parser.add_argument('--resume', action='store_true', help='Continue from the checkpoint file')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Run the pipeline against a stub model and roll back, to measure throughput')
+    parser.add_argument('--stub-latency', type=float, default=0.5, help='Seconds per stub call in --dry-run')
+
     args = parser.parse_args()
-    
-    if args.dry_run:
-        logger.info("DRY RUN MODE - No changes will be made")
-        # For dry run, we'll just count entries
-        app = create_app()
-        with app.app_context():
-            query = JournalEntry.query
-            if args.user_id:
-                query = query.filter_by(user_id=args.user_id)
-            if not args.force_reprocess:
-                query = query.filter(JournalEntry.sentiment.is_(None))
-            
-            count = query.count()
-            logger.info(f"Would process {count} entries")
-            return
-    
-    logger.info("Starting sentiment analysis backfill...")
-    logger.info(f"Limit: {args.limit or 'No limit'}")
-    logger.info(f"Force reprocess: {args.force_reprocess}")
-    logger.info(f"User ID: {args.user_id or 'All users'}")
-    
-    start_time = datetime.now()
-    success = backfill_sentiment_analysis(
-        limit=args.limit,
-        force_reprocess=args.force_reprocess,
-        user_id=args.user_id
-    )
-    end_time = datetime.now()
-    
-    duration = end_time - start_time
-    logger.info(f"Backfill completed in {duration}")
-    
-    if success:
-        logger.info("Backfill completed successfully!")
-        sys.exit(0)
-    else:
-        logger.error("Backfill failed!")
-        sys.exit(1)
+
+    app = create_app()
+    with app.app_context():
+        # Its own executor, sized to the pool, so batches don't wait for the web process's slots
+        executor = GeminiExecutor(max_concurrency=args.workers, timeout=float(os.getenv('GEMINI_TIMEOUT', 60)))
+        if args.dry_run:
+            logger.info("DRY RUN MODE - stub model, no changes will be made")
+            ai_service = AIService(api_key='dry-run', model=StubModel(args.stub_latency), executor=executor)
+        else:
+            ai_service = AIService(executor=executor)
+            if not ai_service.enabled:
+                logger.error("AI service is not enabled. Please check GEMINI_API_KEY configuration.")
+                sys.exit(1)
+
+        logger.info(f"Starting insights backfill: limit {args.limit or 'none'}, user {args.user_id or 'all'}, "
+                    f"{args.workers} workers at {args.rate_limit} calls/s, "
+                    f"chunks of {args.chunk_size}, batches of {args.batch_size}")
+        start_time = time.perf_counter()
+        try:
+            stats = backfill_insights(
+                ai_service,
+                workers=args.workers,
+                rate_limit=args.rate_limit,
+                chunk_size=args.chunk_size,
+                batch_size=args.batch_size,
+                limit=args.limit,
+                force_reprocess=args.force_reprocess,
+                user_id=args.user_id,
+                checkpoint_path=None if args.dry_run else args.checkpoint,
+                resume=args.resume,
+                dry_run=args.dry_run
+            )
+        except KeyboardInterrupt:
+            db.session.rollback()
+            logger.warning(f"Interrupted; rerun with --resume to continue from {args.checkpoint}")
+            sys.exit(1)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Backfill failed: {e}; rerun with --resume to continue from {args.checkpoint}")
+            sys.exit(1)
+        elapsed = time.perf_counter() - start_time
+
+    logger.info(f"Backfill completed in {elapsed:.1f}s")
+    logger.info(f"Entries: {stats['entries']} in {stats['chunks']} chunks, {stats['batches']} Gemini calls")
+    logger.info(f"Enriched: {stats['enriched']}, edited meanwhile: {stats['stale']}, failed: {stats['failed']}")
+    logger.info(f"Throughput: {stats['entries'] / elapsed if elapsed else 0:.1f} entries/s")
+    if stats['failed']:
+        logger.warning("Failed entries still have no insights; rerun without --resume to retry them")
+    if not args.dry_run and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark repeated POST /api/ai/journal/monthly-summary requests
+Times constructing an AIService (what every request used to do) against
+fetching the shared instance, then sends repeated monthly-summary requests
+for the same month to a fake Gemini model with --latency seconds of
+simulated upstream latency, with the shared cache and with force_refresh
+(every request regenerating, as when the route cleared the cache).
+
+Usage:
+    python scripts/benchmark_ai_service.py --requests 20 --latency 0.8
+"""
+
+import io
+import os
+import sys
+import time
+import logging
+import contextlib
+from datetime import date, timedelta
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models.user import User
+from app.models.habit import Habit
+from app.models.check_in import CheckIn
+from app.models.journal_entry import JournalEntry
+import app.utils.ai_service as ai_module
+from app.utils.ai_service import AIService, get_ai_service
+from scripts.check_ai_client import FakeModel
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+
+CONSTRUCTION_ROUNDS = 50
+
+
+def seed(entry_count):
+    """A user with entry_count journaled check-ins this month. Returns the user id."""
+    user = User(email='ai-bench@example.com')
+    db.session.add(user)
+    db.session.flush()
+    first_of_month = date.today().replace(day=1)
+    habits = [Habit(user_id=user.id, title=f'Journal {i}', start_date=first_of_month) for i in range(entry_count // 28 + 1)]
+    db.session.add_all(habits)
+    db.session.flush()
+
+    for n in range(entry_count):
+        habit = habits[n // 28]
+        day = first_of_month + timedelta(days=n % 28)
+        check_in = CheckIn(habit_id=habit.id, user_id=user.id, date=day, completed=True, mood_rating=n % 10 + 1)
+        db.session.add(check_in)
+        db.session.flush()
+        db.session.add(JournalEntry(user_id=user.id, checkin_id=check_in.id, entry_date=day,
+                                    content=f'Entry {n}: wrote about the day, work and sleep. ' * 5))
+    db.session.commit()
+    return user.id
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+    """Main function to run the AI service benchmark"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Time repeated monthly-summary requests against a fake Gemini model')
+    parser.add_argument('--requests', type=int, default=20, help='Requests per mode')
+    parser.add_argument('--latency', type=float, default=0.8, help='Simulated Gemini latency in seconds')
+    parser.add_argument('--entries', type=int, default=30, help='Journal entries in the month')
+
+    args = parser.parse_args()
+
+    # Per-request construction (dotenv, genai.configure, GenerativeModel, cache) vs the shared instance
+    start = time.perf_counter()
+    for _ in range(CONSTRUCTION_ROUNDS):
+        AIService(api_key='benchmark-key')
+    construct_ms = (time.perf_counter() - start) * 1000 / CONSTRUCTION_ROUNDS
+    get_ai_service()
+    start = time.perf_counter()
+    for _ in range(CONSTRUCTION_ROUNDS):
+        get_ai_service()
+    shared_ms = (time.perf_counter() - start) * 1000 / CONSTRUCTION_ROUNDS
+    logger.info(f"AIService(): {construct_ms:.2f} ms per construction, get_ai_service(): {shared_ms:.4f} ms")
+
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        user_id = seed(args.entries)
+        client = app.test_client()
+        headers = {'Authorization': f'Bearer {create_access_token(identity=user_id)}'}
+        month = date.today().strftime('%Y-%m')
+
+        # The shared instance, with a fake model standing in for Gemini
+        model = FakeModel(latency=args.latency)
+        ai_module.ai_service = AIService(api_key='fake', model=model)
+
+        for mode, force_refresh in (('force_refresh', True), ('shared cache', False)):
+            ai_module.ai_service.clear_all_cache()
+            calls_before = model.calls
+            timings = []
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                # The route prints debug output on every request
+                with contextlib.redirect_stdout(io.StringIO()):
+                    response = client.post('/api/ai/journal/monthly-summary', headers=headers,
+                                           json={'month': month, 'force_refresh': force_refresh})
+                timings.append((time.perf_counter() - start) * 1000)
+                summary = response.get_json()['summary']
+                assert response.status_code == 200 and not summary['is_fallback'], summary
+
+            logger.info(f"{mode:<14} first {timings[0]:8.1f} ms  mean {sum(timings) / len(timings):8.1f} ms  "
+                        f"p50 {percentile(timings, 0.5):8.1f} ms  p95 {percentile(timings, 0.95):8.1f} ms  "
+                        f"Gemini calls {model.calls - calls_before}")
+
+
+if __name__ == '__main__':
+    main()
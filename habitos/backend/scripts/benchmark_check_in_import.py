@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for POST /api/check-ins/import
+Imports a synthetic history (JSON and CSV bodies) for one user and reports
+rows per second, then checks the maintained streaks against a recomputation.
+Runs against in-memory SQLite by default; pass --config development with
+DATABASE_URL pointing at PostgreSQL to measure there. The benchmark user and
+its data are deleted afterwards.
+
+Usage:
+    python scripts/benchmark_check_in_import.py --rows 100000
+    DATABASE_URL=postgresql://... python scripts/benchmark_check_in_import.py --config development
+"""
+
+import os
+import sys
+import io
+import csv
+import time
+import logging
+from datetime import date, timedelta
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models.user import User
+from app.models.habit import Habit, calculate_streaks
+from app.models.check_in import CheckIn
+from app.models.goal import Goal, GoalType
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+
+
+def seed_user(email, habit_count):
+    """A user with habit_count habits and a count goal on each"""
+    user = User(email=email)
+    db.session.add(user)
+    db.session.flush()
+
+    for i in range(habit_count):
+        habit = Habit(user_id=user.id, title=f'Imported habit {i}', start_date=date(2000, 1, 1))
+        db.session.add(habit)
+        db.session.flush()
+        db.session.add(Goal(
+            user_id=user.id, habit_id=habit.id, title=f'Goal {i}', goal_type=GoalType.COUNT,
+            target_value=100, start_date=date(2000, 1, 1)
+        ))
+
+    db.session.commit()
+    return user
+
+
+def import_rows(habit_ids, total_rows, day_offset=0):
+    """total_rows rows spread evenly over the habits, newest day last"""
+    days = -(-total_rows // len(habit_ids))
+    today = date.today()
+    rows = []
+    for habit_index, habit_id in enumerate(habit_ids):
+        for d in range(days):
+            if len(rows) == total_rows:
+                return rows
+            rows.append({
+                'habit_id': habit_id,
+                'date': (today - timedelta(days=days - d + day_offset)).isoformat(),
+                'completed': (d + habit_index) % 5 != 0,
+                'actual_value': float(d % 60),
+                'mood_rating': d % 10 + 1
+            })
+    return rows
+
+
+def to_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+def verify(user_id):
+    """Maintained streaks must match a recomputation from the stored rows"""
+    mismatches = 0
+    for habit in Habit.query.filter_by(user_id=user_id).all():
+        dates = [day for (day,) in db.session.query(CheckIn.date).filter_by(
+            habit_id=habit.id, completed=True
+        ).distinct().order_by(CheckIn.date)]
+        if calculate_streaks(dates) != (habit.current_streak, habit.longest_streak, habit.last_completed_date):
+            mismatches += 1
+    return mismatches
+
+
+def cleanup(user_id):
+    """Remove the benchmark user and everything it owns"""
+    for model in (Goal, CheckIn, Habit, User):
+        column = model.id if model is User else model.user_id
+        db.session.query(model).filter(column == user_id).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def main():
+    """Main function to run the import benchmark"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Measure check-in import throughput')
+    parser.add_argument('--rows', type=int, default=100000, help='Rows per import')
+    parser.add_argument('--habits', type=int, default=100, help='Habits the rows are spread over')
+    parser.add_argument('--config', default='testing', help='App configuration (testing uses in-memory SQLite)')
+
+    args = parser.parse_args()
+
+    app = create_app(args.config)
+    with app.app_context():
+        db.create_all()
+        client = app.test_client()
+        user = seed_user(f'import-bench-{int(time.time())}@example.com', args.habits)
+        headers = {'Authorization': f'Bearer {create_access_token(identity=user.id)}'}
+        habit_ids = [habit.id for habit in Habit.query.filter_by(user_id=user.id)]
+
+        try:
+            rows = import_rows(habit_ids, args.rows)
+            bodies = [
+                ('json (insert)', {'json': rows}),
+                ('json (update)', {'json': rows}),
+                ('csv (insert)', {'data': to_csv(import_rows(habit_ids, args.rows, day_offset=len(rows))),
+                                  'content_type': 'text/csv'}),
+            ]
+
+            logger.info(f"{db.engine.dialect.name}: {args.rows} rows over {args.habits} habits")
+            for name, body in bodies:
+                db.session.expunge_all()
+                start = time.perf_counter()
+                response = client.post('/api/check-ins/import', headers=headers, **body)
+                elapsed = time.perf_counter() - start
+
+                result = response.get_json()
+                if response.status_code != 201 or result['error_count']:
+                    logger.error(f"{name}: {response.status_code} {result}")
+                    sys.exit(1)
+                logger.info(f"{name:<16} {elapsed:8.2f} s  {result['row_count'] / elapsed:10.0f} rows/s")
+
+            db.session.expunge_all()
+            mismatches = verify(user.id)
+            if mismatches:
+                logger.error(f"{mismatches} habits have inconsistent streaks")
+                sys.exit(1)
+            logger.info("Streaks match a recomputation for every habit")
+        finally:
+            db.session.rollback()
+            cleanup(user.id)
+
+
+if __name__ == '__main__':
+    main()
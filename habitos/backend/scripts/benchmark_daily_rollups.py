@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Benchmark analytics reads against per-user daily rollups
+Seeds --users users with --years of daily check-ins on --habits habits each
+(plus one heavy user with --heavy-habits habits) into in-memory SQLite,
+builds their rollups, then times GET /api/dashboard and /api/users/stats
+next to the raw check-in scans those endpoints used to run. Rollup-backed
+reads should cost the same for the heavy user as for a typical one.
+
+Usage:
+    python scripts/benchmark_daily_rollups.py --users 10000 --years 3
+"""
+
+import os
+import sys
+import time
+import random
+import logging
+from datetime import date, datetime, timedelta, timezone
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import func, case, or_
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models.user import User
+from app.models.habit import Habit
+from app.models.check_in import CheckIn
+from app.models.user_daily_rollup import UserDailyRollup
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+
+ROUNDS = 20
+SAMPLE_USERS = 20
+CHUNK_SIZE = 50000
+ROLLUP_USER_BATCH = 200
+
+
+def seed(user_count, habit_count, days, heavy_habits):
+    """Users with `days` of history; the last user is the heavy one. Returns user ids."""
+    now = datetime.now(timezone.utc)
+    today = date.today()
+    rng = random.Random(42)
+
+    user_ids = []
+    check_ins = []
+    for u in range(user_count + 1):
+        heavy = u == user_count
+        user = User(email=f'rollup-bench-{u}@example.com')
+        db.session.add(user)
+        db.session.flush()
+        habits = [Habit(user_id=user.id, title=f'Habit {i}', start_date=today - timedelta(days=days))
+                  for i in range(heavy_habits if heavy else habit_count)]
+        db.session.add_all(habits)
+        db.session.flush()
+        user_ids.append(user.id)
+
+        for habit in habits:
+            for d in range(days):
+                check_ins.append({
+                    'id': f'{u}-{habit.id[:8]}-{d}', 'habit_id': habit.id, 'user_id': user.id,
+                    'date': today - timedelta(days=d), 'completed': rng.random() < 0.8,
+                    'mood_rating': rng.randint(1, 10), 'created_at': now, 'updated_at': now
+                })
+        if len(check_ins) >= CHUNK_SIZE:
+            db.session.execute(CheckIn.__table__.insert(), check_ins)
+            check_ins.clear()
+    if check_ins:
+        db.session.execute(CheckIn.__table__.insert(), check_ins)
+    db.session.commit()
+
+    for i in range(0, len(user_ids), ROLLUP_USER_BATCH):
+        UserDailyRollup.rebuild(user_ids[i:i + ROLLUP_USER_BATCH])
+        db.session.commit()
+    return user_ids
+
+
+def raw_dashboard_scan(user_id, today):
+    """The dashboard's former load: every completed (habit, day) in the user's history"""
+    return db.session.query(
+        CheckIn.habit_id, CheckIn.date,
+        func.sum(case((CheckIn.completed == True, 1), else_=0)), func.max(CheckIn.mood_rating)
+    ).filter(
+        CheckIn.user_id == user_id,
+        or_(CheckIn.completed == True, CheckIn.date == today)
+    ).group_by(CheckIn.habit_id, CheckIn.date).all()
+
+
+def raw_stats_scan(user_id, start_date):
+    """The stats endpoint's former load: every check-in row in the window"""
+    return CheckIn.query.filter(CheckIn.user_id == user_id, CheckIn.date >= start_date).all()
+
+
+def timed_ms(fn):
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        fn()
+        db.session.expunge_all()
+    return (time.perf_counter() - start) * 1000 / ROUNDS
+
+
+def main():
+    """Main function to run the rollup benchmark"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Time analytics endpoints backed by daily rollups')
+    parser.add_argument('--users', type=int, default=10000, help='Typical users to seed')
+    parser.add_argument('--years', type=int, default=3, help='Years of daily history per user')
+    parser.add_argument('--habits', type=int, default=2, help='Habits per typical user')
+    parser.add_argument('--heavy-habits', type=int, default=50, help='Habits of the heavy user')
+
+    args = parser.parse_args()
+
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        days = args.years * 365
+        start = time.perf_counter()
+        user_ids = seed(args.users, args.habits, days, args.heavy_habits)
+        check_in_total = db.session.query(func.count(CheckIn.id)).scalar()
+        rollup_total = db.session.query(func.count()).select_from(UserDailyRollup).scalar()
+        logger.info(f"Seeded {len(user_ids)} users, {check_in_total} check-ins, {rollup_total} rollup rows "
+                    f"in {time.perf_counter() - start:.0f} s")
+
+        client = app.test_client()
+        today = date.today()
+        samples = [('typical', uid) for uid in random.Random(7).sample(user_ids[:-1], min(SAMPLE_USERS, len(user_ids) - 1))]
+        samples.append(('heavy', user_ids[-1]))
+
+        results = {}
+        for kind, user_id in samples:
+            headers = {'Authorization': f'Bearer {create_access_token(identity=user_id)}'}
+
+            def endpoint(url):
+                def call():
+                    response = client.get(url, headers=headers)
+                    assert response.status_code == 200, response.get_json()
+                return call
+
+            timings = (
+                timed_ms(endpoint('/api/dashboard')),
+                timed_ms(lambda: raw_dashboard_scan(user_id, today)),
+                timed_ms(endpoint('/api/users/stats?days=30')),
+                timed_ms(lambda: raw_stats_scan(user_id, today - timedelta(days=30))),
+            )
+            results.setdefault(kind, []).append(timings)
+
+        logger.info(f"{'user':<10}{'dashboard ms':>14}{'raw scan ms':>13}{'stats ms':>10}{'raw scan ms':>13}")
+        averages = {}
+        for kind, rows in results.items():
+            averages[kind] = [sum(column) / len(column) for column in zip(*rows)]
+            logger.info(f"{kind:<10}" + ''.join(f'{value:>{width}.2f}' for value, width in zip(averages[kind], (14, 13, 10, 13))))
+
+        # The heavy user has heavy_habits / habits times the check-ins; rollup
+        # reads only grow with the per-habit work the endpoints still do
+        ratio = averages['heavy'][2] / averages['typical'][2]
+        logger.info(f"stats: heavy user costs {ratio:.1f}x a typical user "
+                    f"with {args.heavy_habits / args.habits:.0f}x the check-ins")
+
+
+if __name__ == '__main__':
+    main()
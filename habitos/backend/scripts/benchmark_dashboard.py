@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Query-count check and latency benchmark for GET /api/dashboard
+Seeds users with a growing number of habits and streak lengths into an
+in-memory SQLite database and asserts the endpoint's query count stays flat.
+"""
+
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import event
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models.user import User
+from app.models.habit import Habit
+from app.models.check_in import CheckIn
+from app.models.user_daily_rollup import UserDailyRollup
+
+SCENARIOS = [(1, 1), (5, 30), (20, 100), (20, 365)]
+MAX_QUERIES = 6
+
+
+def seed_user(email, habit_count, streak_days):
+    """Create a user whose habits have all been completed for streak_days"""
+    user = User(email=email)
+    db.session.add(user)
+    db.session.flush()
+
+    today = date.today()
+    for i in range(habit_count):
+        habit = Habit(user_id=user.id, title=f'Habit {i}', start_date=today - timedelta(days=streak_days))
+        db.session.add(habit)
+        db.session.flush()
+        db.session.bulk_save_objects([
+            CheckIn(habit_id=habit.id, user_id=user.id, date=today - timedelta(days=d), completed=True, mood_rating=7)
+            for d in range(streak_days)
+        ])
+
+    UserDailyRollup.rebuild([user.id])
+    db.session.commit()
+    return user
+
+
+def main():
+    app = create_app('testing')
+
+    with app.app_context():
+        db.create_all()
+        client = app.test_client()
+
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+        print(f"{'habits':>7} {'streak':>7} {'queries':>8} {'ms':>8}")
+        failed = False
+        for habit_count, streak_days in SCENARIOS:
+            user = seed_user(f'bench-{habit_count}-{streak_days}@example.com', habit_count, streak_days)
+            headers = {'Authorization': f'Bearer {create_access_token(identity=user.id)}'}
+            db.session.expunge_all()
+
+            statements.clear()
+            start = time.perf_counter()
+            response = client.get('/api/dashboard', headers=headers)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            assert response.status_code == 200, response.get_json()
+            print(f"{habit_count:>7} {streak_days:>7} {len(statements):>8} {elapsed_ms:>8.1f}")
+            if len(statements) > MAX_QUERIES:
+                failed = True
+
+        if failed:
+            print(f"FAIL: dashboard exceeded {MAX_QUERIES} queries")
+            sys.exit(1)
+        print("OK: dashboard query count is independent of habit count and streak length")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Benchmark /api/users/data-export: buffered JSON vs the streaming modes
+Seeds a synthetic user with a long check-in history into in-memory SQLite
+and, for each export mode, measures time to first byte, total time, bytes
+sent and peak RSS growth while the export runs (Linux; the peak is reset
+between modes through /proc/self/clear_refs).
+
+Usage:
+    python scripts/benchmark_data_export.py --check-ins 500000
+"""
+
+import os
+import sys
+import time
+import zlib
+import json
+import logging
+from datetime import date, datetime, timedelta, timezone
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models.user import User
+from app.models.habit import Habit
+from app.models.check_in import CheckIn
+from app.models.journal_entry import JournalEntry
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+
+MODES = [
+    ('buffered json', ''),
+    ('streamed json', '?stream=true'),
+    ('ndjson', '?format=ndjson'),
+    ('ndjson + gzip', '?format=ndjson&gzip=true'),
+]
+CHUNK_SIZE = 10000
+
+
+def seed(check_in_count, habit_count):
+    """A user with check_in_count check-ins spread over habit_count habits"""
+    user = User(email='export-bench@example.com')
+    db.session.add(user)
+    db.session.flush()
+
+    habits = [Habit(user_id=user.id, title=f'Habit {i}', start_date=date(2000, 1, 1)) for i in range(habit_count)]
+    db.session.add_all(habits)
+    db.session.flush()
+
+    now = datetime.now(timezone.utc)
+    today = date.today()
+    days = -(-check_in_count // habit_count)
+    check_ins, entries = [], []
+    for n in range(check_in_count):
+        habit = habits[n % habit_count]
+        day = today - timedelta(days=n // habit_count)
+        check_in_id = f'ci-{n}'
+        check_ins.append({
+            'id': check_in_id, 'habit_id': habit.id, 'user_id': user.id, 'date': day,
+            'completed': n % 3 != 0, 'mood_rating': n % 10 + 1, 'created_at': now, 'updated_at': now
+        })
+        if n % habit_count == 0 and n // habit_count % 7 == 0:
+            entries.append({
+                'id': f'je-{n}', 'user_id': user.id, 'checkin_id': check_in_id, 'entry_date': day,
+                'content': 'Synthetic journal entry ' * 10, 'created_at': now, 'updated_at': now
+            })
+        if len(check_ins) >= CHUNK_SIZE:
+            db.session.execute(CheckIn.__table__.insert(), check_ins)
+            check_ins.clear()
+    if check_ins:
+        db.session.execute(CheckIn.__table__.insert(), check_ins)
+    if entries:
+        db.session.execute(JournalEntry.__table__.insert(), entries)
+
+    db.session.commit()
+    logger.info(f"Seeded {check_in_count} check-ins over {habit_count} habits x {days} days, {len(entries)} journal entries")
+    return user
+
+
+def reset_peak_rss():
+    """Reset the kernel's peak RSS counter for this process (Linux only)"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def rss_mb(field):
+    """VmRSS / VmHWM of this process in MB"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def run(client, headers, query):
+    """Issue one export and consume the body as a client would"""
+    start = time.perf_counter()
+    response = client.get(f'/api/users/data-export{query}', headers=headers, buffered=False)
+    first_byte = None
+    size = 0
+    body = []
+    for chunk in response.response:
+        if first_byte is None and chunk:
+            first_byte = time.perf_counter() - start
+        size += len(chunk)
+        # Keep only the first chunk for validation, like a client writing to disk
+        if not body:
+            body.append(chunk)
+    response.close()
+    return response, first_byte, time.perf_counter() - start, size, body[0] if body else b''
+
+
+def main():
+    """Main function to run the export benchmark"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Compare buffered and streaming data exports')
+    parser.add_argument('--check-ins', type=int, default=500000, help='Check-ins for the synthetic user')
+    parser.add_argument('--habits', type=int, default=20, help='Habits the check-ins are spread over')
+
+    args = parser.parse_args()
+
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        user = seed(args.check_ins, args.habits)
+        client = app.test_client()
+        headers = {'Authorization': f'Bearer {create_access_token(identity=user.id)}'}
+
+        logger.info(f"{'mode':<16}{'status':>7}{'ttfb s':>9}{'total s':>9}{'MB sent':>9}{'peak RSS +MB':>14}")
+        for name, query in MODES:
+            db.session.expunge_all()
+            can_reset = reset_peak_rss()
+            baseline = rss_mb('VmRSS')
+
+            response, first_byte, total, size, first_chunk = run(client, headers, query)
+            peak = rss_mb('VmHWM') - baseline if can_reset else float('nan')
+
+            if 'gzip' in query:
+                first_chunk = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(first_chunk)
+            if 'ndjson' in query:
+                assert json.loads(first_chunk.split(b'\n', 1)[0])['type'] == 'export'
+
+            logger.info(f"{name:<16}{response.status_code:>7}{first_byte:>9.3f}{total:>9.2f}"
+                        f"{size / 1024 / 1024:>9.1f}{peak:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
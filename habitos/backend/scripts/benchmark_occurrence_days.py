@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark schedule checks before and after caching parsed occurrence_days
+Compares the previous implementation (json.loads on every access and the
+weekday-name list rebuilt per check) with the cached weekday/month-day masks,
+for is_due_today and calculate_completion_rate on unsaved habits.
+"""
+
+import os
+import sys
+import json
+import time
+from datetime import datetime, timezone, timedelta
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.models.habit import Habit, HabitFrequency
+
+ROUNDS = 20000
+WINDOW_DAYS = 30
+
+
+def legacy_occurrence_days_list(habit):
+    """occurrence_days_list as it was: parsed on every access"""
+    try:
+        return json.loads(habit.occurrence_days) if habit.occurrence_days else []
+    except (json.JSONDecodeError, TypeError):
+        return []
+
+
+def legacy_is_scheduled_day(habit, date):
+    """_is_scheduled_day as it was: weekday list rebuilt and days re-parsed per call"""
+    if habit.frequency == HabitFrequency.DAILY:
+        return True
+    elif habit.frequency == HabitFrequency.WEEKLY:
+        weekday_names = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+        return weekday_names[date.weekday()] in legacy_occurrence_days_list(habit)
+    elif habit.frequency == HabitFrequency.MONTHLY:
+        return date.day in legacy_occurrence_days_list(habit)
+    elif habit.frequency == HabitFrequency.CUSTOM:
+        return True
+    return False
+
+
+def legacy_is_due_today(habit, completion_counts):
+    """is_due_today with the legacy schedule check"""
+    today = datetime.now(timezone.utc).date()
+    if today < habit.start_date:
+        return False
+    if habit.frequency == HabitFrequency.DAILY:
+        return True
+    if habit.frequency in (HabitFrequency.WEEKLY, HabitFrequency.MONTHLY) and not legacy_is_scheduled_day(habit, today):
+        return False
+
+    today_count, week_count, month_count = completion_counts
+    required_count = max(habit.frequency_count, 1)
+    if habit.frequency == HabitFrequency.WEEKLY:
+        return week_count < required_count
+    elif habit.frequency == HabitFrequency.MONTHLY:
+        return month_count < required_count
+    return today_count < required_count
+
+
+def legacy_completion_rate(habit, check_ins, days=WINDOW_DAYS):
+    """calculate_completion_rate with the per-day schedule check and parse"""
+    end_date = datetime.now(timezone.utc).date()
+    current_date = end_date - timedelta(days=days)
+
+    total_expected = 0
+    while current_date <= end_date:
+        if current_date >= habit.start_date and legacy_is_scheduled_day(habit, current_date):
+            if habit.frequency == HabitFrequency.DAILY:
+                total_expected += 1
+            else:
+                total_expected += 1 if habit.occurrence_days_list else max(habit.frequency_count, 1)
+        current_date += timedelta(days=1)
+
+    completed = len([ci for ci in check_ins if ci.completed])
+    return (completed / total_expected * 100) if total_expected > 0 else 0
+
+
+def timed(fn):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        fn()
+    return (time.perf_counter() - start) * 1e6 / ROUNDS
+
+
+def main():
+    start_date = datetime.now(timezone.utc).date() - timedelta(days=365)
+    habits = [
+        Habit(frequency=HabitFrequency.WEEKLY, frequency_count=7,
+              occurrence_days_list=['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'],
+              start_date=start_date),
+        Habit(frequency=HabitFrequency.MONTHLY, frequency_count=31,
+              occurrence_days_list=list(range(1, 32)), start_date=start_date),
+    ]
+    completion_counts = (0, 0, 0)
+    check_ins = []
+
+    print(f"{'frequency':<12}{'call':<28}{'before us':>12}{'after us':>12}{'speedup':>10}")
+    for habit in habits:
+        assert legacy_is_due_today(habit, completion_counts) == habit.is_due_today(completion_counts)
+
+        rows = [
+            ('is_due_today',
+             lambda: legacy_is_due_today(habit, completion_counts),
+             lambda: habit.is_due_today(completion_counts)),
+            ('calculate_completion_rate',
+             lambda: legacy_completion_rate(habit, check_ins),
+             lambda: habit.calculate_completion_rate(WINDOW_DAYS, check_ins=check_ins)),
+        ]
+        for name, before, after in rows:
+            before_us = timed(before)
+            after_us = timed(after)
+            print(f"{habit.frequency.value:<12}{name:<28}{before_us:>12.2f}{after_us:>12.2f}{before_us / after_us:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
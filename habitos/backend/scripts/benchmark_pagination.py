@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Latency check for keyset pagination on GET /api/check-ins/
+Seeds one user with a large check-in table (1M rows by default) into
+in-memory SQLite, then times the first page against pages deep into the
+history reached through a cursor, next to the equivalent OFFSET query.
+Fails if a deep page costs noticeably more than the first one, or if
+walking pages skips or repeats rows.
+
+Usage:
+    python scripts/benchmark_pagination.py --rows 1000000
+"""
+
+import os
+import sys
+import time
+import logging
+from datetime import date, datetime, timedelta, timezone
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models.user import User
+from app.models.habit import Habit
+from app.models.check_in import CheckIn
+from app.utils.pagination import encode_cursor
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 50
+DEPTHS = [0.0, 0.1, 0.5, 0.9, 0.999]
+ROUNDS = 20
+# A deep page may cost at most this multiple of the first page
+MAX_SLOWDOWN = 3.0
+CHUNK_SIZE = 20000
+
+
+def seed(rows, habit_count):
+    """A user with rows check-ins; several habits share each date to exercise id tie-breaks"""
+    user = User(email='pagination-bench@example.com')
+    db.session.add(user)
+    db.session.flush()
+    habits = [Habit(user_id=user.id, title=f'Habit {i}', start_date=date(1900, 1, 1)) for i in range(habit_count)]
+    db.session.add_all(habits)
+    db.session.flush()
+
+    now = datetime.now(timezone.utc)
+    today = date.today()
+    batch = []
+    for n in range(rows):
+        batch.append({
+            'id': f'{n:012d}', 'habit_id': habits[n % habit_count].id, 'user_id': user.id,
+            'date': today - timedelta(days=n // habit_count), 'completed': n % 2 == 0,
+            'created_at': now, 'updated_at': now
+        })
+        if len(batch) >= CHUNK_SIZE:
+            db.session.execute(CheckIn.__table__.insert(), batch)
+            batch.clear()
+    if batch:
+        db.session.execute(CheckIn.__table__.insert(), batch)
+    db.session.commit()
+    db.session.execute(db.text('ANALYZE'))
+    return user
+
+
+def timed_ms(fn):
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        fn()
+    return (time.perf_counter() - start) * 1000 / ROUNDS
+
+
+def main():
+    """Main function to run the pagination benchmark"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Compare first-page and deep-page latency')
+    parser.add_argument('--rows', type=int, default=1000000, help='Check-ins for the synthetic user')
+    parser.add_argument('--habits', type=int, default=10, help='Habits sharing each date')
+
+    args = parser.parse_args()
+
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        user = seed(args.rows, args.habits)
+        logger.info(f"Seeded {args.rows} check-ins")
+        client = app.test_client()
+        headers = {'Authorization': f'Bearer {create_access_token(identity=user.id)}'}
+
+        ordered_rows = CheckIn.query.filter_by(user_id=user.id).order_by(CheckIn.date.desc(), CheckIn.id.desc())
+
+        # Walking pages must neither skip nor repeat rows across date ties
+        seen, cursor = [], None
+        for _ in range(5):
+            query = f'?limit={PAGE_SIZE}' + (f'&cursor={cursor}' if cursor else '')
+            page = client.get(f'/api/check-ins/{query}', headers=headers).get_json()
+            seen.extend(row['id'] for row in page['check_ins'])
+            cursor = page['next_cursor']
+        expected = [check_in.id for check_in in ordered_rows.limit(len(seen))]
+        if seen != expected:
+            logger.error("Cursor walk skipped or repeated rows")
+            sys.exit(1)
+        db.session.expunge_all()
+
+        logger.info(f"{'depth':>8}{'offset':>10}{'keyset ms':>12}{'OFFSET ms':>12}")
+        first_page_ms = None
+        failed = False
+        for depth in DEPTHS:
+            offset = int(depth * (args.rows - PAGE_SIZE))
+            query = f'?limit={PAGE_SIZE}'
+            if offset:
+                anchor = ordered_rows.offset(offset - 1).first()
+                query += f'&cursor={encode_cursor(anchor.date, anchor.id)}'
+
+            def keyset():
+                response = client.get(f'/api/check-ins/{query}', headers=headers)
+                assert response.status_code == 200 and len(response.get_json()['check_ins']) == PAGE_SIZE
+                db.session.expunge_all()
+
+            def offset_query():
+                ordered_rows.offset(offset).limit(PAGE_SIZE).all()
+                db.session.expunge_all()
+
+            keyset_ms = timed_ms(keyset)
+            offset_ms = timed_ms(offset_query)
+            first_page_ms = first_page_ms or keyset_ms
+            if keyset_ms > first_page_ms * MAX_SLOWDOWN:
+                failed = True
+            logger.info(f"{depth:>8.3f}{offset:>10}{keyset_ms:>12.2f}{offset_ms:>12.2f}")
+
+        if failed:
+            logger.error(f"A deep page cost more than {MAX_SLOWDOWN}x the first page")
+            sys.exit(1)
+        logger.info("Deep pages cost the same as the first page")
+
+
+if __name__ == '__main__':
+    main()
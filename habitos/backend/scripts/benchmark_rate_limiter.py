@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark rate limit checks
+Times RateLimiter.check per algorithm with the in-process store and with
+the fake Redis from scripts/check_rate_limiter.py (which measures the
+limiter's own overhead). With --redis-url it also times both scripts
+against a real Redis, next to the four-command pipeline the limiter used
+before, and reports round trips per check.
+"""
+
+import os
+import sys
+import time
+import argparse
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import redis
+from app import create_app
+from app.utils.security import RateLimiter, SLIDING_WINDOW, GCRA
+from scripts.check_rate_limiter import FakeRedis
+
+
+def legacy_check(client, key, max_requests, window_seconds):
+    """The previous sliding window: one pipeline of four commands per check"""
+    current_time = int(time.time())
+    pipe = client.pipeline()
+    pipe.zremrangebyscore(key, 0, current_time - window_seconds)
+    pipe.zadd(key, {str(current_time): current_time})
+    pipe.zcard(key)
+    pipe.expire(key, window_seconds)
+    return pipe.execute()[2] > max_requests
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return (
+        sum(samples) / len(samples),
+        samples[len(samples) // 2],
+        samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    )
+
+
+def report(name, function, checks, keys):
+    """Time function(key) checks times over keys distinct clients"""
+    samples = []
+    for i in range(checks):
+        key = f'client-{i % keys}'
+        start = time.perf_counter()
+        function(key)
+        samples.append(time.perf_counter() - start)
+    avg, p50, p99 = percentiles(samples)
+    print(f"{name:<36}avg {avg * 1e6:8.1f}us  p50 {p50 * 1e6:8.1f}us  p99 {p99 * 1e6:8.1f}us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark rate limit checks')
+    parser.add_argument('--checks', type=int, default=20000, help='Checks per measurement')
+    parser.add_argument('--keys', type=int, default=100, help='Distinct clients checked in turn')
+    parser.add_argument('--limit', type=int, default=100, help='Requests allowed per window')
+    parser.add_argument('--window', type=float, default=60, help='Window in seconds')
+    parser.add_argument('--redis-url', type=str, help='Also benchmark against this Redis')
+    args = parser.parse_args()
+
+    app = create_app('testing')
+    print(f"{args.checks} checks over {args.keys} clients, limit {args.limit} per {args.window:g}s")
+
+    backends = [('memory', RateLimiter(app)), ('fake redis', RateLimiter(app, redis_client=FakeRedis()))]
+    if args.redis_url:
+        client = redis.from_url(args.redis_url, decode_responses=True)
+        client.ping()
+        backends.append(('redis', RateLimiter(app, redis_client=client)))
+
+    for name, limiter in backends:
+        for algorithm in (SLIDING_WINDOW, GCRA):
+            report(f'{name} {algorithm}', lambda key: limiter.check(
+                f'bench-{name}', args.limit, args.window, algorithm=algorithm, identifier=key
+            ), args.checks, args.keys)
+
+    if args.redis_url:
+        report('redis legacy pipeline', lambda key: legacy_check(
+            client, f'rate_limit:bench-legacy:{key}', args.limit, int(args.window)
+        ), args.checks, args.keys)
+        print("Round trips per check: 1 for either script, 1 pipeline of 4 commands for the legacy check")
+        for pattern in ('rate_limit:*bench-redis*', 'rate_limit:bench-legacy:*'):
+            keys = list(client.scan_iter(pattern))
+            if keys:
+                client.delete(*keys)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Check and benchmark the closed-form expected-occurrence calculator
+Compares app.utils.schedule.expected_occurrences against a day-by-day
+reference over randomly generated habits and windows (leap years, month ends
+and habits starting mid-window included), then times both over 365 and 3650
+day windows.
+"""
+
+import os
+import sys
+import time
+import random
+from datetime import date, timedelta
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.models.habit import Habit, HabitFrequency, WEEKDAY_NAMES
+from app.utils.schedule import expected_occurrences
+
+CASES = 20000
+WINDOWS = [365, 3650]
+ROUNDS = 200
+
+
+def reference_occurrences(habit, start_date, end_date):
+    """Day-by-day walk with the same semantics as expected_occurrences"""
+    per_period = max(habit.frequency_count or 0, 1)
+    weekdays = [d for d in habit.occurrence_days_list if d in WEEKDAY_NAMES]
+    month_days = [d for d in habit.occurrence_days_list if isinstance(d, int)]
+
+    expected = 0
+    current_date = max(start_date, habit.start_date)
+    while current_date <= end_date:
+        if habit.frequency == HabitFrequency.DAILY:
+            expected += 1
+        elif habit.frequency == HabitFrequency.WEEKLY:
+            if weekdays:
+                expected += WEEKDAY_NAMES[current_date.weekday()] in weekdays
+            elif current_date.weekday() == 0:
+                expected += per_period
+        elif habit.frequency == HabitFrequency.MONTHLY:
+            if month_days:
+                expected += current_date.day in month_days
+            elif current_date.day == 1:
+                expected += per_period
+        elif habit.frequency == HabitFrequency.CUSTOM:
+            expected += per_period
+        current_date += timedelta(days=1)
+    return expected
+
+
+def random_habit(rng, start_date):
+    """An unsaved habit with a random schedule"""
+    frequency = rng.choice(list(HabitFrequency))
+    occurrence_days = []
+    if frequency == HabitFrequency.WEEKLY and rng.random() < 0.8:
+        occurrence_days = rng.sample(WEEKDAY_NAMES, rng.randint(1, 7))
+    elif frequency == HabitFrequency.MONTHLY and rng.random() < 0.8:
+        occurrence_days = rng.sample(range(1, 32), rng.randint(1, 5))
+    return Habit(
+        frequency=frequency,
+        frequency_count=rng.randint(0, 5),
+        occurrence_days_list=occurrence_days,
+        start_date=start_date
+    )
+
+
+def check(rng):
+    """Compare against the reference; returns the number of mismatches"""
+    mismatches = 0
+    for _ in range(CASES):
+        start_date = date(2019, 1, 1) + timedelta(days=rng.randint(0, 2500))
+        end_date = start_date + timedelta(days=rng.randint(-3, 800))
+        habit = random_habit(rng, start_date + timedelta(days=rng.randint(-60, 400)))
+
+        expected = reference_occurrences(habit, start_date, end_date)
+        actual = expected_occurrences(habit, start_date, end_date)
+        if expected != actual:
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"MISMATCH {vars(habit)} {start_date}..{end_date}: reference={expected} closed-form={actual}")
+    return mismatches
+
+
+def timed(fn):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        fn()
+    return (time.perf_counter() - start) * 1e6 / ROUNDS
+
+
+def main():
+    rng = random.Random(42)
+
+    mismatches = check(rng)
+    print(f"{CASES} random habits/windows checked, {mismatches} mismatches")
+
+    end_date = date.today()
+    habits = [
+        Habit(frequency=HabitFrequency.DAILY, frequency_count=1, occurrence_days_list=[], start_date=date(2000, 1, 1)),
+        Habit(frequency=HabitFrequency.WEEKLY, frequency_count=3,
+              occurrence_days_list=['Monday', 'Wednesday', 'Friday'], start_date=date(2000, 1, 1)),
+        Habit(frequency=HabitFrequency.MONTHLY, frequency_count=2, occurrence_days_list=[1, 15], start_date=date(2000, 1, 1)),
+    ]
+
+    print(f"{'window':<10}{'frequency':<12}{'day-by-day us':>16}{'closed-form us':>16}{'speedup':>10}")
+    for days in WINDOWS:
+        start_date = end_date - timedelta(days=days)
+        for habit in habits:
+            before_us = timed(lambda: reference_occurrences(habit, start_date, end_date))
+            after_us = timed(lambda: expected_occurrences(habit, start_date, end_date))
+            print(f"{days:<10}{habit.frequency.value:<12}{before_us:>16.1f}{after_us:>16.1f}{before_us / after_us:>9.1f}x")
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark the local lexicon sentiment scorer
+Builds journal-length entries from the sample contents in
+scripts/test_sentiment.py mixed with filler sentences, then reports entries
+per second for score() called once per entry and for score_batch() over
+batches of several sizes.
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.utils.sentiment import LexiconSentimentScorer
+from scripts.test_sentiment import SAMPLE_CONTENTS
+
+FILLER = [
+    "I went for a walk after work and then cooked dinner.",
+    "Spent the afternoon answering emails and tidying the kitchen.",
+    "Called my sister in the evening and we talked for an hour.",
+    "Read a few chapters before bed.",
+    "The weather was grey and it rained most of the day.",
+]
+BATCH_SIZES = [10, 100, 1000]
+
+
+def make_entries(rng, count):
+    """Entries of one to three samples interleaved with filler, about 60-150 words each"""
+    samples = [sample['content'] for sample in SAMPLE_CONTENTS]
+    entries = []
+    for _ in range(count):
+        parts = rng.sample(samples, rng.randint(1, 3)) + rng.sample(FILLER, rng.randint(1, 4))
+        rng.shuffle(parts)
+        entries.append(' '.join(parts))
+    return entries
+
+
+def timed(function, rounds):
+    """Best wall time of several rounds, in seconds"""
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the local sentiment scorer')
+    parser.add_argument('--entries', type=int, default=10000, help='Entries scored per round')
+    parser.add_argument('--rounds', type=int, default=3, help='Rounds per measurement (best is reported)')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    scorer = LexiconSentimentScorer()
+    entries = make_entries(random.Random(args.seed), args.entries)
+    words = sum(len(entry.split()) for entry in entries)
+    print(f"{len(entries)} entries, {words / len(entries):.0f} words on average, best of {args.rounds} rounds")
+
+    elapsed = timed(lambda: [scorer.score(entry) for entry in entries], args.rounds)
+    print(f"{'score() per entry':<24}{elapsed:8.3f}s {len(entries) / elapsed:10.0f} entries/s")
+
+    for batch_size in BATCH_SIZES:
+        batches = [entries[i:i + batch_size] for i in range(0, len(entries), batch_size)]
+        elapsed = timed(lambda: [scorer.score_batch(batch) for batch in batches], args.rounds)
+        print(f"{f'score_batch({batch_size})':<24}{elapsed:8.3f}s {len(entries) / elapsed:10.0f} entries/s")
+
+
+if __name__ == '__main__':
+    main()
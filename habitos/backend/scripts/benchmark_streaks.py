@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark streak reads before and after maintained streak counters
+Compares the old day-by-day backwards walk (one query per day per habit)
+with reading the maintained columns, for a user with a multi-year history.
+"""
+
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import create_app, db
+from app.models.user import User
+from app.models.habit import Habit
+from app.models.check_in import CheckIn
+from scripts.reconcile_streaks import reconcile_streaks
+
+HABITS = 10
+YEARS = 3
+ROUNDS = 5
+
+
+def legacy_streak(habit_id, today):
+    """Day-by-day streak walk as previously done in get_dashboard_data"""
+    streak = 0
+    current_date = today
+    while CheckIn.query.filter(
+        CheckIn.habit_id == habit_id,
+        CheckIn.date == current_date,
+        CheckIn.completed == True
+    ).first():
+        streak += 1
+        current_date -= timedelta(days=1)
+    return streak
+
+
+def timed(fn):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        result = fn()
+    return result, (time.perf_counter() - start) * 1000 / ROUNDS
+
+
+def main():
+    app = create_app('testing')
+
+    with app.app_context():
+        db.create_all()
+        today = date.today()
+        days = YEARS * 365
+
+        user = User(email='streak-bench@example.com')
+        db.session.add(user)
+        db.session.flush()
+        for i in range(HABITS):
+            habit = Habit(user_id=user.id, title=f'Habit {i}', start_date=today - timedelta(days=days))
+            db.session.add(habit)
+            db.session.flush()
+            db.session.bulk_save_objects([
+                CheckIn(habit_id=habit.id, user_id=user.id, date=today - timedelta(days=d), completed=True)
+                for d in range(days)
+            ])
+        db.session.commit()
+
+        checked, _ = reconcile_streaks(user_id=user.id)
+        habits = Habit.query.filter_by(user_id=user.id).all()
+
+        before, before_ms = timed(lambda: [legacy_streak(h.id, today) for h in habits])
+        after, after_ms = timed(lambda: [h.active_streak(today) for h in Habit.query.filter_by(user_id=user.id).all()])
+
+        assert before == after, (before, after)
+        print(f"{checked} habits x {days} days of history")
+        print(f"day-by-day walk:   {before_ms:10.2f} ms per read")
+        print(f"maintained column: {after_ms:10.2f} ms per read")
+        print(f"speedup:           {before_ms / after_ms:10.1f}x")
+
+
+if __name__ == '__main__':
+    main()
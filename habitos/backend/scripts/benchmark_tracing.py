@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark tracing overhead
+Times a span used as a context manager and as a decorator with tracing
+off, inside a trace that sampling skipped, and recorded (with no exporter
+and with the metrics exporter), next to PerformanceTimer with its log
+line disabled. Costs are per span, net of the loop, best of --repeat runs.
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.utils import tracing
+from app.utils.logger import PerformanceTimer
+from app.utils.tracing import TRACER, MetricsExporter, span, traced
+
+
+def best_ns(body, iterations, repeat):
+    """Nanoseconds per call of body(iterations), best of repeat runs"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        body(iterations)
+        elapsed = (time.perf_counter_ns() - start) / iterations
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def loop(iterations):
+    for _ in range(iterations):
+        pass
+
+
+def context_manager(iterations):
+    for _ in range(iterations):
+        with span('bench'):
+            pass
+
+
+def plain():
+    pass
+
+
+@traced('bench.decorated')
+def decorated():
+    pass
+
+
+def call_plain(iterations):
+    for _ in range(iterations):
+        plain()
+
+
+def call_decorated(iterations):
+    for _ in range(iterations):
+        decorated()
+
+
+def performance_timer(iterations):
+    for _ in range(iterations):
+        with PerformanceTimer('bench'):
+            pass
+
+
+def measure(args):
+    """(context manager, decorator) cost in ns over the bare loop and the undecorated call"""
+    base = best_ns(loop, args.iterations, args.repeat)
+    base_call = best_ns(call_plain, args.iterations, args.repeat)
+    return (best_ns(context_manager, args.iterations, args.repeat) - base,
+            best_ns(call_decorated, args.iterations, args.repeat) - base_call)
+
+
+def report(name, costs):
+    print(f"{name:<40}{costs[0]:>10.0f}ns{costs[1]:>14.0f}ns")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark tracing overhead')
+    parser.add_argument('--iterations', type=int, default=200000, help='Spans per run')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement; the best is reported')
+    args = parser.parse_args()
+
+    print(f"{'':<40}{'with span()':>12}{'@traced':>14}")
+
+    TRACER.setup(False)
+    report('tracing off', measure(args))
+
+    # A child of a trace that sampling skipped: the path of most spans at a low sample rate
+    TRACER.setup(True, sample_rate=0.5)
+    with tracing.UnsampledSpan():
+        report('unsampled trace', measure(args))
+
+    TRACER.setup(True, sample_rate=1.0)
+    with span('root'):
+        report('recorded, no exporter', measure(args))
+
+    TRACER.setup(True, sample_rate=1.0, exporters=[MetricsExporter()])
+    with span('root'):
+        report('recorded, metrics exporter', measure(args))
+
+    TRACER.setup(False)
+    logging.getLogger('performance').setLevel(logging.WARNING)
+    base = best_ns(loop, args.iterations, args.repeat)
+    print(f"{'PerformanceTimer, tracing and log off':<40}"
+          f"{best_ns(performance_timer, args.iterations, args.repeat) - base:>10.0f}ns")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Check for the AI cache's Redis round trips
+Fails unless, with Redis, every get and set is one round trip (the
+namespace generation is read inside the same script as the entry), clear()
+hides earlier entries from every reader, entries are written with the TTL,
+the in-process cache keeps the same behaviour and AIService takes the TTL
+and size from the app config.
+"""
+
+import os
+import sys
+import json
+import threading
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import create_app
+from app.utils.ai_service import AICache, AIService, GeminiExecutor, CACHE_GET_SCRIPT, CACHE_SET_SCRIPT
+from app.utils.response_cache import LocalCache
+from scripts.check_ai_client import check
+
+
+class FakeScript:
+    def __init__(self, redis, source):
+        self.redis = redis
+        self.source = source
+
+    def __call__(self, keys, args):
+        return self.redis.evalsha(self.source, keys, args)
+
+
+class FakeRedis:
+    """
+    Stands in for a Redis server, counting round trips: registered scripts
+    run atomically as Python equivalents of the Lua, plus GET, SET and INCR.
+    """
+
+    def __init__(self):
+        self.round_trips = 0
+        self.values = {}
+        self.ttls = {}
+        self._lock = threading.Lock()
+
+    def register_script(self, source):
+        return FakeScript(self, source)
+
+    def evalsha(self, source, keys, args):
+        with self._lock:
+            self.round_trips += 1
+            generation = self.values.get(keys[0]) or '0'
+            key = f'{args[0]}:{generation}:{args[1]}'
+            if source == CACHE_GET_SCRIPT:
+                return self.values.get(key)
+            if source == CACHE_SET_SCRIPT:
+                self.values[key] = args[2]
+                self.ttls[key] = int(args[3])
+                return 1
+            raise ValueError('unknown script')
+
+    def get(self, key):
+        with self._lock:
+            self.round_trips += 1
+            return self.values.get(key)
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self.round_trips += 1
+            self.values[key] = value
+            self.ttls[key] = ex
+
+    def incr(self, key):
+        with self._lock:
+            self.round_trips += 1
+            self.values[key] = str(int(self.values.get(key) or 0) + 1)
+            return int(self.values[key])
+
+
+def main():
+    fake = FakeRedis()
+    cache = AICache(ttl=120, client=fake)
+    other_worker = AICache(ttl=120, client=fake)
+
+    fake.round_trips = 0
+    missed = cache.get('prompts', 'k')
+    check('miss is one round trip', missed is None and fake.round_trips == 1, f'({fake.round_trips})')
+
+    fake.round_trips = 0
+    cache.set('prompts', 'k', ['Prompt one'])
+    check('set is one round trip', fake.round_trips == 1, f'({fake.round_trips})')
+    check('written with the TTL', list(fake.ttls.values()) == [120]
+          and json.loads(next(iter(fake.values.values()))) == ['Prompt one'])
+
+    fake.round_trips = 0
+    hit = other_worker.get('prompts', 'k')
+    check('hit is one round trip, across workers', hit == ['Prompt one'] and fake.round_trips == 1, f'({fake.round_trips})')
+
+    cache.clear('prompts')
+    check('clear hides earlier entries', other_worker.get('prompts', 'k') is None and cache.get('prompts', 'k') is None)
+    other_worker.set('prompts', 'k', ['Prompt two'])
+    check('entries after clear', cache.get('prompts', 'k') == ['Prompt two'])
+
+    # In-process cache
+    local = AICache(ttl=120, client=LocalCache(10))
+    local.set('summaries', 'm', {'summary': 'ok'})
+    hit = local.get('summaries', 'm')
+    local.clear('summaries')
+    check('in-process cache', local.backend == 'memory' and hit == {'summary': 'ok'}
+          and local.get('summaries', 'm') is None)
+
+    # AIService sizes its cache from the app config
+    app = create_app('testing')
+    app.config.update(AI_CACHE_TTL=45, AI_CACHE_MAX_ENTRIES=25)
+    with app.app_context():
+        configured = AIService(api_key='stub', model=object(), executor=GeminiExecutor()).cache
+    check('cache configured from app config', configured.ttl == 45 and configured.client.max_entries == 25)
+
+    print('OK: AI cache reads and writes are one Redis round trip each')
+
+
+if __name__ == '__main__':
+    main()
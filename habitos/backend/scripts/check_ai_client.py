@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Resilience check for the Gemini execution layer in AIService
+Runs AIService against a local fake model that simulates latency, hangs,
+429 rate limiting and outages, and fails unless concurrency stays bounded,
+hung calls time out to the fallback responses, 429s are retried with
+backoff, and the circuit breaker opens, fails fast and recovers.
+"""
+
+import os
+import sys
+import time
+import threading
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import create_app
+from app.utils import ai_service
+from app.utils.ai_service import AIService, GeminiExecutor, CircuitBreaker
+
+
+class RateLimitError(Exception):
+    """Shaped like google.api_core.exceptions.ResourceExhausted"""
+    code = 429
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """
+    Stands in for genai.GenerativeModel. Each call pops the next behaviour
+    from `script` ('ok', '429', 'error' or 'hang'), then repeats `default`.
+    """
+
+    def __init__(self, script=(), default='ok', latency=0.0, hang_seconds=2.0):
+        self.script = list(script)
+        self.default = default
+        self.latency = latency
+        self.hang_seconds = hang_seconds
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt):
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            behaviour = self.script.pop(0) if self.script else self.default
+        try:
+            time.sleep(self.latency)
+            if behaviour == 'hang':
+                time.sleep(self.hang_seconds)
+            elif behaviour == '429':
+                raise RateLimitError('429 Resource has been exhausted (e.g. check quota).')
+            elif behaviour == 'error':
+                raise ConnectionError('503 upstream unavailable')
+            if 'JSON' in prompt:
+                return FakeResponse('{"sentiment": "positive", "sentiment_score": 0.6, "confidence": 0.9}')
+            return FakeResponse('Prompt one\nPrompt two\nPrompt three')
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def service(model, **executor_options):
+    executor = GeminiExecutor(**{'backoff_base': 0.01, 'backoff_max': 0.05, **executor_options})
+    return AIService(api_key='fake', model=model, executor=executor)
+
+
+def fail(message):
+    print(f"FAIL: {message}")
+    sys.exit(1)
+
+
+def check(name, condition, detail=''):
+    print(f"{name:<48}{'ok' if condition else 'FAILED'} {detail}")
+    if not condition:
+        fail(name)
+
+
+def main():
+    # Concurrency stays within the semaphore while every caller is served
+    model = FakeModel(latency=0.1)
+    ai = service(model, max_concurrency=3, timeout=2)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(ai.analyze_journal_sentiment('Busy day'))) for _ in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    check('bounded concurrency', model.max_in_flight <= 3 and model.calls == 12,
+          f'(max in flight {model.max_in_flight}, {model.calls} calls)')
+    check('all callers got a generated analysis', all(r['sentiment'] == 'positive' for r in results))
+
+    # A hung upstream call returns the fallback after the timeout
+    ai = service(FakeModel(script=['hang']), timeout=0.2)
+    start = time.perf_counter()
+    sentiment = ai.analyze_journal_sentiment('A fine day')
+    elapsed = time.perf_counter() - start
+    check('hung call falls back after timeout', sentiment == ai._get_fallback_sentiment('A fine day') and elapsed < 0.6,
+          f'({elapsed:.2f}s)')
+
+    # 429s are retried with backoff and then succeed
+    model = FakeModel(script=['429', '429'])
+    ai = service(model, max_retries=2)
+    sentiment = ai.analyze_journal_sentiment('A fine day')
+    check('429s retried until success', sentiment['sentiment'] == 'positive' and model.calls == 3,
+          f'({model.calls} calls)')
+
+    # Persistent 429s give up after max_retries and fall back
+    model = FakeModel(default='429')
+    ai = service(model, max_retries=2)
+    prompts = ai.generate_prompts(4)
+    check('exhausted retries fall back', len(prompts) == 4 and model.calls == 3 and prompts[0]['text'] != 'Prompt one',
+          f'({model.calls} calls)')
+
+    # With every slot taken by a hung call, further calls are shed
+    model = FakeModel(script=['hang'], hang_seconds=1.5)
+    ai = service(model, max_concurrency=1, timeout=3)
+    blocker = threading.Thread(target=lambda: ai.analyze_journal_sentiment('Slow'))
+    blocker.start()
+    time.sleep(0.05)
+    sentiment = ai.analyze_journal_sentiment('Shed')
+    check('calls shed when all slots are busy', sentiment == ai._get_fallback_sentiment('Shed') and model.calls == 1)
+    blocker.join()
+
+    # The breaker opens after consecutive failures and then fails fast
+    model = FakeModel(default='error')
+    ai = service(model, breaker=CircuitBreaker(failure_threshold=3, reset_timeout=0.3))
+    for _ in range(3):
+        ai.analyze_journal_sentiment('Outage')
+    check('circuit opens after threshold', ai.executor.breaker.state == CircuitBreaker.OPEN)
+    start = time.perf_counter()
+    summary = ai.generate_monthly_summary([{'content': 'One entry', 'mood_rating': 7}])
+    elapsed = time.perf_counter() - start
+    check('open circuit skips upstream', model.calls == 3 and elapsed < 0.05, f'({elapsed * 1000:.1f} ms)')
+    check('open circuit uses fallback summary', summary['is_fallback'] and summary['entry_count'] == 1)
+
+    # After reset_timeout one trial call goes through and closes it
+    time.sleep(0.35)
+    check('circuit half-open after reset timeout', ai.executor.breaker.state == CircuitBreaker.HALF_OPEN)
+    model.default = 'ok'
+    summary = ai.generate_monthly_summary([{'content': 'One entry', 'mood_rating': 7}])
+    check('successful trial closes circuit', not summary['is_fallback'] and ai.executor.breaker.state == CircuitBreaker.CLOSED)
+
+    # A failed trial reopens it straight away
+    model.default = 'error'
+    ai.executor.breaker.failure_threshold = 1
+    ai.analyze_journal_sentiment('Outage')
+    time.sleep(0.35)
+    ai.executor.breaker.failure_threshold = 3
+    ai.analyze_journal_sentiment('Trial')
+    check('failed trial reopens circuit', ai.executor.breaker.state == CircuitBreaker.OPEN)
+
+    # The shared executor takes its limits from the app config
+    app = create_app('testing')
+    app.config.update(GEMINI_MAX_CONCURRENCY=7, GEMINI_TIMEOUT=3.5, GEMINI_MAX_RETRIES=1,
+                      GEMINI_BREAKER_THRESHOLD=9, GEMINI_BREAKER_RESET=12.0)
+    ai_service._gemini_executor = None
+    with app.app_context():
+        executor = ai_service.get_gemini_executor()
+    ai_service._gemini_executor = None
+    check('executor configured from app config', (executor.max_concurrency, executor.timeout, executor.max_retries,
+          executor.breaker.failure_threshold, executor.breaker.reset_timeout) == (7, 3.5, 1, 9, 12.0))
+
+    print("OK: Gemini calls are bounded, time out, retry 429s and trip the circuit breaker")
+
+
+if __name__ == '__main__':
+    main()
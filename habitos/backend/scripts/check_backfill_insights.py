@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Check for the resumable insights backfill in scripts/backfill_sentiment.py
+Runs the backfill against an in-memory SQLite database and a stub model and
+fails unless a dry run writes nothing, batches run concurrently, a run that
+crashes mid-way resumes from its checkpoint without redoing committed
+chunks, and every entry ends up with insights while updated_at is untouched.
+"""
+
+import os
+import sys
+import time
+import tempfile
+from datetime import date, timedelta
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import create_app, db
+from app.models.user import User
+from app.models.habit import Habit
+from app.models.check_in import CheckIn
+from app.models.journal_entry import JournalEntry
+from app.utils.ai_service import AIService, GeminiExecutor
+from scripts.check_ai_client import check
+from scripts import backfill_sentiment
+from scripts.backfill_sentiment import StubModel, backfill_insights, load_checkpoint
+
+ENTRIES = 250
+
+
+def seed():
+    user = User(email='backfill@example.com')
+    db.session.add(user)
+    db.session.flush()
+    habit = Habit(user_id=user.id, title='Journal', start_date=date(2020, 1, 1))
+    db.session.add(habit)
+    db.session.flush()
+    check_ins = [CheckIn(habit_id=habit.id, user_id=user.id, date=date(2020, 1, 1) + timedelta(days=n), completed=True)
+                 for n in range(ENTRIES)]
+    db.session.add_all(check_ins)
+    db.session.flush()
+    db.session.add_all([JournalEntry(user_id=user.id, checkin_id=check_in.id, entry_date=check_in.date,
+                                     content=f'Entry {n} about the day') for n, check_in in enumerate(check_ins)])
+    db.session.commit()
+
+
+def service(latency):
+    return AIService(api_key='stub', model=StubModel(latency), executor=GeminiExecutor(max_concurrency=4))
+
+
+def main():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        seed()
+        updated_before = dict(db.session.query(JournalEntry.id, JournalEntry.updated_at))
+        enriched = lambda: JournalEntry.query.filter(JournalEntry.ai_insights.isnot(None)).count()
+        checkpoint_path = os.path.join(tempfile.mkdtemp(), 'checkpoint.json')
+
+        # Dry run: full pipeline, nothing written. 25 batches of 10 at 50 ms take 1.25s one at a time
+        start = time.perf_counter()
+        stats = backfill_insights(service(0.05), workers=4, rate_limit=1000, chunk_size=100, dry_run=True)
+        elapsed = time.perf_counter() - start
+        check('dry run covers every entry', stats['entries'] == ENTRIES and stats['enriched'] == ENTRIES
+              and stats['batches'] == 25, f"({stats['entries']} entries, {stats['batches']} batches)")
+        check('dry run writes nothing', enriched() == 0)
+        check('batches generated concurrently', elapsed < 25 * 0.05 * 0.75, f'({elapsed:.2f}s, {ENTRIES / elapsed:.0f} entries/s)')
+
+        # Crash while writing the third chunk
+        written = []
+        crash_after = [120]
+        store_insights = JournalEntry.store_insights.__func__
+
+        def recording_store(cls, entry_id, *args):
+            if len(written) == crash_after[0]:
+                raise RuntimeError('simulated crash')
+            written.append(entry_id)
+            return store_insights(cls, entry_id, *args)
+        JournalEntry.store_insights = classmethod(recording_store)
+        try:
+            backfill_insights(service(0), chunk_size=50, rate_limit=1000, checkpoint_path=checkpoint_path)
+            check('crash propagates', False)
+        except RuntimeError:
+            db.session.rollback()
+        checkpoint = load_checkpoint(checkpoint_path)
+        check('committed chunks survive the crash', enriched() == 100, f'({enriched()} enriched)')
+        check('checkpoint at last committed chunk', checkpoint['last_id'] == sorted(updated_before)[99])
+
+        # Resume: only the uncommitted chunk is redone
+        written.clear()
+        crash_after[0] = None
+        stats = backfill_insights(service(0), chunk_size=50, rate_limit=1000, checkpoint_path=checkpoint_path, resume=True)
+        check('resume starts after the checkpoint', stats['entries'] == ENTRIES - 100 and min(written) > checkpoint['last_id'],
+              f"({stats['entries']} entries)")
+        check('no entry written twice on resume', len(written) == len(set(written)) == ENTRIES - 100)
+        JournalEntry.store_insights = classmethod(store_insights)
+
+        db.session.expire_all()
+        entries = JournalEntry.query.all()
+        check('every entry has insights', all(entry.ai_summary == 'Dry run summary' and entry.insights_generated_at
+                                              for entry in entries))
+        check('updated_at untouched', all(entry.updated_at == updated_before[entry.id] for entry in entries))
+
+        # A rerun finds nothing left; --force-reprocess redoes everything
+        check('rerun has nothing to do', backfill_insights(service(0), rate_limit=1000)['entries'] == 0)
+        invalidated = []
+        backfill_sentiment.invalidate_users = lambda user_ids: invalidated.append(set(user_ids))
+        check('force_reprocess covers every entry',
+              backfill_insights(service(0), rate_limit=1000, force_reprocess=True)['enriched'] == ENTRIES)
+        check('committed chunks invalidate their users', invalidated == [{entries[0].user_id}] * 2, f'({invalidated})')
+
+    print("OK: the insights backfill is concurrent, batched and resumable")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Statement-count and consistency check for the bulk check-in endpoint
+Submits bulk check-ins of growing size into an in-memory SQLite database,
+fails if the number of executed SQL statements grows with the number of
+habits, and verifies the maintained streaks and goal progress against a
+recomputation from scratch.
+"""
+
+import os
+import sys
+from datetime import date, timedelta
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import event
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models.user import User
+from app.models.habit import Habit, calculate_streaks
+from app.models.check_in import CheckIn
+from app.models.goal import Goal, GoalType
+
+SIZES = [1, 10, 50]
+HISTORY_DAYS = 5
+
+
+def seed_user(email, habit_count):
+    """A user with habit_count habits, a goal on each and a few days of history"""
+    today = date.today()
+    user = User(email=email)
+    db.session.add(user)
+    db.session.flush()
+
+    for i in range(habit_count):
+        habit = Habit(user_id=user.id, title=f'Habit {i}', start_date=today - timedelta(days=30))
+        db.session.add(habit)
+        db.session.flush()
+        db.session.add(Goal(
+            user_id=user.id, habit_id=habit.id, title=f'Goal {i}', goal_type=GoalType.COUNT,
+            target_value=HISTORY_DAYS + 1, start_date=today - timedelta(days=30)
+        ))
+        for d in range(2, HISTORY_DAYS + 2):
+            db.session.add(CheckIn(habit_id=habit.id, user_id=user.id, date=today - timedelta(days=d), completed=True))
+        habit.recalculate_streaks()
+
+    db.session.commit()
+    return user
+
+
+def submissions(habit_ids):
+    """Requests that exercise inserts, in-place streak extension, updates and backfills"""
+    today = date.today()
+    yesterday = today - timedelta(days=1)
+    return [
+        ('create yesterday', yesterday, [{'habit_id': hid, 'completed': True} for hid in habit_ids]),
+        ('create today', today, [{'habit_id': hid, 'completed': True} for hid in habit_ids]),
+        ('uncomplete yesterday', yesterday, [
+            {'habit_id': hid, 'completed': i % 2 == 0} for i, hid in enumerate(habit_ids)
+        ]),
+    ]
+
+
+def verify(user_id):
+    """Maintained streaks and goal progress must match a recomputation"""
+    errors = []
+    for habit in Habit.query.filter_by(user_id=user_id).all():
+        dates = sorted({ci.date for ci in CheckIn.query.filter_by(habit_id=habit.id, completed=True)})
+        expected = calculate_streaks(dates)
+        actual = (habit.current_streak, habit.longest_streak, habit.last_completed_date)
+        if expected != actual:
+            errors.append(f'streak {habit.title}: expected {expected}, got {actual}')
+
+        goal = Goal.query.filter_by(habit_id=habit.id).first()
+        completed = len([d for d in dates if d >= goal.start_date])
+        if goal.current_value != completed:
+            errors.append(f'goal {goal.title}: expected {completed}, got {goal.current_value}')
+    return errors
+
+
+def main():
+    app = create_app('testing')
+
+    with app.app_context():
+        db.create_all()
+        client = app.test_client()
+
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+        counts = {}
+        errors = []
+        for size in SIZES:
+            user = seed_user(f'bulk-{size}@example.com', size)
+            habit_ids = [h.id for h in Habit.query.filter_by(user_id=user.id)]
+            headers = {'Authorization': f'Bearer {create_access_token(identity=user.id)}'}
+
+            for name, day, habits in submissions(habit_ids):
+                db.session.expunge_all()
+                statements.clear()
+                response = client.post('/api/check-ins/bulk', headers=headers, json={
+                    'date': day.isoformat(), 'habits': habits, 'mood_rating': 7, 'journal_content': 'Bulk entry'
+                })
+                assert response.status_code == 201, (name, response.get_json())
+                counts.setdefault(name, []).append(len(statements))
+
+            db.session.expunge_all()
+            errors.extend(verify(user.id))
+
+        print(f"{'submission':<24}" + ''.join(f'{size:>8}' for size in SIZES))
+        failed = []
+        for name, name_counts in counts.items():
+            print(f'{name:<24}' + ''.join(f'{count:>8}' for count in name_counts))
+            if len(set(name_counts)) > 1:
+                failed.append(name)
+
+        for error in errors:
+            print(f'MISMATCH {error}')
+        if failed:
+            print(f"FAIL: statement count grows with habit count for {', '.join(failed)}")
+        if failed or errors:
+            sys.exit(1)
+        print("OK: bulk check-in statement count is constant and streaks/goals are consistent")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Consistency check for the per-user daily rollups
+Drives every check-in and journal write path (single, bulk and imported
+check-ins, updates, deletes, journal edits, habit deletion) against an
+in-memory SQLite database and fails if the rollups they maintain differ from
+a recomputation, or if /api/users/stats or the dashboard disagree with the
+raw rows.
+"""
+
+import os
+import sys
+from datetime import date, timedelta
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models.user import User
+from app.models.habit import Habit
+from app.models.check_in import CheckIn
+from app.models.journal_entry import JournalEntry
+from scripts.rebuild_daily_rollups import stale_rows
+
+
+def main():
+    app = create_app('testing')
+
+    with app.app_context():
+        db.create_all()
+        client = app.test_client()
+
+        user = User(email='rollups@example.com')
+        db.session.add(user)
+        db.session.flush()
+        habits = [Habit(user_id=user.id, title=f'Habit {i}', start_date=date(2020, 1, 1)) for i in range(3)]
+        db.session.add_all(habits)
+        db.session.commit()
+        user_id = user.id
+        habit_ids = [habit.id for habit in habits]
+        headers = {'Authorization': f'Bearer {create_access_token(identity=user_id)}'}
+
+        today = date.today()
+        day = lambda n: (today - timedelta(days=n)).isoformat()
+
+        def request(name, method, url, **kwargs):
+            response = client.open(url, method=method, headers=headers, **kwargs)
+            assert response.status_code < 300, (name, response.status_code, response.get_json())
+            db.session.expunge_all()
+            stale = stale_rows([user_id])
+            print(f"{name:<28}{response.status_code:>6}{stale:>8} stale")
+            if stale:
+                print(f"FAIL: rollups are stale after {name}")
+                sys.exit(1)
+            return response.get_json()
+
+        created = request('create check-in', 'POST', '/api/check-ins/', json={
+            'habit_id': habit_ids[0], 'date': day(0), 'completed': True, 'mood_rating': 7, 'reflection': 'Good day'
+        })['check_in']
+        request('update check-in', 'PUT', f"/api/check-ins/{created['id']}", json={'completed': False, 'mood_rating': 3})
+        request('bulk check-in', 'POST', '/api/check-ins/bulk', json={
+            'date': day(1), 'mood_rating': 8, 'journal_content': 'Bulk reflection',
+            'habits': [{'habit_id': hid, 'completed': True} for hid in habit_ids]
+        })
+        request('bulk re-submit', 'POST', '/api/check-ins/bulk', json={
+            'date': day(1), 'habits': [{'habit_id': habit_ids[0], 'completed': False}]
+        })
+        request('import', 'POST', '/api/check-ins/import', json=[
+            {'habit_id': hid, 'date': day(n), 'completed': n % 3 != 0, 'mood_rating': n % 10 + 1}
+            for hid in habit_ids for n in range(2, 60)
+        ])
+
+        check_in = CheckIn.query.filter_by(habit_id=habit_ids[1], date=today - timedelta(days=5)).one()
+        entry = request('create journal entry', 'POST', '/api/journal/', json={
+            'checkin_id': check_in.id, 'content': 'Backdated note', 'entry_date': day(4)
+        })['entry']
+        request('move journal entry', 'PUT', f"/api/journal/{entry['id']}", json={'entry_date': day(10)})
+        request('delete journal entry', 'DELETE', f"/api/journal/{entry['id']}")
+
+        request('create linked entry', 'POST', '/api/journal/', json={
+            'checkin_id': check_in.id, 'content': 'Dated elsewhere', 'entry_date': day(20)
+        })
+        request('delete check-in', 'DELETE', f'/api/check-ins/{check_in.id}')
+        request('delete habit', 'DELETE', f'/api/habits/{habit_ids[2]}')
+        request('complete today again', 'PUT', f"/api/check-ins/{created['id']}", json={'completed': True})
+
+        # Stats read from rollups must match the raw rows
+        stats = request('user stats', 'GET', '/api/users/stats?days=30')['stats']
+        start_date = today - timedelta(days=30)
+        check_ins = CheckIn.query.filter(CheckIn.user_id == user_id, CheckIn.date >= start_date).all()
+        moods = [ci.mood_rating for ci in check_ins if ci.mood_rating is not None]
+        expected = {
+            'total': len(check_ins),
+            'completed': len([ci for ci in check_ins if ci.completed]),
+            'journal_entries': JournalEntry.query.filter(
+                JournalEntry.user_id == user_id, JournalEntry.entry_date >= start_date
+            ).count(),
+            'average_mood': round(sum(moods) / len(moods), 2) if moods else None
+        }
+        actual = {
+            'total': stats['check_ins']['total'],
+            'completed': stats['check_ins']['completed'],
+            'journal_entries': stats['journal_entries'],
+            'average_mood': stats['average_mood']
+        }
+        if actual != expected:
+            print(f"FAIL: stats {actual} != raw {expected}")
+            sys.exit(1)
+
+        # So must the dashboard chart and streak
+        dashboard = request('dashboard', 'GET', '/api/dashboard')
+        daily_completed = {}
+        for ci in CheckIn.query.filter_by(user_id=user_id, completed=True):
+            daily_completed[ci.date] = daily_completed.get(ci.date, 0) + 1
+        streak = 0
+        while daily_completed.get(today - timedelta(days=streak)):
+            streak += 1
+        chart = [daily_completed.get(today - timedelta(days=n), 0) for n in range(6, -1, -1)]
+        if (dashboard['stats']['currentStreak'], dashboard['streakData']['datasets'][0]['data']) != (streak, chart):
+            print(f"FAIL: dashboard streak/chart differ from raw ({streak}, {chart})")
+            sys.exit(1)
+
+        print("OK: rollups match a recomputation after every write path")
+
+
+if __name__ == '__main__':
+    main()
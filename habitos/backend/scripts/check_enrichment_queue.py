@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Check for the AI enrichment job queue
+Writes journal entries through every route that creates or edits them
+against an in-memory SQLite database and drains the queue with a stub
+Gemini model, failing unless each write queues exactly one job per entry,
+batches and the rate limit are respected, results land in ai_insights and
+ai_summary without touching updated_at, failed batches are retried and
+finally marked failed, entries edited mid-batch are never given insights
+for their old content, claims are exclusive with expired leases reclaimed,
+and queue depth and latency are reported.
+"""
+
+import io
+import re
+import os
+import sys
+import json
+import time
+import contextlib
+from datetime import date, datetime, timedelta
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models.user import User
+from app.models.habit import Habit
+from app.models.journal_entry import JournalEntry
+from app.models.enrichment_job import EnrichmentJob
+from app.utils.ai_service import AIService, GeminiExecutor
+from app.utils.enrichment_queue import EnrichmentWorker
+from scripts.check_ai_client import FakeModel, FakeResponse, check
+
+
+class InsightModel(FakeModel):
+    """FakeModel answering entry-insight prompts with one insight per entry"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batch_sizes = []
+        self.on_call = None
+
+    def generate_content(self, prompt):
+        super().generate_content(prompt)
+        contents = re.findall(r'^\s*Entry \d+:\n(.*)$', prompt, re.M)
+        self.batch_sizes.append(len(contents))
+        if self.on_call:
+            self.on_call()
+        return FakeResponse(json.dumps([
+            {'insight': f'Insight on {content}', 'summary': f'About {content}', 'emotion': 'calm',
+             'themes': ['work'], 'recommendations': ['rest']}
+            for content in contents
+        ]))
+
+
+def main():
+    app = create_app('testing')
+    app.config['ENABLE_AI_INSIGHTS'] = True
+    with app.app_context():
+        db.create_all()
+        client = app.test_client()
+
+        user = User(email='enrichment@example.com')
+        db.session.add(user)
+        db.session.flush()
+        habits = [Habit(user_id=user.id, title=f'Habit {i}', start_date=date(2020, 1, 1)) for i in range(3)]
+        db.session.add_all(habits)
+        db.session.commit()
+        headers = {'Authorization': f'Bearer {create_access_token(identity=user.id)}'}
+        day = lambda n: (date.today() - timedelta(days=n)).isoformat()
+
+        def post(url, payload, status=201):
+            response = client.post(url, headers=headers, json=payload)
+            assert response.status_code == status, (url, response.status_code, response.get_json())
+            return response.get_json()
+
+        def pending():
+            return EnrichmentJob.query.filter_by(status=EnrichmentJob.PENDING).count()
+
+        # Every route that writes journal content queues a job
+        check_in = post('/api/check-ins/', {'habit_id': habits[0].id, 'date': day(0), 'completed': True,
+                                            'reflection': 'Reflection from a check-in'})['check_in']
+        check('check-in reflection queues a job', pending() == 1)
+        # The bulk route prints debug output
+        with contextlib.redirect_stdout(io.StringIO()):
+            post('/api/check-ins/bulk', {'date': day(1), 'journal_content': 'Bulk reflection',
+                                         'habits': [{'habit_id': habits[1].id, 'completed': True}]})
+        check('bulk check-in journal queues a job', pending() == 2)
+        entry_ids = [post('/api/journal/', {'checkin_id': check_in['id'], 'content': f'Entry number {n}',
+                                            'entry_date': day(0)})['entry']['id'] for n in range(5)]
+        check('journal entries queue a job each', pending() == 7)
+        for content in ('Edited once', 'Edited twice'):
+            response = client.put(f'/api/journal/{entry_ids[0]}', headers=headers, json={'content': content})
+            assert response.status_code == 200, response.get_json()
+        client.put(f'/api/journal/{entry_ids[1]}', headers=headers, json={'entry_date': day(2)})
+        check('edits keep one waiting job per entry', pending() == 7)
+
+        app.config['ENABLE_AI_INSIGHTS'] = False
+        post('/api/journal/', {'checkin_id': check_in['id'], 'content': 'Not enriched', 'entry_date': day(0)})
+        check('nothing queued with ENABLE_AI_INSIGHTS off', pending() == 7)
+        app.config['ENABLE_AI_INSIGHTS'] = True
+
+        updated_before = {entry.id: entry.updated_at for entry in JournalEntry.query}
+        db.session.commit()
+
+        # Drain in batches of 3 under a 20 calls/second limit
+        model = InsightModel()
+        ai = AIService(api_key='fake', model=model, executor=GeminiExecutor(backoff_base=0.01))
+        worker = EnrichmentWorker(app, ai_service=ai, batch_size=3, rate_limit=20, retry_backoff=0)
+        start = time.perf_counter()
+        processed = worker.drain()
+        elapsed = time.perf_counter() - start
+        check('queue drained in batches', processed == 7 and model.batch_sizes == [3, 3, 1] and pending() == 0,
+              f'(batches {model.batch_sizes})')
+        check('rate limit spaces Gemini calls', elapsed >= 0.09, f'({elapsed:.2f}s for 3 calls at 20/s)')
+
+        db.session.expire_all()
+        enriched = JournalEntry.query.filter(JournalEntry.ai_insights.isnot(None)).all()
+        check('every queued entry enriched', len(enriched) == 7)
+        edited = db.session.get(JournalEntry, entry_ids[0])
+        insight = json.loads(edited.ai_insights)
+        check('insights stored in the frontend shape', edited.ai_summary == 'About Edited twice'
+              and insight['insight'] == 'Insight on Edited twice' and insight['themes'] == ['work'])
+        check('insights_generated_at set', all(entry.insights_generated_at for entry in enriched))
+        check('storing insights leaves updated_at alone',
+              all(entry.updated_at == updated_before[entry.id] for entry in enriched))
+
+        # A failing batch is retried, then succeeds
+        post('/api/journal/', {'checkin_id': check_in['id'], 'content': 'Retry me', 'entry_date': day(0)})
+        model.script = ['error']
+        worker.run_once()
+        job = EnrichmentJob.query.one()
+        check('failed batch put back for retry', job.status == EnrichmentJob.PENDING and job.attempts == 1
+              and '503' in job.last_error)
+        worker.drain()
+        check('retried job succeeds', EnrichmentJob.query.count() == 0)
+
+        # One that keeps failing is marked failed after max_attempts
+        post('/api/journal/', {'checkin_id': check_in['id'], 'content': 'Always failing', 'entry_date': day(0)})
+        model.default = 'error'
+        worker.max_attempts = 3
+        worker.drain()
+        job = EnrichmentJob.query.one()
+        check('job marked failed after max_attempts', job.status == EnrichmentJob.FAILED and job.attempts == 3)
+        model.default = 'ok'
+        db.session.delete(job)
+        db.session.commit()
+
+        # An edit landing while Gemini works on the old content wins
+        entry_id = post('/api/journal/', {'checkin_id': check_in['id'], 'content': 'Old words',
+                                          'entry_date': day(0)})['entry']['id']
+
+        def edit_mid_batch():
+            model.on_call = None
+            response = app.test_client().put(f'/api/journal/{entry_id}', headers=headers, json={'content': 'New words'})
+            assert response.status_code == 200, response.get_json()
+        model.on_call = edit_mid_batch
+        worker.drain()
+        db.session.expire_all()
+        entry = db.session.get(JournalEntry, entry_id)
+        check('mid-batch edit never gets old insights', entry.ai_summary == 'About New words',
+              f'({entry.ai_summary})')
+
+        # A deleted entry's job is dropped without a Gemini call
+        entry_id = post('/api/journal/', {'checkin_id': check_in['id'], 'content': 'Short lived',
+                                          'entry_date': day(0)})['entry']['id']
+        client.delete(f'/api/journal/{entry_id}', headers=headers)
+        calls = model.calls
+        worker.drain()
+        check("deleted entry's job dropped", EnrichmentJob.query.count() == 0 and model.calls == calls)
+
+        # Claims are exclusive and expired leases are reclaimed
+        for n in range(4):
+            post('/api/journal/', {'checkin_id': check_in['id'], 'content': f'Claim {n}', 'entry_date': day(0)})
+        first = EnrichmentJob.claim(3, lease_seconds=300)
+        second = EnrichmentJob.claim(3, lease_seconds=300)
+        check('concurrent claims never overlap', len(first) == 3 and len(second) == 1
+              and not {job.id for job in first} & {job.id for job in second})
+        check('nothing left to claim', EnrichmentJob.claim(3, lease_seconds=300) == [])
+        for job in EnrichmentJob.query:
+            job.started_at = datetime.utcnow() - timedelta(seconds=600)
+        db.session.commit()
+        check('expired leases reclaimed', len(EnrichmentJob.claim(10, lease_seconds=300)) == 4)
+        for job in EnrichmentJob.query:
+            job.started_at = datetime.utcnow() - timedelta(seconds=600)
+        db.session.commit()
+
+        # A thread drains it too, and stats report depth and latency. One
+        # thread and no queries meanwhile: every session here shares the one
+        # in-memory SQLite connection
+        db.session.remove()
+        worker.concurrency = 1
+        worker.poll_interval = 0.05
+        worker.start()
+        time.sleep(1)
+        worker.stop()
+        stats = worker.stats()
+        check('worker threads drain the queue', EnrichmentJob.query.count() == 0 and not stats['running'])
+        check('queue depth reported', stats['depth']['pending'] == 0 and stats['depth']['failed'] == 0, f"({stats['depth']})")
+        check('job counts and latency reported', stats['enriched'] == 13 and stats['retried'] == 3
+              and stats['failed'] == 1 and stats['latency'].get('p95_seconds') is not None,
+              f"(enriched {stats['enriched']}, retried {stats['retried']}, failed {stats['failed']})")
+        response = client.get('/api/ai/health')
+        check('queue stats on /api/ai/health', 'depth' in response.get_json()['enrichment_queue'])
+
+    print("OK: journal writes queue enrichment and the worker drains it idempotently")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Check for the persisted journal summary store
+Drives POST /api/ai/journal/monthly-summary and /api/journal/insights-summary
+against a stub Gemini model and fails unless a repeat request is served from
+journal_summaries without calling the model (even with the in-process AI
+cache cleared, as after a restart), editing, adding or deleting an entry or
+force_refresh regenerates the summary, and fallback summaries are never stored.
+"""
+
+import io
+import os
+import sys
+import contextlib
+from datetime import date
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models.user import User
+from app.models.habit import Habit
+from app.models.check_in import CheckIn
+from app.models.journal_entry import JournalEntry
+from app.models.journal_summary import JournalSummary
+import app.utils.ai_service as ai_module
+from scripts.check_ai_client import FakeModel, service, check
+
+
+def seed(email, day, count):
+    """A user with count journaled check-ins on the day. Returns (user id, check-in ids)."""
+    user = User(email=email)
+    db.session.add(user)
+    db.session.flush()
+    habits = [Habit(user_id=user.id, title=f'Journal {n}', start_date=day) for n in range(count)]
+    db.session.add_all(habits)
+    db.session.flush()
+    check_in_ids = []
+    for n, habit in enumerate(habits):
+        check_in = CheckIn(habit_id=habit.id, user_id=user.id, date=day, completed=True, mood_rating=7)
+        db.session.add(check_in)
+        db.session.flush()
+        db.session.add(JournalEntry(user_id=user.id, checkin_id=check_in.id, entry_date=day, content=f'Note {n}: calm and focused'))
+        check_in_ids.append(check_in.id)
+    db.session.commit()
+    return user.id, check_in_ids
+
+
+def main():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        client = app.test_client()
+
+        # Today's entries fall in every period: this month and each rolling window
+        today = date.today()
+        user_id, check_in_ids = seed('summaries@example.com', today, 3)
+        other_id, _ = seed('summaries-other@example.com', today, 3)
+        headers = {'Authorization': f'Bearer {create_access_token(identity=user_id)}'}
+        other_headers = {'Authorization': f'Bearer {create_access_token(identity=other_id)}'}
+        month = today.strftime('%Y-%m')
+
+        model = FakeModel()
+        ai_module.ai_service = service(model)
+
+        def monthly(force_refresh=False, request_headers=headers):
+            ai_module.ai_service.clear_all_cache()
+            # The route prints debug output on every request
+            with contextlib.redirect_stdout(io.StringIO()):
+                response = client.post('/api/ai/journal/monthly-summary', headers=request_headers,
+                                       json={'month': month, 'force_refresh': force_refresh})
+            assert response.status_code == 200, response.get_json()
+            return response.get_json()['summary']
+
+        def insights(period, force_refresh=False):
+            ai_module.ai_service.clear_all_cache()
+            response = client.post('/api/journal/insights-summary', headers=headers,
+                                   json={'period': period, 'force_refresh': force_refresh})
+            assert response.status_code == 200, response.get_json()
+            return response.get_json()['summary']
+
+        def regenerates(name, request, *args, **kwargs):
+            calls = model.calls
+            summary = request(*args, **kwargs)
+            check(name, model.calls == calls + 1 and not summary['is_fallback'], f'({model.calls - calls} model calls)')
+            return summary
+
+        def served(name, request, *args, **kwargs):
+            calls = model.calls
+            summary = request(*args, **kwargs)
+            check(name, model.calls == calls, f'({model.calls - calls} model calls)')
+            return summary
+
+        first = regenerates('first monthly summary generates', monthly)
+        repeat = served('repeat monthly summary served from table', monthly)
+        check('stored summary returned unchanged', repeat == first)
+        check('one row stored for the month', JournalSummary.query.filter_by(user_id=user_id).count() == 1)
+
+        entry = JournalEntry.query.filter_by(user_id=user_id).first()
+        response = client.put(f'/api/journal/{entry.id}', headers=headers, json={'content': 'Rewritten entry'})
+        assert response.status_code == 200, response.get_json()
+        regenerates('edited entry regenerates', monthly)
+        served('repeat after edit served from table', monthly)
+
+        response = client.post('/api/journal/', headers=headers, json={
+            'checkin_id': check_in_ids[0], 'content': 'A second note today', 'entry_date': today.isoformat()
+        })
+        assert response.status_code == 201, response.get_json()
+        new_entry_id = response.get_json()['entry']['id']
+        summary = regenerates('added entry regenerates', monthly)
+        check('summary counts the added entry', summary['entry_count'] == 4)
+
+        response = client.delete(f'/api/journal/{new_entry_id}', headers=headers)
+        assert response.status_code == 200, response.get_json()
+        summary = regenerates('deleted entry regenerates', monthly)
+        check('summary drops the deleted entry', summary['entry_count'] == 3)
+
+        regenerates('force_refresh regenerates', monthly, force_refresh=True)
+        served('repeat after force_refresh served from table', monthly)
+        check('month row replaced, not duplicated', JournalSummary.query.filter_by(user_id=user_id).count() == 1)
+
+        regenerates("another user's month generates separately", monthly, request_headers=other_headers)
+        served("another user's repeat served from table", monthly, request_headers=other_headers)
+
+        regenerates('first weekly insights generate', insights, 'week')
+        served('repeat weekly insights served from table', insights, 'week')
+        regenerates('yearly insights stored apart from weekly', insights, 'year')
+        regenerates('insights force_refresh regenerates', insights, 'week', force_refresh=True)
+
+        # While Gemini is down the fallback is returned but never stored
+        db.session.query(JournalSummary).delete()
+        db.session.commit()
+        model.default = 'error'
+        summary = monthly()
+        check('fallback summary returned while Gemini fails', summary['is_fallback'])
+        check('fallback summary not stored', JournalSummary.query.count() == 0)
+        model.default = 'ok'
+        ai_module.ai_service = service(model)
+        regenerates('month regenerates once Gemini recovers', monthly)
+
+    print("OK: journal summaries are served from the table until their entries change")
+
+
+if __name__ == '__main__':
+    main()
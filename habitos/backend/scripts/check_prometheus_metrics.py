@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Check for the Prometheus /metrics endpoint
+Validates the text exposition format of GET /metrics (HELP and TYPE before
+every family, well-formed samples and escaped label values, cumulative
+histogram buckets ending in +Inf that equal _count), then fails unless
+requests, SQL statements per request, Gemini calls and cache lookups are
+counted, and unless multiprocess mode sums counters over worker processes
+that have exited and only counts gauges of the ones still running.
+"""
+
+import os
+import re
+import sys
+import tempfile
+import subprocess
+from datetime import date
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# /metrics is opt-in
+os.environ['METRICS_ENABLED'] = 'true'
+
+from flask import Flask
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models.user import User
+from app.models.habit import Habit
+from app.utils import metrics
+from app.utils.ai_service import AICache
+from app.utils.response_cache import LocalCache
+from scripts.check_ai_client import FakeModel, service, check
+
+CHILD_REQUESTS = 100
+
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{(.*)\})? (\S+)$')
+LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\[\\"n])*)"(,|$)')
+
+
+def parse_labels(text):
+    """Label pairs of a sample, or None if they are malformed"""
+    labels = {}
+    position = 0
+    while position < len(text):
+        match = LABEL.match(text, position)
+        if match is None:
+            return None
+        labels[match.group(1)] = match.group(2)
+        position = match.end()
+    return labels
+
+
+def validate_exposition(text):
+    """Format errors in a text exposition, and its samples as {(name, labels): value}"""
+    errors = []
+    samples = {}
+    families = {}
+    current = None
+    if not text.endswith('\n'):
+        errors.append('does not end with a newline')
+    for line in text.rstrip('\n').split('\n'):
+        if line.startswith('# HELP '):
+            current = line.split(' ')[2]
+            families[current] = None
+        elif line.startswith('# TYPE '):
+            _, _, name, kind = line.split(' ')
+            if name != current or kind not in ('counter', 'gauge', 'histogram'):
+                errors.append(f'bad TYPE line: {line}')
+            families[name] = kind
+        else:
+            match = SAMPLE.match(line)
+            labels = parse_labels(match.group(3) or '') if match else None
+            if match is None or labels is None:
+                errors.append(f'bad sample: {line}')
+                continue
+            name = match.group(1)
+            base = re.sub(r'_(bucket|sum|count)$', '', name) if families.get(current) == 'histogram' else name
+            if base != current:
+                errors.append(f'sample outside its family: {line}')
+            try:
+                value = float(match.group(4))
+            except ValueError:
+                errors.append(f'bad value: {line}')
+                continue
+            samples[(name, tuple(sorted(labels.items())))] = value
+
+    # Histogram buckets are cumulative and end in +Inf == _count
+    for (name, labels), count in samples.items():
+        if not name.endswith('_count') or families.get(name[:-6]) != 'histogram':
+            continue
+        family = name[:-6]
+        buckets = sorted(
+            (float(dict(bucket_labels)['le']), value)
+            for (bucket_name, bucket_labels), value in samples.items()
+            if bucket_name == f'{family}_bucket'
+            and tuple(item for item in bucket_labels if item[0] != 'le') == labels
+        )
+        values = [value for _, value in buckets]
+        if not buckets or buckets[-1][0] != float('inf') or values[-1] != count or values != sorted(values):
+            errors.append(f'bad buckets for {family} {labels}')
+    return errors, samples
+
+
+def value(samples, name, **labels):
+    return samples.get((name, tuple(sorted((key, str(v)) for key, v in labels.items()))), 0)
+
+
+def child(directory, hold):
+    """A worker that counts CHILD_REQUESTS requests; with hold, it reports one running AI call and waits"""
+    app = Flask(__name__)
+    app.config.update(METRICS_MULTIPROC_DIR=directory, METRICS_SYNC_INTERVAL_MS=50)
+    metrics.REGISTRY.configure(app)
+    for _ in range(CHILD_REQUESTS):
+        metrics.HTTP_REQUESTS.inc(method='GET', endpoint='/api/habits/', status=200)
+    if hold:
+        metrics.AI_CALLS_IN_FLIGHT.inc()
+        metrics.REGISTRY.sync()
+        print('ready', flush=True)
+        sys.stdin.readline()
+
+
+def main():
+    # Escaping and format of a registry with awkward label values and help text
+    registry = metrics.MetricsRegistry()
+    counter = metrics.Counter('test_total', 'Help with \\ and\nnewline', ['path'], registry=registry)
+    counter.inc(path='a"b\\c\nd')
+    histogram = metrics.Histogram('test_seconds', 'Test', registry=registry, buckets=(0.1, 1))
+    for observation in (0.05, 0.5, 5):
+        histogram.observe(observation)
+    text = registry.expose()
+    errors, samples = validate_exposition(text)
+    check('escaped labels and help', not errors and '# HELP test_total Help with \\\\ and\\nnewline' in text
+          and 'test_total{path="a\\"b\\\\c\\nd"} 1.0' in text, f'({errors})')
+    check('histogram buckets', [value(samples, 'test_seconds_bucket', le=le) for le in ('0.1', '1.0', '+Inf')] == [1, 2, 3]
+          and value(samples, 'test_seconds_sum') == 5.55 and value(samples, 'test_seconds_count') == 3)
+
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        user = User(email='metrics@example.com')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add_all([Habit(user_id=user.id, title=f'Habit {n}', start_date=date.today()) for n in range(3)])
+        db.session.commit()
+        headers = {'Authorization': f'Bearer {create_access_token(identity=user.id)}'}
+
+        client = app.test_client()
+        before = validate_exposition(client.get('/metrics').get_data(as_text=True))[1]
+        for _ in range(5):
+            client.get('/api/habits/', headers=headers)
+
+        # Gemini calls and cache lookups
+        service(FakeModel()).analyze_journal_sentiment('A fine day')
+        cache = AICache(client=LocalCache(10))
+        cache.get('prompts', 'k')
+        cache.set('prompts', 'k', ['prompt'])
+        cache.get('prompts', 'k')
+
+        response = client.get('/metrics')
+        errors, after = validate_exposition(response.get_data(as_text=True))
+        check('content type', response.headers['Content-Type'] == metrics.CONTENT_TYPE, response.headers['Content-Type'])
+        check('exposition format', not errors, f'({errors[:3]})')
+
+        def delta(name, **labels):
+            return value(after, name, **labels) - value(before, name, **labels)
+
+        route = '/api/habits/'
+        check('requests counted by route and status',
+              delta('habitos_http_requests_total', method='GET', endpoint=route, status=200) == 5)
+        check('request duration histogram',
+              delta('habitos_http_request_duration_seconds_count', method='GET', endpoint=route) == 5)
+        queries = delta('habitos_db_queries_per_request_sum', endpoint=route)
+        check('SQL statements per request', delta('habitos_db_queries_per_request_count', endpoint=route) == 5
+              and queries >= 5, f'({queries} statements)')
+        check('SQL time per request', delta('habitos_db_query_seconds_per_request_sum', endpoint=route) > 0)
+        check('AI call latency', delta('habitos_ai_call_duration_seconds_count', outcome='success') == 1)
+        check('cache hits and misses', delta('habitos_cache_requests_total', cache='ai', result='hit') == 1
+              and delta('habitos_cache_requests_total', cache='ai', result='miss') == 1)
+
+    # Multiprocess mode: counters of exited workers are kept, gauges only of running ones
+    directory = tempfile.mkdtemp()
+    script = os.path.abspath(__file__)
+    for _ in range(2):
+        subprocess.run([sys.executable, script, '--child', directory], check=True, capture_output=True, timeout=60)
+    holder = subprocess.Popen([sys.executable, script, '--child', directory, '--hold'],
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        holder.stdout.readline()
+        scraper = metrics.MetricsRegistry()
+        scraper.multiproc_dir = directory
+        errors, samples = validate_exposition(scraper.expose())
+        requests_total = value(samples, 'habitos_http_requests_total', method='GET', endpoint='/api/habits/', status=200)
+        check('counters summed over workers', not errors and requests_total == 3 * CHILD_REQUESTS, f'({requests_total})')
+        check('gauges of running workers', value(samples, 'habitos_ai_calls_in_flight') == 1)
+    finally:
+        holder.communicate('\n', timeout=30)
+    errors, samples = validate_exposition(scraper.expose())
+    check('counters kept after workers exit', value(samples, 'habitos_http_requests_total', method='GET',
+                                                    endpoint='/api/habits/', status=200) == 3 * CHILD_REQUESTS)
+    check('gauges of exited workers dropped', value(samples, 'habitos_ai_calls_in_flight') == 0)
+
+    print('OK: /metrics is valid Prometheus text and aggregates across workers')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) >= 3 and sys.argv[1] == '--child':
+        child(sys.argv[2], hold='--hold' in sys.argv)
+    else:
+        main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Query-count regression check for list and summary endpoints
+Seeds users with growing numbers of habits (mixed frequencies) into an
+in-memory SQLite database and fails if any endpoint's query count grows
+with the number of rows it serializes.
+"""
+
+import os
+import sys
+from datetime import date, timedelta
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models.user import User
+from app.models.habit import Habit, HabitFrequency
+from app.models.check_in import CheckIn
+from app.models.user_daily_rollup import UserDailyRollup
+from app.models.journal_entry import JournalEntry
+from app.utils.query_profiler import profile_queries
+
+SIZES = [1, 10, 50]
+HISTORY_DAYS = 14
+ENDPOINTS = [
+    '/api/habits',
+    '/api/dashboard',
+    '/api/users/dashboard',
+    '/api/users/stats',
+    '/api/users/habits/summary',
+    '/api/users/data-export',
+    '/api/journal/?paginate=false',
+    '/api/journal/?limit=500&include_ai_data=true',
+    '/api/journal/today',
+]
+FREQUENCIES = [
+    (HabitFrequency.DAILY, []),
+    (HabitFrequency.WEEKLY, ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']),
+    (HabitFrequency.MONTHLY, list(range(1, 32))),
+    (HabitFrequency.CUSTOM, []),
+]
+
+
+def seed_user(email, habit_count):
+    """Create a user with habit_count habits and HISTORY_DAYS of journaled check-ins each"""
+    user = User(email=email)
+    db.session.add(user)
+    db.session.flush()
+
+    today = date.today()
+    for i in range(habit_count):
+        frequency, occurrence_days = FREQUENCIES[i % len(FREQUENCIES)]
+        habit = Habit(
+            user_id=user.id,
+            title=f'Habit {i}',
+            frequency=frequency,
+            frequency_count=1,
+            occurrence_days_list=occurrence_days,
+            start_date=today - timedelta(days=HISTORY_DAYS)
+        )
+        db.session.add(habit)
+        db.session.flush()
+        for d in range(HISTORY_DAYS):
+            check_in = CheckIn(
+                habit_id=habit.id, user_id=user.id, date=today - timedelta(days=d),
+                completed=d % 2 == 0, mood_rating=d % 10 + 1
+            )
+            db.session.add(check_in)
+            db.session.flush()
+            db.session.add(JournalEntry(
+                user_id=user.id, checkin_id=check_in.id, entry_date=check_in.date, content=f'Entry {d}'
+            ))
+
+    UserDailyRollup.rebuild([user.id])
+    db.session.commit()
+    return user
+
+
+def main():
+    app = create_app('testing')
+
+    with app.app_context():
+        db.create_all()
+        client = app.test_client()
+
+        counts = {endpoint: [] for endpoint in ENDPOINTS}
+        for size in SIZES:
+            user = seed_user(f'query-count-{size}@example.com', size)
+            headers = {'Authorization': f'Bearer {create_access_token(identity=user.id)}'}
+
+            for endpoint in ENDPOINTS:
+                db.session.expunge_all()
+                with profile_queries() as profile:
+                    response = client.get(endpoint, headers=headers)
+                assert response.status_code == 200, (endpoint, response.get_json())
+                counts[endpoint].append(profile.count)
+
+        print(f"{'endpoint':<44}" + ''.join(f'{size:>8}' for size in SIZES))
+        failed = []
+        for endpoint, endpoint_counts in counts.items():
+            print(f'{endpoint:<44}' + ''.join(f'{count:>8}' for count in endpoint_counts))
+            if len(set(endpoint_counts)) > 1:
+                failed.append(endpoint)
+
+        if failed:
+            print(f"FAIL: query count grows with row count for {', '.join(failed)}")
+            sys.exit(1)
+        print("OK: query counts are constant")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Check for the SQL query profiler
+Fails unless statements are normalized to the same shape whatever their
+literals and IN list lengths, a route that queries once per row logs an N+1
+warning naming the route and statement while /api/habits/ does not, the
+Server-Timing header reports the request's statements, profiling stays off
+without QUERY_PROFILER_ENABLED, and assert_max_queries and the max_queries
+pytest fixture pass and fail on the right counts.
+"""
+
+import os
+import sys
+import logging
+import tempfile
+import subprocess
+from datetime import date
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import jsonify
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models.user import User
+from app.models.habit import Habit
+from app.utils.query_profiler import QueryProfiler, normalize_statement, profile_queries, assert_max_queries
+from scripts.check_ai_client import check
+
+HABITS = 20
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+FIXTURE_TEST = '''
+from app import create_app, db
+from app.models.habit import Habit
+
+def test_within_limit(max_queries):
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        with max_queries(1):
+            Habit.query.all()
+
+def test_over_limit(max_queries):
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        with max_queries(2):
+            for habit_id in range(5):
+                db.session.get(Habit, str(habit_id))
+'''
+
+
+class Records(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def main():
+    # Normalization
+    check('literals normalized', normalize_statement("SELECT * FROM habits WHERE id = 'a''b' AND n > 3.5")
+          == normalize_statement("SELECT *\n  FROM habits WHERE id = 'c' AND n > 7"))
+    check('placeholders normalized', normalize_statement('SELECT * FROM habits WHERE id = ? AND user_id = ?')
+          == normalize_statement('SELECT * FROM habits WHERE id = %(id_1)s AND user_id = :user_id'))
+    check('IN lists collapsed', normalize_statement('SELECT * FROM habits WHERE id IN (?, ?, ?)')
+          == normalize_statement('SELECT * FROM habits WHERE id IN (1, 2)') == 'SELECT * FROM habits WHERE id IN (...)')
+    check('different statements kept apart', normalize_statement('SELECT * FROM habits WHERE id = ?')
+          != normalize_statement('SELECT * FROM goals WHERE id = ?'))
+
+    records = Records()
+    logging.getLogger('app.utils.query_profiler').addHandler(records)
+
+    # Off unless enabled
+    app = create_app('testing')
+    check('disabled by default', 'query_profiler' not in app.extensions)
+
+    app = create_app('testing')
+    app.config.update(QUERY_PROFILER_ENABLED=True, QUERY_PROFILER_SERVER_TIMING=True)
+    QueryProfiler(app)
+
+    @app.route('/n-plus-one')
+    def n_plus_one():
+        ids = [habit_id for (habit_id,) in db.session.query(Habit.id)]
+        return jsonify([db.session.get(Habit, habit_id).title for habit_id in ids])
+
+    with app.app_context():
+        db.create_all()
+        user = User(email='profiler@example.com')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add_all([Habit(user_id=user.id, title=f'Habit {n}', start_date=date.today()) for n in range(HABITS)])
+        db.session.commit()
+        headers = {'Authorization': f'Bearer {create_access_token(identity=user.id)}'}
+        client = app.test_client()
+
+        db.session.expunge_all()
+        response = client.get('/n-plus-one')
+        warnings = [m for m in records.messages if 'N+1' in m]
+        check('N+1 warning logged', len(warnings) == 1 and f'ran {HABITS} times' in warnings[0]
+              and '/n-plus-one' in warnings[0] and 'FROM habits' in warnings[0], f'({records.messages})')
+        timing = response.headers.getlist('Server-Timing')
+        check('Server-Timing header', len(timing) == 2 and timing[0].startswith('db;dur=')
+              and f'desc="{HABITS + 1} queries"' in timing[0] and timing[1].startswith('app;dur='), f'({timing})')
+
+        records.messages.clear()
+        db.session.expunge_all()
+        response = client.get('/api/habits/', headers=headers)
+        check('no warning for /api/habits/', response.status_code == 200 and not records.messages, f'({records.messages})')
+
+        # Profiles outside requests, and nested in a request's
+        with profile_queries() as outer:
+            Habit.query.all()
+            with profile_queries() as inner:
+                Habit.query.count()
+        check('profile_queries counts the block', outer.count == 2 and inner.count == 1
+              and outer.total_time >= inner.total_time > 0)
+
+        with assert_max_queries(1):
+            Habit.query.all()
+        try:
+            with assert_max_queries(3, label='loop'):
+                for n in range(5):
+                    Habit.query.filter_by(title=f'Habit {n}').first()
+            failure = None
+        except AssertionError as e:
+            failure = str(e)
+        check('assert_max_queries fails over the limit', failure is not None and 'loop ran 5 SQL statements' in failure
+              and '5x SELECT' in failure, f'({failure})')
+
+    # The pytest fixture
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'test_max_queries.py')
+        with open(path, 'w') as f:
+            f.write(FIXTURE_TEST)
+        result = subprocess.run(
+            [sys.executable, '-m', 'pytest', '-q', '-p', 'scripts.pytest_plugin', '-p', 'no:cacheprovider', path],
+            cwd=BACKEND, capture_output=True, text=True, timeout=120,
+            env={**os.environ, 'PYTHONPATH': BACKEND}
+        )
+        summary = result.stdout.strip().splitlines()[-1:] or [result.stderr[-300:]]
+        check('max_queries fixture', '1 failed, 1 passed' in result.stdout
+              and 'test_over_limit ran 5 SQL statements, more than the 2 allowed' in result.stdout, f'({summary[0]})')
+
+    print('OK: the query profiler reports per-request statements and flags N+1 loops')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Check for the rate limiter in app/utils/security.py
+Fails unless requests in the same second are counted one by one, both
+algorithms admit exactly the limit when many threads hit one key at once
+(in-process, and against a fake Redis that runs the scripts atomically
+the way Redis does), every check is a single Redis call, a Redis failure
+falls back to in-process limiting, GCRA spaces requests after a burst,
+and @rate_limit responses carry RateLimit-* and Retry-After headers.
+"""
+
+import os
+import sys
+import threading
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import jsonify
+from app import create_app
+from app.utils.security import (
+    RateLimiter, LocalRateLimitStore, rate_limit, SLIDING_WINDOW, GCRA, SLIDING_WINDOW_SCRIPT, GCRA_SCRIPT
+)
+from scripts.check_ai_client import check
+
+THREADS = 50
+REQUESTS_PER_THREAD = 20
+LIMIT = 100
+
+
+class FakeScript:
+    def __init__(self, redis, algorithm):
+        self.redis = redis
+        self.algorithm = algorithm
+
+    def __call__(self, keys, args):
+        return self.redis.evalsha(self.algorithm, keys, args)
+
+
+class FakeRedis:
+    """
+    Stands in for a Redis server: registered scripts run one at a time
+    (Redis executes scripts atomically) on the in-process implementation
+    of the same algorithm. Only scripts are supported, so a check that
+    needed any other command would fail and show up as a fallback.
+    """
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = 0
+        self._store = LocalRateLimitStore()
+        self._lock = threading.Lock()
+
+    def register_script(self, source):
+        return FakeScript(self, {SLIDING_WINDOW_SCRIPT: SLIDING_WINDOW, GCRA_SCRIPT: GCRA}[source])
+
+    def evalsha(self, algorithm, keys, args):
+        with self._lock:
+            self.calls += 1
+            if self.fail:
+                raise ConnectionError('Connection refused')
+            now, window, limit, cost = args[:4]
+            return self._store.run(algorithm, keys[0], now, window, limit, cost)
+
+
+def hammer(limiter, algorithm):
+    """THREADS threads checking one key at once. Returns the number allowed."""
+    allowed = []
+    barrier = threading.Barrier(THREADS)
+
+    def client():
+        barrier.wait()
+        for _ in range(REQUESTS_PER_THREAD):
+            allowed.append(limiter.check('hammer', LIMIT, 60, algorithm=algorithm, identifier='ip:1')['allowed'])
+
+    threads = [threading.Thread(target=client) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(allowed)
+
+
+def main():
+    app = create_app('testing')
+
+    # Requests in the same millisecond are separate requests
+    store = LocalRateLimitStore()
+    results = [store.run(SLIDING_WINDOW, 'same', 1000, 1000, 5, 1) for _ in range(10)]
+    check('same-instant requests counted one by one', [r[0] for r in results] == [1] * 5 + [0] * 5)
+    check('denied requests are not counted', store.run(SLIDING_WINDOW, 'same', 2000, 1000, 5, 1)[0] == 1)
+    check('window slides', store.run(SLIDING_WINDOW, 'slide', 0, 1000, 1, 1)[0] == 1
+          and store.run(SLIDING_WINDOW, 'slide', 999, 1000, 1, 1)[0] == 0
+          and store.run(SLIDING_WINDOW, 'slide', 1000, 1000, 1, 1)[0] == 1)
+
+    # GCRA: a burst of the limit, then one request per window / limit
+    burst = [store.run(GCRA, 'gcra', 0, 1000, 5, 1)[0] for _ in range(6)]
+    check('gcra allows a burst of the limit', burst == [1] * 5 + [0])
+    denied = store.run(GCRA, 'gcra', 100, 1000, 5, 1)
+    check('gcra retry_after is the emission interval', denied[0] == 0 and denied[3] == 100, f'({denied})')
+    check('gcra allows one per interval', store.run(GCRA, 'gcra', 200, 1000, 5, 1)[0] == 1
+          and store.run(GCRA, 'gcra', 200, 1000, 5, 1)[0] == 0)
+    check('cost 0 only reads', store.run(GCRA, 'peek', 0, 1000, 5, 0) == [1, 5, 0, 0]
+          and store.run(SLIDING_WINDOW, 'peek', 0, 1000, 5, 0) == [1, 5, 0, 0])
+
+    # Many threads against one key admit exactly the limit
+    for algorithm in (SLIDING_WINDOW, GCRA):
+        limiter = RateLimiter(app)
+        allowed = hammer(limiter, algorithm)
+        check(f'{algorithm} in-process under {THREADS} threads', limiter.backend == 'memory' and allowed == LIMIT,
+              f'({allowed} of {THREADS * REQUESTS_PER_THREAD} allowed)')
+
+        fake = FakeRedis()
+        limiter = RateLimiter(app, redis_client=fake)
+        allowed = hammer(limiter, algorithm)
+        check(f'{algorithm} fake Redis under {THREADS} threads', allowed == LIMIT,
+              f'({allowed} of {THREADS * REQUESTS_PER_THREAD} allowed)')
+        check(f'{algorithm} one Redis call per check', fake.calls == THREADS * REQUESTS_PER_THREAD
+              and limiter.local_store._checks == 0, f'({fake.calls} calls)')
+
+    # Redis errors limit in-process instead of letting everything through
+    limiter = RateLimiter(app, redis_client=FakeRedis(fail=True))
+    results = [limiter.check('down', 3, 60, identifier='ip:1')['allowed'] for _ in range(5)]
+    check('Redis failure falls back to in-process', results == [True] * 3 + [False] * 2)
+
+    # Headers on a decorated endpoint
+    @app.route('/limited')
+    @rate_limit(3, 60, key_prefix='limited')
+    def limited():
+        return jsonify({'ok': True}), 201
+
+    RateLimiter(app)
+    client = app.test_client()
+    responses = [client.get('/limited') for _ in range(4)]
+    check('allowed responses keep their status', [r.status_code for r in responses] == [201, 201, 201, 429])
+    check('RateLimit-Remaining counts down', [r.headers.get('RateLimit-Remaining') for r in responses] == ['2', '1', '0', '0'])
+    check('RateLimit-Limit and Policy', responses[0].headers.get('RateLimit-Limit') == '3'
+          and responses[0].headers.get('RateLimit-Policy') == '3;w=60')
+    reset = int(responses[0].headers.get('RateLimit-Reset', -1))
+    retry_after = int(responses[3].headers.get('Retry-After', -1))
+    check('RateLimit-Reset and Retry-After', 59 <= reset <= 60 and 59 <= retry_after <= 60, f'({reset}, {retry_after})')
+    check('429 body', responses[3].get_json()['error'] == 'Rate limit exceeded')
+
+    print('OK: rate limits are exact under concurrency, one Redis call per check, with headers')
+
+
+if __name__ == '__main__':
+    main()
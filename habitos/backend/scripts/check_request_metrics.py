@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Check for buffered request metrics
+Fails unless requests are recorded without any Redis call on the request
+path, the buffer is flushed by the background thread in one pipeline per
+batch (after METRICS_FLUSH_EVERY requests or METRICS_FLUSH_INTERVAL_MS),
+latencies land in the right histogram buckets, a failed flush is retried
+without losing or double counting, and a worker process that exits with
+requests still buffered writes them all on the way out.
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask, jsonify
+from app.utils.monitoring import MetricsCollector, RequestMetricsMiddleware
+from scripts.check_ai_client import check
+
+CHILD_REQUESTS = 1000
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def hincrby(self, key, field, amount):
+        self.commands.append((key, field, amount))
+
+    def hincrbyfloat(self, key, field, amount):
+        self.commands.append((key, field, amount))
+
+    def expire(self, key, seconds):
+        pass
+
+    def execute(self):
+        self.redis.execute(self.commands)
+
+
+class FakeRedis:
+    """Hashes only; records which threads sent pipelines and can be made to fail"""
+
+    def __init__(self, dump_path=None):
+        self.hashes = {}
+        self.fail = False
+        self.executes = 0
+        self.threads = set()
+        self.dump_path = dump_path
+        self._lock = threading.Lock()
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def execute(self, commands):
+        with self._lock:
+            self.executes += 1
+            self.threads.add(threading.current_thread().name)
+            if self.fail:
+                raise ConnectionError('Connection refused')
+            for key, field, amount in commands:
+                fields = self.hashes.setdefault(key, {})
+                fields[field] = fields.get(field, 0) + amount
+            if self.dump_path:
+                with open(self.dump_path, 'w') as f:
+                    json.dump(self.hashes, f)
+
+    def hgetall(self, key):
+        return {field: str(value) for field, value in self.hashes.get(key, {}).items()}
+
+
+def make_app(**config):
+    app = Flask(__name__)
+    app.config.update({'METRICS_FLUSH_EVERY': 10 ** 9, 'METRICS_FLUSH_INTERVAL_MS': 60000, **config})
+    return app
+
+
+def today():
+    return datetime.utcnow().strftime('%Y-%m-%d')
+
+
+def child(dump_path):
+    """A worker that records requests from several threads and exits without stopping the collector"""
+    collector = MetricsCollector(make_app(), redis_client=FakeRedis(dump_path))
+    threads = [threading.Thread(target=lambda: [
+        collector.record_request_metric('/api/habits', 'GET', 200, 0.01) for _ in range(CHILD_REQUESTS // 8)
+    ]) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    sys.exit(0)
+
+
+def main():
+    # Requests through the middleware never reach Redis on the request thread
+    fake = FakeRedis()
+    app = make_app()
+    middleware = RequestMetricsMiddleware(app, MetricsCollector(app, redis_client=fake))
+
+    @app.route('/items/<int:item_id>')
+    def item(item_id):
+        return jsonify({'id': item_id}), 201
+
+    client = app.test_client()
+    for n in range(300):
+        client.get(f'/items/{n}')
+    client.get('/missing')
+    check('no Redis calls while serving', fake.executes == 0, f'({fake.executes} pipelines)')
+    middleware.collector.stop()
+    requests_today = fake.hashes.get(f'requests:{today()}', {})
+    check('flushed on stop, labelled by route', requests_today.get('GET:/items/<int:item_id>') == 300
+          and requests_today.get('GET:unmatched') == 1, f'({requests_today})')
+    check('status codes', fake.hashes.get(f'status_codes:{today()}') == {'201': 300, '404': 1})
+    check('one pipeline for the batch', fake.executes == 1, f'({fake.executes})')
+
+    # Flush after METRICS_FLUSH_EVERY requests, from the flush thread
+    fake = FakeRedis()
+    collector = MetricsCollector(make_app(METRICS_FLUSH_EVERY=50), redis_client=fake)
+    for _ in range(200):
+        collector.record_request_metric('/a', 'GET', 200, 0.01)
+    time.sleep(0.3)
+    flushed = fake.hashes.get(f'requests:{today()}', {}).get('GET:/a', 0)
+    check('flushes every N requests', flushed >= 150 and 1 <= fake.executes <= 4,
+          f'({flushed} flushed in {fake.executes} pipelines)')
+    check('flushes run on the flush thread', fake.threads == {'metrics-flush'}, f'({fake.threads})')
+    collector.stop()
+
+    # Flush after METRICS_FLUSH_INTERVAL_MS with few requests
+    fake = FakeRedis()
+    collector = MetricsCollector(make_app(METRICS_FLUSH_INTERVAL_MS=50), redis_client=fake)
+    collector.record_request_metric('/b', 'POST', 201, 0.01)
+    time.sleep(0.3)
+    check('flushes every T ms', fake.hashes.get(f'requests:{today()}', {}).get('POST:/b') == 1)
+    collector.stop()
+
+    # Histogram buckets
+    fake = FakeRedis()
+    collector = MetricsCollector(make_app(), redis_client=fake)
+    for duration in (0.003, 0.02, 0.7, 20):
+        collector.record_request_metric('/c', 'GET', 200, duration)
+    collector.stop()
+    histogram = collector.get_latency_histogram('GET', '/c')
+    buckets = histogram['buckets']
+    check('cumulative histogram buckets', (buckets['0.005'], buckets['0.025'], buckets['1.0'], buckets['10.0'], buckets['+Inf'])
+          == (1, 2, 3, 3, 4), f'({buckets})')
+    check('histogram count and sum', histogram['count'] == 4 and abs(histogram['sum'] - 20.723) < 1e-9)
+
+    # A failed flush is kept and written once Redis is back
+    fake = FakeRedis()
+    collector = MetricsCollector(make_app(), redis_client=fake)
+    for _ in range(10):
+        collector.record_request_metric('/d', 'GET', 200, 0.01)
+    fake.fail = True
+    check('failed flush keeps the batch', collector.flush() == 0 and collector.stats()['pending'] == 10)
+    fake.fail = False
+    collector.record_request_metric('/d', 'GET', 200, 0.01)
+    collector.stop()
+    check('retried batch counted once', fake.hashes[f'requests:{today()}']['GET:/d'] == 11)
+
+    # A worker process exiting with a full buffer loses nothing
+    dump_path = os.path.join(tempfile.mkdtemp(), 'metrics.json')
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', dump_path],
+                            capture_output=True, text=True, timeout=60)
+    written = {}
+    if os.path.exists(dump_path):
+        with open(dump_path) as f:
+            written = json.load(f)
+        os.remove(dump_path)
+    count = written.get(f'requests:{today()}', {}).get('GET:/api/habits', 0)
+    check('metrics flushed on worker exit', result.returncode == 0 and count == CHILD_REQUESTS,
+          f'({count} of {CHILD_REQUESTS})' if result.returncode == 0 else result.stderr[-300:])
+
+    print('OK: request metrics stay off the request path and survive shutdown')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3 and sys.argv[1] == '--child':
+        child(sys.argv[2])
+    else:
+        main()
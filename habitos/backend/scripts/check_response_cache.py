@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Invalidation check for the per-user response cache and ETags
+Drives every route marked @invalidates_cache against an in-memory SQLite
+database, once with a fake Redis client and once with the in-process LRU
+fallback, and fails if a cached analytics endpoint serves anything other
+than what an uncached request returns after the write, if a repeated read
+misses, if a write leaves the writer's ETags unchanged, if an unchanged
+conditional GET runs any SQL instead of answering 304, or if another user's
+cached payloads or ETags are invalidated by the write.
+"""
+
+import os
+import sys
+from datetime import date, timedelta
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import event
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models.user import User
+from app.models.habit import Habit
+from app.utils.response_cache import ResponseCache
+
+CACHED_ENDPOINTS = [
+    '/api/dashboard',
+    '/api/users/stats',
+    '/api/users/stats?days=7',
+    '/api/users/dashboard',
+    '/api/habits/stats',
+    '/api/users/habits/summary',
+    '/api/users/goals/summary',
+    '/api/users/journal/summary',
+]
+ETAG_ENDPOINTS = CACHED_ENDPOINTS + [
+    '/api/habits',
+    '/api/check-ins/today',
+]
+DATA_BLUEPRINTS = ('habits', 'check_ins', 'goals', 'journal', 'users')
+# POST routes that only read user data to build AI suggestions (summaries are
+# stored in journal_summaries, which no cached endpoint reads)
+READ_ONLY_ENDPOINTS = {
+    'journal.get_writing_suggestions',
+    'journal.generate_insights_summary',
+    'journal.analyze_habit_correlations',
+}
+
+
+class FakeRedis:
+    """The Redis commands the response cache uses, on a dict (decode_responses=True semantics)"""
+
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+
+    def ping(self):
+        return True
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = str(value)
+        self.ttls[key] = ex
+        return True
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1)
+        return int(self.data[key])
+
+
+def run(backend):
+    app = create_app('testing')
+    app.config['RESPONSE_CACHE_ENABLED'] = True
+    # In-process versions roll over every TTL; keep that from landing mid-run
+    app.config['RESPONSE_CACHE_TTL'] = 3600
+    fake_redis = FakeRedis() if backend == 'redis' else None
+    cache = ResponseCache(app, redis_client=fake_redis)
+    assert cache.backend == backend, cache.backend
+
+    with app.app_context():
+        db.create_all()
+        client = app.test_client()
+
+        users = [User(email=f'cache-{backend}-{i}@example.com') for i in range(2)]
+        db.session.add_all(users)
+        db.session.flush()
+        bystander_habit = Habit(user_id=users[1].id, title='Bystander', start_date=date(2020, 1, 1))
+        db.session.add(bystander_habit)
+        db.session.commit()
+        headers = {'Authorization': f'Bearer {create_access_token(identity=users[0].id)}'}
+        bystander_headers = {'Authorization': f'Bearer {create_access_token(identity=users[1].id)}'}
+        url_adapter = app.url_map.bind('localhost')
+
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+        today = date.today()
+        day = lambda n: (today - timedelta(days=n)).isoformat()
+
+        def get(url, request_headers=headers):
+            response = client.get(url, headers=request_headers)
+            assert response.status_code == 200, (url, response.status_code, response.get_json())
+            return response
+
+        def uncached(url):
+            app.config['RESPONSE_CACHE_ENABLED'] = False
+            try:
+                return get(url).get_json()
+            finally:
+                app.config['RESPONSE_CACHE_ENABLED'] = True
+
+        def fail(message):
+            print(f"FAIL [{backend}]: {message}")
+            sys.exit(1)
+
+        def warm(request_headers=headers):
+            for url in CACHED_ENDPOINTS:
+                get(url, request_headers)
+                response = get(url, request_headers)
+                if response.headers.get('X-Cache') != 'HIT':
+                    fail(f"repeated read of {url} was not served from cache")
+
+        def etags(request_headers=headers):
+            """Current ETag of every endpoint, checking each one validates with no SQL"""
+            tags = {}
+            for url in ETAG_ENDPOINTS:
+                tags[url] = get(url, request_headers).headers.get('ETag')
+                if not tags[url]:
+                    fail(f"{url} has no ETag")
+                statements.clear()
+                response = client.get(url, headers={**request_headers, 'If-None-Match': tags[url]})
+                if response.status_code != 304 or statements:
+                    fail(f"unchanged {url} answered {response.status_code} after {len(statements)} statements")
+            return tags
+
+        driven = set()
+
+        def write(name, method, url, **kwargs):
+            warm()
+            warm(bystander_headers)
+            before = etags()
+            bystander_before = etags(bystander_headers)
+            response = client.open(url, method=method, headers=headers, **kwargs)
+            assert response.status_code < 300, (name, response.status_code, response.get_json())
+            driven.add(url_adapter.match(url.split('?')[0], method=method)[0])
+            db.session.expunge_all()
+
+            for url_ in CACHED_ENDPOINTS:
+                response_ = get(url_)
+                if response_.headers.get('X-Cache') != 'MISS':
+                    fail(f"{url_} served a cached payload after {name}")
+                if response_.get_json() != uncached(url_):
+                    fail(f"{url_} differs from an uncached request after {name}")
+                if get(url_, bystander_headers).headers.get('X-Cache') != 'HIT':
+                    fail(f"{name} invalidated another user's cached {url_}")
+            for url_, etag in before.items():
+                response_ = client.get(url_, headers={**headers, 'If-None-Match': etag})
+                if response_.status_code != 200 or response_.headers.get('ETag') == etag:
+                    fail(f"{url_} kept its ETag after {name}")
+            if etags(bystander_headers) != bystander_before:
+                fail(f"{name} changed another user's ETags")
+            print(f"{backend:<8}{name:<26}{response.status_code:>6}  invalidated")
+            return response.get_json()
+
+        habit = write('create habit', 'POST', '/api/habits/', json={'title': 'Read'})['habit']
+        write('update habit', 'PUT', f"/api/habits/{habit['id']}", json={'title': 'Read more'})
+        goal = write('create goal', 'POST', '/api/goals/', json={
+            'title': 'Read 10 days', 'habit_id': habit['id'], 'goal_type': 'count', 'target_value': 10
+        })['goal']
+        write('update goal', 'PUT', f"/api/goals/{goal['id']}", json={'title': 'Read 5 days', 'target_value': 5})
+        write('update goal progress', 'PUT', f"/api/goals/{goal['id']}/progress", json={'current_value': 5})
+        check_in = write('create check-in', 'POST', '/api/check-ins/', json={
+            'habit_id': habit['id'], 'date': day(0), 'completed': True, 'mood_rating': 7
+        })['check_in']
+        write('update check-in', 'PUT', f"/api/check-ins/{check_in['id']}", json={'mood_rating': 4})
+        write('bulk check-in', 'POST', '/api/check-ins/bulk', json={
+            'date': day(1), 'mood_rating': 8, 'journal_content': 'Bulk reflection',
+            'habits': [{'habit_id': habit['id'], 'completed': True}]
+        })
+        write('import', 'POST', '/api/check-ins/import', json=[
+            {'habit_id': habit['id'], 'date': day(n), 'completed': n % 2 == 0, 'mood_rating': n % 10 + 1}
+            for n in range(2, 20)
+        ])
+        entry = write('create journal entry', 'POST', '/api/journal/', json={
+            'checkin_id': check_in['id'], 'content': 'A note', 'entry_date': day(0)
+        })['entry']
+        write('update journal entry', 'PUT', f"/api/journal/{entry['id']}", json={'entry_date': day(3)})
+        write('delete journal entry', 'DELETE', f"/api/journal/{entry['id']}")
+        write('delete check-in', 'DELETE', f"/api/check-ins/{check_in['id']}")
+        write('update profile', 'PATCH', '/api/users/profile', json={'bio': 'Reader'})
+        write('delete goal', 'DELETE', f"/api/goals/{goal['id']}")
+        write('delete habit', 'DELETE', f"/api/habits/{habit['id']}")
+
+        # Every write route of the data blueprints must invalidate and be driven above
+        for rule in app.url_map.iter_rules():
+            blueprint = rule.endpoint.split('.')[0]
+            if blueprint not in DATA_BLUEPRINTS or not rule.methods & {'POST', 'PUT', 'PATCH', 'DELETE'}:
+                continue
+            if rule.endpoint in READ_ONLY_ENDPOINTS:
+                continue
+            if not getattr(app.view_functions[rule.endpoint], 'invalidates_cache', False):
+                fail(f"{rule.endpoint} ({rule.rule}) writes without @invalidates_cache")
+            if rule.endpoint not in driven:
+                fail(f"{rule.endpoint} ({rule.rule}) is not exercised by this check")
+
+        stats = cache.stats()
+        if not stats['hits'] or not stats['misses']:
+            fail(f"hit/miss counters not recorded: {stats}")
+        if fake_redis is not None and set(fake_redis.ttls.values()) != {cache.ttl}:
+            fail(f"payloads stored without the configured TTL: {set(fake_redis.ttls.values())}")
+        print(f"{backend:<8}{stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']}% hit rate)")
+
+
+def main():
+    for backend in ('redis', 'memory'):
+        run(backend)
+    print("OK: every write route invalidates the writer's cached responses and ETags")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Check for the local lexicon sentiment scorer
+Fails unless every sample in scripts/test_sentiment.py gets its expected
+label, results have the shape of AIService.analyze_journal_sentiment,
+score_batch agrees with score one text at a time, negation, intensifiers
+and phrases move the score the right way, and the AI service falls back to
+the scorer when Gemini is disabled or failing.
+"""
+
+import os
+import sys
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import create_app
+from app.utils.sentiment import LexiconSentimentScorer
+from scripts.check_ai_client import FakeModel, service, check
+from scripts.test_sentiment import SAMPLE_CONTENTS
+
+LABELS = {'very_negative', 'negative', 'neutral', 'positive', 'very_positive'}
+
+
+def main():
+    scorer = LexiconSentimentScorer()
+
+    # Accuracy against the sample contents
+    contents = [sample['content'] for sample in SAMPLE_CONTENTS]
+    results = scorer.score_batch(contents)
+    for n, (sample, result) in enumerate(zip(SAMPLE_CONTENTS, results), 1):
+        check(f"sample {n} is {sample['expected']}", result['sentiment'] == sample['expected'],
+              f"(got {result['sentiment']}, score {result['sentiment_score']})")
+
+    # Same shape as the Gemini analysis, with values in range
+    keys = {'sentiment', 'sentiment_score', 'emotional_themes', 'confidence', 'reasoning'}
+    check('results have the analyze_journal_sentiment shape', all(
+        set(result) == keys and result['sentiment'] in LABELS and -1 <= result['sentiment_score'] <= 1
+        and 0 <= result['confidence'] <= 1 and isinstance(result['emotional_themes'], list)
+        for result in results + scorer.score_batch(['', 'Went to the shop.', '!!!'])
+    ))
+
+    # A batch scores each text as if alone, including empty ones and separators in the text
+    texts = contents + ['', None, 'Happy\x00sad', 'I am not happy']
+    check('score_batch matches score', scorer.score_batch(texts) == [scorer.score(text) for text in texts])
+    check('empty batch', scorer.score_batch([]) == [])
+
+    # Modifiers
+    score = lambda text: scorer.score(text)['sentiment_score']
+    check('negation flips', score('I am happy') > 0 > score('I am not happy'))
+    check('intensifier strengthens', score('I am very happy') > score('I am happy'))
+    check('dampener weakens', 0 < score('I am slightly happy') < score('I am happy'))
+    check('phrase beats its words', score("I couldn't be happier") > score('I could be happier') > 0)
+    check('curly apostrophes', score('I couldn’t be happier') == score("I couldn't be happier"))
+    check('themes found', 'anxiety' in scorer.score('So stressed and anxious about work')['emotional_themes'])
+
+    # AIService falls back to the scorer instead of a constant neutral result
+    app = create_app('testing')
+    with app.app_context():
+        disabled = service(FakeModel())
+        disabled.enabled = False
+        result = disabled.analyze_journal_sentiment(SAMPLE_CONTENTS[4]['content'])
+        check('disabled service scores locally', result['sentiment'] == 'very_negative', f"({result['sentiment']})")
+
+        failing = service(FakeModel(default='error'))
+        result = failing.analyze_journal_sentiment(SAMPLE_CONTENTS[0]['content'])
+        check('failing service scores locally', result['sentiment'] == 'positive', f"({result['sentiment']})")
+
+    print('OK: local sentiment scorer')
+
+
+if __name__ == '__main__':
+    main()
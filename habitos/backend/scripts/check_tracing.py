@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Check for request tracing
+Fails unless a traced request nests its service, SQL and Gemini spans
+(across the executor's worker threads) under one http.request span, failed
+work is marked, sampling drops whole traces, the JSON-lines and metrics
+exporters record every span, PerformanceTimer times with the monotonic
+clock inside the current trace, app.utils.logger.setup_logging works
+without LOG_FILE, and a span costs under a microsecond with tracing off.
+"""
+
+import os
+import sys
+import json
+import logging
+import tempfile
+from datetime import date
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask, jsonify
+from app import create_app, db
+from app.models.user import User
+from app.models.habit import Habit
+from app.utils import metrics, tracing
+from app.utils.logger import PerformanceTimer, setup_logging
+from app.utils.tracing import TRACER, NOOP_SPAN, JsonLinesExporter, MetricsExporter, TracingMiddleware, span, traced
+from scripts.check_ai_client import FakeModel, service, check
+from scripts.benchmark_tracing import best_ns, loop, context_manager
+
+SAMPLED_ROOTS = 2000
+SAMPLE_RATE = 0.25
+
+
+class Collector:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+    def flush(self):
+        pass
+
+    def named(self, name):
+        return [s for s in self.spans if s.name == name]
+
+
+class Lines(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.INFO)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+@traced
+def failing_step():
+    raise ValueError('bad input')
+
+
+def main():
+    # Off: the shared no-op span, nothing exported
+    collector = Collector()
+    TRACER.setup(False, exporters=[collector])
+    with span('off') as off:
+        off.set('ignored', True)
+    check('tracing off returns the no-op span', off is NOOP_SPAN and not collector.spans
+          and tracing.current_span() is None)
+
+    # request -> service -> SQL -> Gemini
+    app = create_app('testing')
+    TracingMiddleware(app)
+    ai = service(FakeModel(latency=0.01))
+
+    @app.route('/traced/<int:item_id>')
+    def traced_route(item_id):
+        habits = Habit.query.all()
+        sentiment = ai.analyze_journal_sentiment('A calm, productive day')
+        return jsonify({'habits': len(habits), 'sentiment': sentiment['sentiment']})
+
+    @app.route('/broken')
+    def broken():
+        failing_step()
+
+    directory = tempfile.mkdtemp()
+    jsonl_path = os.path.join(directory, 'traces.jsonl')
+    with app.app_context():
+        db.create_all()
+        user = User(email='tracing@example.com')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Habit(user_id=user.id, title='Read', start_date=date.today()))
+        db.session.commit()
+        collector = Collector()
+        TRACER.setup(True, 1.0, [collector, JsonLinesExporter(jsonl_path), MetricsExporter()])
+
+        client = app.test_client()
+        response = client.get('/traced/7')
+        by_id = {s.span_id: s for s in collector.spans}
+        roots = collector.named('http.request')
+        root = roots[0] if len(roots) == 1 else None
+        check('request span', response.status_code == 200 and root is not None and root.parent_id is None
+              and root.attributes == {'method': 'GET', 'route': '/traced/<int:item_id>', 'status': 200},
+              f'({[s.name for s in collector.spans]})')
+        service_spans = collector.named('app.utils.ai_service.AIService.analyze_journal_sentiment')
+        ai_spans = collector.named('ai.generate_content')
+        sql_spans = collector.named('db.query')
+        check('service span under the request', len(service_spans) == 1 and service_spans[0].parent_id == root.span_id)
+        check('Gemini span under the service (worker thread)',
+              len(ai_spans) == 1 and ai_spans[0].parent_id == service_spans[0].span_id
+              and ai_spans[0].attributes.get('retries') == 0)
+        check('SQL spans under the request', sql_spans and all(s.parent_id == root.span_id for s in sql_spans)
+              and 'FROM habits' in sql_spans[0].attributes['statement'])
+        check('one trace', {s.trace_id for s in collector.spans} == {root.trace_id}
+              and all(s.parent_id is None or s.parent_id in by_id for s in collector.spans))
+        check('children within their parent', all(
+            by_id[s.parent_id].start_ns <= s.start_ns and s.end_ns <= by_id[s.parent_id].end_ns
+            for s in collector.spans if s.parent_id and s.name != 'ai.generate_content'
+        ) and service_spans[0].start_ns <= ai_spans[0].start_ns <= ai_spans[0].end_ns <= service_spans[0].end_ns)
+        check('context restored after the request', tracing.current_span() is None)
+
+        collector.spans.clear()
+        try:
+            client.get('/broken')  # TESTING propagates the error
+        except ValueError:
+            pass
+        step = collector.named('__main__.failing_step')
+        request_span = collector.named('http.request')
+        check('failures marked', len(step) == 1 and step[0].error == 'ValueError'
+              and request_span and request_span[0].error == 'ValueError', f'({[s.error for s in collector.spans]})')
+
+    with open(jsonl_path) as f:
+        exported = [json.loads(line) for line in f]
+    traced_ids = {s['trace_id'] for s in exported}
+    check('JSON lines exporter', len(traced_ids) == 2 and all(
+        s['duration_us'] >= 0 and s['start_unix_ns'] > 0 for s in exported
+    ) and {'http.request', 'db.query', 'ai.generate_content'} <= {s['name'] for s in exported}, f'({len(exported)} spans)')
+    samples = metrics.SPAN_DURATION.snapshot()
+    check('metrics exporter', any(labels == ['ai.generate_content'] and value[2] == 1 for labels, value in samples))
+
+    # Sampling keeps or drops whole traces
+    collector = Collector()
+    TRACER.setup(True, SAMPLE_RATE, [collector])
+    for _ in range(SAMPLED_ROOTS):
+        with span('root'):
+            with span('child'):
+                with span('grandchild'):
+                    pass
+    roots = len(collector.named('root'))
+    check('sample rate', abs(roots - SAMPLED_ROOTS * SAMPLE_RATE) < SAMPLED_ROOTS * 0.05, f'({roots} of {SAMPLED_ROOTS})')
+    check('whole traces kept', len(collector.named('child')) == len(collector.named('grandchild')) == roots)
+
+    # PerformanceTimer: monotonic duration, a span in the current trace, one line of JSON
+    collector = Collector()
+    TRACER.setup(True, 1.0, [collector])
+    lines = Lines()
+    performance_logger = logging.getLogger('performance')
+    performance_logger.addHandler(lines)
+    performance_logger.setLevel(logging.INFO)
+    with span('outer') as outer:
+        with PerformanceTimer('import_rows', details={'rows': 3}) as timer:
+            sum(range(10000))
+    performance_logger.removeHandler(lines)
+    timers = collector.named('import_rows')
+    check('PerformanceTimer in the trace', len(timers) == 1 and timers[0].parent_id == outer.span_id
+          and 0 < timer.duration < 1)
+    logged = json.loads(lines.messages[0].split(': ', 1)[1]) if lines.messages else {}
+    check('PerformanceTimer logs one line', len(lines.messages) == 1 and '\n' not in lines.messages[0]
+          and logged.get('operation') == 'import_rows' and logged.get('details') == {'rows': 3})
+
+    # setup_logging without the LOG_FILE keys it used to require
+    bare = Flask(__name__)
+    root_handlers = list(logging.getLogger().handlers)
+    try:
+        setup_logging(bare)
+        handled = bare.logger.handlers and all(isinstance(h, logging.StreamHandler) for h in bare.logger.handlers)
+    except KeyError:
+        handled = False
+    finally:
+        logging.getLogger().handlers[:] = root_handlers
+    check('setup_logging without LOG_FILE', handled)
+
+    # Overhead with tracing off
+    TRACER.setup(False)
+    cost = best_ns(context_manager, 100000, 5) - best_ns(loop, 100000, 5)
+    check('span overhead with tracing off', cost < 1000, f'({cost:.0f}ns)')
+
+    print('OK: spans nest from request to SQL and Gemini, sample whole traces and cost nothing when off')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Script to check that route query shapes are served by indexes
+Seeds a large synthetic dataset into a PostgreSQL database inside a
+transaction, then runs EXPLAIN on the statements the routes actually issue:
+every GET route under /api (AI routes excepted) is requested as a seeded
+user, following one next_cursor per paginated list, and its SQL is captured
+with app.utils.query_profiler.profile_queries. The hand-written shapes in
+query_shapes are explained too, for paths a GET doesn't reach. Fails if any
+statement plans a sequential scan on a large table. The transaction is
+rolled back at the end, so the target database is left untouched; a route
+that commits only releases a savepoint inside it.
+
+Usage:
+    DATABASE_URL=postgresql://... python scripts/explain_queries.py --users 2000
+"""
+
+import os
+import sys
+import json
+import logging
+from datetime import date, timedelta, datetime, timezone
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import text, func, desc, or_, case, tuple_
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models.user import User
+from app.models.habit import Habit, HabitCategory, HabitFrequency
+from app.models.check_in import CheckIn
+from app.models.goal import Goal, GoalType, GoalStatus
+from app.models.journal_entry import JournalEntry
+from app.utils.query_profiler import profile_queries, normalize_statement, abbreviate
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+
+WATCHED_TABLES = {'habits', 'check_ins', 'goals', 'journal_entries'}
+CHUNK_SIZE = 10000
+# GET routes not requested: they call Gemini rather than the database
+SKIPPED_ROUTES = ('/api/ai/', 'prompts')
+# Page size for paginated lists, so the seeded history spans several pages
+PAGE_LIMIT = 20
+
+
+def seed(users, habits_per_user, days):
+    """Insert a synthetic dataset and return the ids of a sample user's rows, by route argument name"""
+    today = date.today()
+    now = datetime.now(timezone.utc)
+
+    user_rows, habit_rows, goal_rows, check_in_rows, journal_rows = [], [], [], [], []
+    for u in range(users):
+        user_id = f'explain-user-{u}'
+        user_rows.append({'id': user_id, 'email': f'{user_id}@example.com', 'created_at': now, 'updated_at': now})
+        for h in range(habits_per_user):
+            habit_id = f'explain-habit-{u}-{h}'
+            habit_rows.append({
+                'id': habit_id, 'user_id': user_id, 'title': f'Habit {h}',
+                'category': HabitCategory.PERSONAL, 'frequency': HabitFrequency.DAILY,
+                'frequency_count': 0, 'occurrence_days': '[]', 'current_streak': 0,
+                'longest_streak': 0, 'active': True, 'start_date': today - timedelta(days=days),
+                'created_at': now, 'updated_at': now
+            })
+            goal_rows.append({
+                'id': f'explain-goal-{u}-{h}', 'user_id': user_id, 'habit_id': habit_id,
+                'title': f'Goal {h}', 'goal_type': GoalType.COUNT, 'target_value': days,
+                'current_value': 0, 'status': GoalStatus.IN_PROGRESS, 'start_date': today - timedelta(days=days),
+                'reminder_enabled': True, 'reminder_days_before': 1, 'created_at': now, 'updated_at': now
+            })
+            for d in range(days):
+                check_in_id = f'explain-ci-{u}-{h}-{d}'
+                check_in_rows.append({
+                    'id': check_in_id, 'habit_id': habit_id, 'user_id': user_id,
+                    'date': today - timedelta(days=d), 'completed': d % 3 != 0,
+                    'mood_rating': d % 10 + 1, 'created_at': now, 'updated_at': now
+                })
+                if h == 0 and d % 2 == 0:
+                    journal_rows.append({
+                        'id': f'explain-je-{u}-{d}', 'user_id': user_id, 'checkin_id': check_in_id,
+                        'content': 'Synthetic entry', 'entry_date': today - timedelta(days=d),
+                        'created_at': now, 'updated_at': now
+                    })
+
+            if len(check_in_rows) >= CHUNK_SIZE:
+                _flush(habit_rows, goal_rows, check_in_rows, journal_rows, user_rows)
+
+    _flush(habit_rows, goal_rows, check_in_rows, journal_rows, user_rows)
+
+    for table in ('users', 'habits', 'goals', 'check_ins', 'journal_entries'):
+        db.session.execute(text(f'ANALYZE {table}'))
+
+    return {
+        'user_id': 'explain-user-0',
+        'habit_id': 'explain-habit-0-0',
+        'check_in_id': 'explain-ci-0-0-0',
+        'checkin_id': 'explain-ci-0-0-0',
+        'goal_id': 'explain-goal-0-0',
+        'entry_id': 'explain-je-0-0'
+    }
+
+
+def _flush(habit_rows, goal_rows, check_in_rows, journal_rows, user_rows):
+    """Insert buffered rows in dependency order and clear the buffers"""
+    for model, rows in ((User, user_rows), (Habit, habit_rows), (Goal, goal_rows),
+                        (CheckIn, check_in_rows), (JournalEntry, journal_rows)):
+        if rows:
+            db.session.execute(model.__table__.insert(), rows)
+            rows.clear()
+
+
+def query_shapes(user_id, habit_id, checkin_id):
+    """The query shapes issued by the routes, keyed by a readable name"""
+    today = date.today()
+    month_ago = today - timedelta(days=30)
+
+    return {
+        'habits by user': Habit.query.filter_by(user_id=user_id),
+        'active habits by user': Habit.query.filter_by(user_id=user_id, active=True),
+        'check-ins list by user': CheckIn.query.filter_by(user_id=user_id).order_by(CheckIn.date.desc()),
+        'check-ins by user and date': CheckIn.query.filter_by(user_id=user_id, date=today),
+        'check-ins by user since date': CheckIn.query.filter(CheckIn.user_id == user_id, CheckIn.date >= month_ago),
+        'check-in by habit, user and date': CheckIn.query.filter_by(habit_id=habit_id, user_id=user_id, date=today),
+        'completed today for habit': CheckIn.query.filter(
+            CheckIn.habit_id == habit_id, CheckIn.date == today, CheckIn.completed == True
+        ),
+        'completed count for habit in range': db.session.query(func.count(CheckIn.id)).filter(
+            CheckIn.habit_id == habit_id, CheckIn.date >= month_ago, CheckIn.date <= today, CheckIn.completed == True
+        ),
+        'goal progress count': db.session.query(func.count(CheckIn.id)).filter(
+            CheckIn.habit_id == habit_id, CheckIn.user_id == user_id,
+            CheckIn.completed == True, CheckIn.date >= month_ago
+        ),
+        'habit completed dates': db.session.query(CheckIn.date).filter(
+            CheckIn.habit_id == habit_id, CheckIn.completed == True
+        ).distinct().order_by(CheckIn.date),
+        'dashboard aggregate': db.session.query(
+            CheckIn.habit_id, CheckIn.date,
+            func.sum(case((CheckIn.completed == True, 1), else_=0)), func.max(CheckIn.mood_rating)
+        ).filter(
+            CheckIn.user_id == user_id, or_(CheckIn.completed == True, CheckIn.date == today)
+        ).group_by(CheckIn.habit_id, CheckIn.date),
+        'dashboard recent moods': db.session.query(CheckIn.mood_rating).filter(
+            CheckIn.user_id == user_id
+        ).order_by(desc(CheckIn.created_at)).limit(20),
+        'journal list by user': JournalEntry.query.filter_by(user_id=user_id).order_by(JournalEntry.entry_date.desc()),
+        'journal by user and date range': JournalEntry.query.filter(
+            JournalEntry.user_id == user_id, JournalEntry.entry_date >= month_ago, JournalEntry.entry_date <= today
+        ),
+        'journal by check-in': JournalEntry.query.filter_by(checkin_id=checkin_id),
+        'goals by user': Goal.query.filter_by(user_id=user_id).order_by(Goal.created_at.desc()),
+        'check-ins page after cursor': CheckIn.query.filter(
+            CheckIn.user_id == user_id, tuple_(CheckIn.date, CheckIn.id) < tuple_(month_ago, 'z')
+        ).order_by(CheckIn.date.desc(), CheckIn.id.desc()).limit(51),
+        'journal page after cursor': JournalEntry.query.filter(
+            JournalEntry.user_id == user_id, tuple_(JournalEntry.entry_date, JournalEntry.id) < tuple_(month_ago, 'z')
+        ).order_by(JournalEntry.entry_date.desc(), JournalEntry.id.desc()).limit(51),
+        'goals page after cursor': Goal.query.filter(
+            Goal.user_id == user_id, tuple_(Goal.created_at, Goal.id) < tuple_(datetime.now(timezone.utc), 'z')
+        ).order_by(Goal.created_at.desc(), Goal.id.desc()).limit(51),
+        'goals by user and status': Goal.query.filter_by(user_id=user_id, status=GoalStatus.IN_PROGRESS.value),
+        'goals by habit, user and status': Goal.query.filter_by(
+            habit_id=habit_id, user_id=user_id, status=GoalStatus.IN_PROGRESS.value
+        ),
+    }
+
+
+def find_seq_scans(plan):
+    """Return the watched relations that a JSON plan scans sequentially"""
+    found = []
+    if plan.get('Node Type') == 'Seq Scan' and plan.get('Relation Name') in WATCHED_TABLES:
+        found.append(plan['Relation Name'])
+    for child in plan.get('Plans', []):
+        found.extend(find_seq_scans(child))
+    return found
+
+
+def explain(connection, name, sql, parameters=None):
+    """EXPLAIN one statement in a savepoint, with the parameters it ran with. Returns True if it is index-backed."""
+    try:
+        with connection.begin_nested():
+            if parameters is None:
+                result = connection.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {sql}')
+            else:
+                result = connection.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {sql}', parameters)
+            plan = result.scalar()
+    except Exception as e:
+        logger.error(f"FAILED    {name}: {e}")
+        return False
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    seq_scans = find_seq_scans(plan[0]['Plan'])
+    if seq_scans:
+        logger.error(f"SEQ SCAN  {name}: {', '.join(seq_scans)}")
+        return False
+    logger.info(f"ok        {name}")
+    return True
+
+
+def find_cursor(body):
+    """The first next_cursor in a JSON response, if any"""
+    if isinstance(body, dict):
+        if body.get('next_cursor'):
+            return body['next_cursor']
+        values = body.values()
+    elif isinstance(body, list):
+        values = body
+    else:
+        return None
+    for value in values:
+        cursor = find_cursor(value)
+        if cursor:
+            return cursor
+    return None
+
+
+def route_urls(app, sample):
+    """Every GET route under /api with its arguments filled from the sample ids"""
+    urls = []
+    for rule in sorted(app.url_map.iter_rules(), key=lambda rule: rule.rule):
+        if 'GET' not in rule.methods or not rule.rule.startswith('/api/'):
+            continue
+        # /api/habits and /api/habits/ are the same view
+        if rule.rule.endswith('/') and rule.rule[:-1] in urls:
+            continue
+        if any(skipped in rule.rule for skipped in SKIPPED_ROUTES):
+            continue
+        if not set(rule.arguments) <= set(sample):
+            logger.warning(f"Skipping {rule.rule}: no sample id for {set(rule.arguments) - set(sample)}")
+            continue
+        urls.append(rule.rule.replace('<', '{').replace('>', '}').format(**sample))
+    return urls
+
+
+def capture_route_statements(app, sample):
+    """Request every GET route as the sample user; returns {shape: (route, statement, parameters)}"""
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {create_access_token(identity=sample["user_id"])}'}
+    statements = {}
+
+    for url in route_urls(app, sample):
+        requests = [f'{url}?limit={PAGE_LIMIT}']
+        while requests:
+            request_url = requests.pop()
+            with profile_queries() as profile:
+                response = client.get(request_url, headers=headers)
+            if response.status_code >= 400:
+                logger.warning(f"{request_url} returned {response.status_code}")
+            # Leave a failed statement's savepoint before the next request
+            db.session.rollback()
+            for statement, parameters, _ in profile.statements:
+                if statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+                    statements.setdefault(normalize_statement(statement), (request_url, statement, parameters))
+
+            cursor = find_cursor(response.get_json(silent=True)) if 'cursor=' not in request_url else None
+            if cursor:
+                requests.append(f'{url}?limit={PAGE_LIMIT}&cursor={cursor}')
+
+    return statements
+
+
+def explain_all(app, connection, users, habits_per_user, days):
+    """Seed, explain every route statement and query shape and return the failing names"""
+    dialect = postgresql.dialect()
+    failures = []
+
+    sample = seed(users, habits_per_user, days)
+    # Keep the dataset when a route rolls back its own savepoint
+    db.session.commit()
+
+    for shape, (url, statement, parameters) in capture_route_statements(app, sample).items():
+        name = f'{url}: {abbreviate(shape, 120)}'
+        if not explain(connection, name, statement, parameters):
+            failures.append(name)
+
+    for name, query in query_shapes(sample['user_id'], sample['habit_id'], sample['checkin_id']).items():
+        sql = str(query.statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+        if not explain(connection, name, sql):
+            failures.append(name)
+
+    return failures
+
+
+def main():
+    """Main function to run the EXPLAIN check"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Fail if any route query shape plans a sequential scan')
+    parser.add_argument('--users', type=int, default=1000, help='Synthetic users to seed')
+    parser.add_argument('--habits', type=int, default=5, help='Habits per synthetic user')
+    parser.add_argument('--days', type=int, default=180, help='Days of check-in history per habit')
+
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if db.engine.dialect.name != 'postgresql':
+            logger.error("EXPLAIN check requires a PostgreSQL DATABASE_URL")
+            sys.exit(2)
+
+        # One outer transaction that is always rolled back; the session's
+        # commits only release savepoints inside it
+        connection = db.engine.connect()
+        transaction = connection.begin()
+        db.session.registry.set(Session(bind=connection, join_transaction_mode='create_savepoint'))
+        try:
+            failures = explain_all(app, connection, args.users, args.habits, args.days)
+        finally:
+            # Never keep the synthetic dataset
+            db.session.remove()
+            transaction.rollback()
+            connection.close()
+
+        if failures:
+            logger.error(f"{len(failures)} statements use sequential scans or failed to plan")
+            sys.exit(1)
+        logger.info("All route statements and query shapes are index-backed")
+
+
+if __name__ == '__main__':
+    main()
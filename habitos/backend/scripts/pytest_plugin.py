@@ -0,0 +1,24 @@
+"""
+pytest fixtures for HabitOS
+
+Load with `pytest -p scripts.pytest_plugin` or
+`pytest_plugins = ['scripts.pytest_plugin']` in a conftest.py.
+
+max_queries bounds the SQL statements an endpoint runs, so a per-row query
+loop fails the test that covers it, with the repeated statements in the
+message:
+
+    def test_list_habits(client, headers, max_queries):
+        with max_queries(3):
+            client.get('/api/habits/', headers=headers)
+"""
+
+import pytest
+from app.utils.query_profiler import assert_max_queries
+
+@pytest.fixture
+def max_queries(request):
+    """assert_max_queries, labelled with the test's name"""
+    def limit(count, label=None):
+        return assert_max_queries(count, label=label or request.node.name)
+    return limit
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Script to rebuild per-user daily rollups from check-in and journal history
+Recomputes user_daily_rollups for every user (or one user) in batches of
+users, for repair after migrations, manual data fixes or drift.
+"""
+
+import os
+import sys
+import logging
+from datetime import datetime
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import create_app, db
+from app.models.user import User
+from app.models.user_daily_rollup import UserDailyRollup
+from app.utils.response_cache import invalidate_users
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+
+# Users rebuilt per transaction
+USER_BATCH_SIZE = 200
+
+
+def stale_rows(user_ids):
+    """Number of stored rollup rows that differ from a recomputation (missing and extra rows included)"""
+    computed = UserDailyRollup.aggregate(user_ids)
+    stored = {
+        (row.user_id, row.date): {column: getattr(row, column) for column in UserDailyRollup.COUNT_COLUMNS}
+        for row in UserDailyRollup.query.filter(UserDailyRollup.user_id.in_(user_ids))
+    }
+    return sum(1 for key in computed.keys() | stored.keys() if computed.get(key) != stored.get(key))
+
+
+def rebuild_daily_rollups(user_id=None, dry_run=False):
+    """
+    Recompute daily rollups from check-ins and journal entries
+
+    Args:
+        user_id (str): Specific user ID to process (None for all users)
+        dry_run (bool): Report stale rows without writing
+
+    Returns:
+        Tuple of (users processed, rows written or found stale)
+    """
+    user_query = db.session.query(User.id).order_by(User.id)
+    if user_id:
+        user_query = user_query.filter(User.id == user_id)
+    user_ids = [uid for (uid,) in user_query]
+
+    total = 0
+    for i in range(0, len(user_ids), USER_BATCH_SIZE):
+        batch = user_ids[i:i + USER_BATCH_SIZE]
+        if dry_run:
+            total += stale_rows(batch)
+        else:
+            total += UserDailyRollup.rebuild(batch)
+            db.session.commit()
+            invalidate_users(batch)
+        logger.info(f"Processed {min(i + USER_BATCH_SIZE, len(user_ids))}/{len(user_ids)} users")
+
+    return len(user_ids), total
+
+
+def main():
+    """Main function to run the rebuild script"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Rebuild per-user daily rollups from check-in and journal history')
+    parser.add_argument('--user-id', type=str, help='Rebuild rollups for specific user only')
+    parser.add_argument('--dry-run', action='store_true', help='Report how many rollup rows are stale without writing')
+
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        start_time = datetime.now()
+        try:
+            users, rows = rebuild_daily_rollups(user_id=args.user_id, dry_run=args.dry_run)
+        except Exception as e:
+            logger.error(f"Rollup rebuild failed: {e}")
+            db.session.rollback()
+            sys.exit(1)
+
+        if args.dry_run:
+            logger.info(f"Checked {users} users. {rows} rollup rows are stale ({datetime.now() - start_time})")
+        else:
+            logger.info(f"Rebuilt {rows} rollup rows for {users} users in {datetime.now() - start_time}")
+
+
+if __name__ == '__main__':
+    main()
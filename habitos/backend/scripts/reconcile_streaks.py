@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Script to rebuild habit streak counters from check-in history
+Recomputes current_streak, longest_streak and last_completed_date for every
+habit (or one user's habits) in bulk, for repair after migrations or drift.
+"""
+
+import os
+import sys
+import logging
+from datetime import datetime
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import create_app, db
+from app.models.habit import Habit, calculate_streaks
+from app.models.check_in import CheckIn
+from app.utils.response_cache import invalidate_users
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+def reconcile_streaks(user_id=None, dry_run=False):
+    """
+    Recompute streak counters for all habits from completed check-ins
+
+    Args:
+        user_id (str): Specific user ID to process (None for all users)
+        dry_run (bool): Report differences without writing them
+
+    Returns:
+        Tuple of (habits checked, habits changed)
+    """
+    habit_query = db.session.query(
+        Habit.id, Habit.user_id, Habit.current_streak, Habit.longest_streak, Habit.last_completed_date
+    )
+    if user_id:
+        habit_query = habit_query.filter(Habit.user_id == user_id)
+    rows = habit_query.all()
+    stored = {row[0]: tuple(row[2:]) for row in rows}
+    owners = {row[0]: row[1] for row in rows}
+
+    # Stream distinct completed days ordered by habit so each habit's dates
+    # arrive contiguously and can be folded without holding all of them
+    date_query = db.session.query(CheckIn.habit_id, CheckIn.date)\
+        .filter(CheckIn.completed == True)\
+        .distinct()\
+        .order_by(CheckIn.habit_id, CheckIn.date)
+    if user_id:
+        date_query = date_query.filter(CheckIn.user_id == user_id)
+
+    computed = {}
+    current_habit = None
+    dates = []
+    for habit_id, day in date_query.yield_per(BATCH_SIZE):
+        if habit_id != current_habit:
+            if current_habit is not None:
+                computed[current_habit] = calculate_streaks(dates)
+            current_habit = habit_id
+            dates = []
+        dates.append(day)
+    if current_habit is not None:
+        computed[current_habit] = calculate_streaks(dates)
+
+    updates = []
+    for habit_id, old_values in stored.items():
+        new_values = computed.get(habit_id, (0, 0, None))
+        if tuple(old_values) != new_values:
+            current, longest, last_completed = new_values
+            updates.append({
+                'id': habit_id,
+                'current_streak': current,
+                'longest_streak': longest,
+                'last_completed_date': last_completed
+            })
+
+    if not dry_run:
+        for i in range(0, len(updates), BATCH_SIZE):
+            db.session.bulk_update_mappings(Habit, updates[i:i + BATCH_SIZE])
+            db.session.commit()
+        invalidate_users(owners[update['id']] for update in updates)
+
+    return len(stored), len(updates)
+
+
+def main():
+    """Main function to run the reconciliation script"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Rebuild habit streak counters from check-in history')
+    parser.add_argument('--user-id', type=str, help='Reconcile habits for specific user only')
+    parser.add_argument('--dry-run', action='store_true', help='Report how many habits would change without writing')
+
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        start_time = datetime.now()
+        try:
+            checked, changed = reconcile_streaks(user_id=args.user_id, dry_run=args.dry_run)
+        except Exception as e:
+            logger.error(f"Streak reconciliation failed: {e}")
+            db.session.rollback()
+            sys.exit(1)
+
+        verb = 'Would update' if args.dry_run else 'Updated'
+        logger.info(f"Checked {checked} habits. {verb} {changed} in {datetime.now() - start_time}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Script to run the AI enrichment worker for journal entries
+Drains the enrichment_jobs queue filled by journal writes, filling
+ai_insights/ai_summary through Gemini in rate-limited batches. Runs until
+interrupted, or until the queue is empty with --drain. Batch size, threads
+and rate limit come from the ENRICHMENT_* settings unless given here.
+"""
+
+import os
+import sys
+import time
+import logging
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import create_app
+from app.utils.enrichment_queue import EnrichmentWorker
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+
+# Seconds between stats log lines while running
+STATS_INTERVAL = 60
+
+
+def main():
+    """Main function to run the enrichment worker"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run the AI enrichment worker for journal entries')
+    parser.add_argument('--drain', action='store_true', help='Process due jobs once and exit')
+    parser.add_argument('--workers', type=int, help='Worker threads')
+    parser.add_argument('--batch-size', type=int, help='Entries per Gemini call')
+    parser.add_argument('--rate-limit', type=float, help='Gemini calls per second')
+
+    args = parser.parse_args()
+
+    app = create_app()
+    worker = EnrichmentWorker(app, batch_size=args.batch_size, concurrency=args.workers, rate_limit=args.rate_limit)
+
+    if args.drain:
+        processed = worker.drain()
+        logger.info(f"Processed {processed} jobs: {worker.stats()}")
+        return
+
+    worker.start()
+    try:
+        while True:
+            time.sleep(STATS_INTERVAL)
+            logger.info(f"Enrichment queue: {worker.stats()}")
+    except KeyboardInterrupt:
+        logger.info("Stopping enrichment worker...")
+        worker.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -103,7 +103,7 @@ export const habitsAPI = {
 // Check-ins API calls
 export const checkInsAPI = {
   getCheckIns: async () => {
-    const response = await api.get("/check-ins/");
+    const response = await api.get("/check-ins/?paginate=false");
     return response.data;
   },
   getHabitCheckIns: async (habitId) => {
@@ -141,6 +141,7 @@ export const journalAPI = {
     if (filters.startDate) params.append("start_date", filters.startDate);
     if (filters.endDate) params.append("end_date", filters.endDate);
     if (filters.includeAiData) params.append("include_ai_data", "true");
+    params.append("paginate", "false");
 
     const response = await api.get(`/journal/?${params.toString()}`);
     return response.data;
@@ -280,6 +281,7 @@ export const goalsAPI = {
     if (filters.habit_id) params.append("habit_id", filters.habit_id);
     if (filters.status) params.append("status", filters.status);
     if (filters.priority) params.append("priority", filters.priority);
+    params.append("paginate", "false");
 
     const response = await api.get(`/goals/?${params.toString()}`);
     return response.data;